@@ -3,19 +3,27 @@ import os
 import django
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
+from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
 
-import integrity_app
-from integrity_app.routing import websocket_urlpatterns  # Adjust this import if needed
-
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "AI-ExamIntegrity.settings")
 django.setup()
 
+# Consumers use settings and models, so they are imported once Django is set up.
+from integrity_app.routing import websocket_urlpatterns  # noqa: E402
+
+# Load and warm the models off the request path (manage.py commands never get here).
+from django.conf import settings  # noqa: E402
+if settings.INTEGRITY_WARMUP_ON_START:
+    from integrity_app import pipeline
+    pipeline.ensure_warming()
+
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
-    "websocket": AuthMiddlewareStack(
+    # Sockets carry the Django session cookie, so reject cross-site origins.
+    "websocket": AllowedHostsOriginValidator(AuthMiddlewareStack(
         URLRouter(
-            integrity_app.routing.websocket_urlpatterns
+            websocket_urlpatterns
         )
-    ),
+    )),
 })
\ No newline at end of file
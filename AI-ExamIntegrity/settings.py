@@ -94,6 +94,145 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Integrity pipeline
+# YOLO micro-batching across concurrent frame requests (batch size 1 disables it).
+INTEGRITY_YOLO_BATCH_SIZE = 8
+INTEGRITY_YOLO_BATCH_WAIT_MS = 15
+# Detector input size (YOLO imgsz), independent of INTEGRITY_FRAME_MAX_SIDE.
+INTEGRITY_YOLO_IMGSZ = 640
+# Only these classes (matched case-insensitively against the model's names) are
+# detected, above INTEGRITY_DETECTOR_CONF; both are applied inside the model's NMS.
+# An empty list detects every class. The threshold is YOLO's default, so detection
+# sensitivity is what it was before classes were filtered; raise it only after
+# checking recall on exam footage.
+INTEGRITY_DETECTOR_CLASSES = [
+    'Sunglasses', 'Headphones', 'Cell phone', 'Mobile phone', 'Book', 'Books',
+    'Laptop', 'Tablet', 'iPad', 'Paper',
+]
+INTEGRITY_DETECTOR_CONF = 0.25
+# The legacy face_monitor.FaceMonitor can also score sunglasses from the eye crops
+# (eye_occlusion.EyeOcclusionClassifier). Its weights were set on synthetic faces
+# only and shadowed or deep-set eyes read as covered, so it stays off until it has
+# been fitted on labelled webcam crops; the detector's Sunglasses class is the only
+# source meanwhile.
+INTEGRITY_EYE_OCCLUSION_CLASSIFIER = False
+# Object detector runtime: 'torch', or 'onnx' / 'openvino' for CPU-only nodes. The
+# exported model is built next to models/best.pt (see `manage.py export_detector`);
+# int8 quantization is calibrated on INTEGRITY_DETECTOR_CALIBRATION_DIR.
+INTEGRITY_DETECTOR_BACKEND = 'torch'
+INTEGRITY_DETECTOR_INT8 = False
+INTEGRITY_DETECTOR_CALIBRATION_DIR = BASE_DIR / 'calibration'
+# Detect-then-track: a full detector pass every N frames per student, or sooner when
+# the downscaled frame changes by more than the threshold (mean abs diff, 0-255).
+# Boxes are carried forward with optical flow in between; 1 disables tracking.
+INTEGRITY_DETECT_INTERVAL = 4
+INTEGRITY_TRACK_MOTION_THRESHOLD = 6.0
+# Duplicate-frame gating: a frame whose 64 px greyscale thumbnail differs from the
+# session's last analysed frame by less than the threshold (mean abs diff, 0-255)
+# reuses that result, for at most INTEGRITY_GATE_MAX_AGE seconds. 0 disables it.
+INTEGRITY_GATE_THRESHOLD = 2.0
+INTEGRITY_GATE_MAX_AGE = 3.0
+# Threads in the FrameAnalyzer's long-lived face-analysis pool.
+INTEGRITY_ANALYZER_WORKERS = 4
+# Per-attempt monitoring sessions and the shared FaceMesh graph pool.
+INTEGRITY_FACE_MESH_POOL_SIZE = 2
+# Uploads are decoded (at reduced JPEG scale when possible) and resized once so the
+# longest side is at most this many pixels; both detectors share that frame.
+# 0 analyses frames at their uploaded size.
+INTEGRITY_FRAME_MAX_SIDE = 640
+# FaceMesh runs on a square crop around each student's last face (padded by
+# INTEGRITY_FACE_ROI_PADDING of the face size, resized to INTEGRITY_FACE_ROI_SIZE
+# pixels) and searches the whole frame when the face is lost, and at least every
+# INTEGRITY_FACE_ROI_FULL_EVERY frames so a second face in view is counted
+# ('multiple_faces' in the result). 0 disables either.
+INTEGRITY_FACE_ROI_PADDING = 0.25
+INTEGRITY_FACE_ROI_SIZE = 256
+INTEGRITY_FACE_ROI_FULL_EVERY = 10
+INTEGRITY_SESSION_TTL = 300  # seconds of inactivity before a session is dropped
+INTEGRITY_MAX_SESSIONS = 1000
+# Models are loaded on first use rather than at import time. Server processes (WSGI/ASGI)
+# start warming them in the background at startup; /ready/ returns 503 until they are warm.
+INTEGRITY_WARMUP_ON_START = True
+# Per-stage latency histograms, frames/sec, in-flight requests and model memory,
+# served in Prometheus text format at /metrics/ to staff and to scrapers sending
+# INTEGRITY_METRICS_TOKEN as "Authorization: Bearer <token>". Without a token set,
+# only signed-in staff can read them.
+INTEGRITY_METRICS_ENABLED = True
+INTEGRITY_METRICS_TOKEN = os.getenv('INTEGRITY_METRICS_TOKEN')
+# Backpressure: one frame per student in analysis plus one latest frame waiting (for
+# at most INTEGRITY_FRAME_WAIT_TIMEOUT seconds); older pending frames are dropped.
+# Beyond INTEGRITY_MAX_CONCURRENT_FRAMES analyses per worker, frames are refused with
+# 503 + Retry-After and a suggested capture interval (never below the base interval).
+INTEGRITY_MAX_CONCURRENT_FRAMES = os.cpu_count() or 1
+INTEGRITY_FRAME_WAIT_TIMEOUT = 2.0
+INTEGRITY_CAPTURE_INTERVAL_MS = 500
+# Adaptive sampling: every frame response carries next_capture_ms. Clean students back
+# off from the base interval, doubling every CALM_STEP seconds up to MAX_MS; a flag
+# (gaze/head, no face, object, audio) drops the interval to MIN_MS for BOOST_SECONDS.
+# Intervals are stretched so the node stays within INTEGRITY_NODE_FPS_BUDGET.
+INTEGRITY_CAPTURE_MIN_MS = 250
+INTEGRITY_CAPTURE_MAX_MS = 4000
+INTEGRITY_CAPTURE_CALM_STEP = 10.0
+INTEGRITY_CAPTURE_BOOST_SECONDS = 15.0
+INTEGRITY_NODE_FPS_BUDGET = 40.0
+# Client inference: the browser runs the MediaPipe FaceLandmarker and sends landmarks
+# (plus a thumbnail every INTEGRITY_THUMBNAIL_INTERVAL_MS for object detection) instead
+# of full frames. A random INTEGRITY_SPOT_CHECK_RATE of packets ask for a full frame,
+# whose server face mesh must agree within INTEGRITY_SPOT_CHECK_TOLERANCE (mean
+# normalised distance); after INTEGRITY_SPOT_CHECK_MAX_FAILURES failures the student
+# is switched back to full frames.
+INTEGRITY_CLIENT_INFERENCE = False
+INTEGRITY_THUMBNAIL_INTERVAL_MS = 5000
+INTEGRITY_SPOT_CHECK_RATE = 0.05
+INTEGRITY_SPOT_CHECK_TOLERANCE = 0.03
+INTEGRITY_SPOT_CHECK_MAX_FAILURES = 2
+INTEGRITY_TASKS_VISION_URL = 'https://cdn.jsdelivr.net/npm/@mediapipe/tasks-vision@0.10.22-rc.20250304'
+INTEGRITY_FACE_LANDMARKER_MODEL_URL = ('https://storage.googleapis.com/mediapipe-models/face_landmarker/'
+                                       'face_landmarker/float16/1/face_landmarker.task')
+# Violation evidence: each analysed frame is kept per student as a JPEG (longest side
+# INTEGRITY_EVIDENCE_MAX_SIDE) in a ring buffer of at most INTEGRITY_EVIDENCE_BUFFER_BYTES.
+# When a face alert starts, the buffer is saved in the background under
+# MEDIA_ROOT/evidence/ as a contact sheet ('sheet') or MJPEG clip ('clip') and linked
+# from an Alert and the attempt's latest Answer, at most once per COOLDOWN seconds.
+# Clean sessions never write anything. A budget of 0 disables evidence capture.
+INTEGRITY_EVIDENCE_BUFFER_BYTES = 256 * 1024
+INTEGRITY_EVIDENCE_MAX_SIDE = 320
+INTEGRITY_EVIDENCE_QUALITY = 70
+INTEGRITY_EVIDENCE_FORMAT = 'sheet'
+INTEGRITY_EVIDENCE_COOLDOWN = 30.0
+# Audio chunks are decoded in one in-memory ffmpeg pass to 16 kHz mono PCM for speech
+# recognition. With INTEGRITY_AUDIO_ARCHIVE the recording is also kept as an MP3 under
+# MEDIA_ROOT, encoded on a background thread.
+INTEGRITY_FFMPEG = 'ffmpeg'
+INTEGRITY_AUDIO_ARCHIVE = True
+# Voice-activity detection (energy, spectral flatness and zero-crossing rate over 20 ms
+# frames): only speech segments are sent to speech recognition, chunks without speech
+# are not sent at all, and each result carries the chunk's speech_ratio.
+INTEGRITY_VAD_ENABLED = True
+# Each chunk is recognized in every language at once, on a pool of
+# INTEGRITY_SPEECH_WORKERS threads shared by uploads and live streams; a language that
+# has not answered within INTEGRITY_SPEECH_TIMEOUT seconds is reported as timed out.
+# Speech engine (speech.py): 'google' (Web Speech API), 'gcp' (Cloud Speech-to-Text,
+# needs google-cloud-speech), 'vosk' (offline on the CPU, needs vosk and one model
+# directory per language code in INTEGRITY_SPEECH_VOSK_MODELS), or 'stub', a local
+# engine that answers after INTEGRITY_SPEECH_STUB_LATENCY seconds (offline testing).
+# Engines that batch (vosk, stub) get up to INTEGRITY_SPEECH_MAX_BATCH chunks per call,
+# collected from concurrent streams for at most INTEGRITY_SPEECH_BATCH_WAIT_MS.
+INTEGRITY_SPEECH_BACKEND = 'google'
+INTEGRITY_SPEECH_WORKERS = 16
+INTEGRITY_SPEECH_TIMEOUT = 10.0
+INTEGRITY_SPEECH_STUB_LATENCY = 0.3
+INTEGRITY_SPEECH_VOSK_MODELS = {
+    'en': BASE_DIR / 'models' / 'vosk-en',
+    'ar': BASE_DIR / 'models' / 'vosk-ar',
+}
+INTEGRITY_SPEECH_MAX_BATCH = 8
+INTEGRITY_SPEECH_BATCH_WAIT_MS = 20.0
+# Frames are analysed headless (structured JSON only). Annotated images are rendered
+# server-side only while a proctor preview is open, unless this is switched on.
+INTEGRITY_RENDER_ANNOTATIONS = False
+INTEGRITY_PREVIEW_SECONDS = 30
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -12,4 +12,10 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "AI-ExamIntegrity.settings")
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Load and warm the models off the request path (manage.py commands never get here).
+from django.conf import settings  # noqa: E402
+if settings.INTEGRITY_WARMUP_ON_START:
+    from integrity_app import pipeline
+    pipeline.ensure_warming()
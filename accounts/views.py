@@ -8,6 +8,7 @@ from django.utils import timezone
 from django.urls import reverse
 from .models import PasswordReset, StudentProfile, ProctorProfile
 from accounts.decorators import student_required, proctor_required
+from integrity_app.views import render_dashboard
 
 
 User = get_user_model()  # Use your custom user model
@@ -15,7 +16,7 @@ User = get_user_model()  # Use your custom user model
 
 @student_required
 def StudentDashboard(request):
-    return render(request, 'integrity_app/student_dashboard.html')
+    return render_dashboard(request)
 
 def RegisterView(request):
     """
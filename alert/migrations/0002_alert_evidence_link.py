@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alert', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='evidence_link',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
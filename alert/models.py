@@ -43,6 +43,10 @@ class Alert(models.Model):
         help_text="Action taken by the proctor in response to the alert"
     )
 
+    # Site-relative URL (under MEDIA_URL) of the captured evidence (contact sheet or
+    # clip), if any. A CharField: URLField would reject a path without a scheme.
+    evidence_link = models.CharField(max_length=255, blank=True, null=True)
+
     # Link to the attempt that triggered the alert
     attempt = models.ForeignKey(
         'student.Attempt',
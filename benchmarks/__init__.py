@@ -0,0 +1,54 @@
+"""
+Standalone performance benchmarks for the integrity pipeline.
+
+Run from the project root, for example:
+    python -m benchmarks.frame_ingest
+"""
+import os
+import time
+
+import cv2
+import numpy as np
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "AI-ExamIntegrity.settings")
+    import django
+    django.setup()
+
+
+def synthetic_frame(width=640, height=480, seed=0) -> np.ndarray:
+    """
+    Builds a deterministic webcam-like BGR frame (gradients, shapes and sensor noise)
+    so that JPEG sizes and decode costs are representative.
+    """
+    rng = np.random.default_rng(seed)
+    xs = np.linspace(0, 255, width, dtype=np.float32)
+    ys = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    frame = np.empty((height, width, 3), np.uint8)
+    frame[..., 0] = (xs * 0.6 + ys * 0.2).astype(np.uint8)
+    frame[..., 1] = (xs * 0.3 + ys * 0.5).astype(np.uint8)
+    frame[..., 2] = np.broadcast_to(255 - ys * 0.7, (height, width)).astype(np.uint8)
+    cv2.ellipse(frame, (width // 2, height // 2), (width // 6, height // 4), 0, 0, 360, (150, 180, 210), -1)
+    cv2.rectangle(frame, (width // 10, height // 2), (width // 4, height - 20), (40, 40, 40), -1)
+    noise = rng.normal(0, 6, frame.shape).astype(np.int16)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def encode_jpeg(frame: np.ndarray, quality=92) -> bytes:
+    _, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buf.tobytes()
+
+
+def measure(fn, repeat=200, warmup=10):
+    """
+    Calls fn() repeatedly and returns (wall_ms, cpu_ms) per call.
+    """
+    for _ in range(warmup):
+        fn()
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    for _ in range(repeat):
+        fn()
+    wall = (time.perf_counter() - wall0) * 1000 / repeat
+    cpu = (time.process_time() - cpu0) * 1000 / repeat
+    return wall, cpu
@@ -0,0 +1,105 @@
+"""
+Frames/sec a node receives under the fixed 500 ms capture interval, a fixed
+interval stretched to fit the node budget, and the risk-based SamplingPolicy;
+plus how quickly risky moments are sampled and how many frames land in them.
+
+Runs in simulated time: each student alternates calm stretches with short risky
+episodes (looking away, phone in view); the policy sees exactly what the server
+would see after each analysed frame.
+
+    python -m benchmarks.adaptive_sampling [--students 200 --minutes 30 --risky-share 0.05 --budget-fps 40]
+"""
+import argparse
+import heapq
+import random
+
+import numpy as np
+
+from integrity_app.sampling import SamplingPolicy
+from integrity_app.sessions import MonitorSession
+
+CLEAN = {'face': {'face_detected': True, 'status': 'Normal Behavior'}, 'detections': []}
+RISKY = {'face': {'face_detected': True, 'status': 'Suspicious: Looking Left'}, 'detections': []}
+
+
+class _Registry:
+    def __init__(self, sessions):
+        self._sessions = sessions
+
+    def snapshot(self):
+        return list(self._sessions)
+
+
+def episodes(rng, seconds, risky_share, mean_episode=8.0):
+    """Sorted (start, end) risky intervals covering ~risky_share of the exam."""
+    out, t = [], 0.0
+    mean_gap = mean_episode * (1 - risky_share) / risky_share
+    while t < seconds:
+        t += rng.expovariate(1 / mean_gap)
+        length = rng.expovariate(1 / mean_episode)
+        out.append((t, t + length))
+        t += length
+    return out
+
+
+def simulate(args, label: str, fixed_ms: float = None):
+    rng = random.Random(args.seed)
+    seconds = args.minutes * 60
+    policy = SamplingPolicy(budget_fps=args.budget_fps)
+    sessions = [MonitorSession(f'student-{i}') for i in range(args.students)]
+    registry = _Registry(sessions)
+    plans = [episodes(rng, seconds, args.risky_share) for _ in sessions]
+    queue = [(rng.uniform(0, 0.5), i) for i in range(args.students)]
+    heapq.heapify(queue)
+    frames_per_second = np.zeros(int(seconds) + 1)
+    detection_delay = []
+    risky_frames = 0
+    seen = [set() for _ in sessions]
+
+    while queue:
+        t, i = heapq.heappop(queue)
+        if t >= seconds:
+            continue
+        frames_per_second[int(t)] += 1
+        risky = None
+        for k, (start, end) in enumerate(plans[i]):
+            if start <= t < end:
+                risky = k
+                break
+        risky_frames += risky is not None
+        if risky is not None and risky not in seen[i]:
+            seen[i].add(risky)
+            detection_delay.append(t - plans[i][risky][0])
+        if fixed_ms is None:
+            interval = policy.next_interval(sessions[i], RISKY if risky is not None else CLEAN, registry, now=t)
+        else:
+            interval = fixed_ms
+        heapq.heappush(queue, (t + interval / 1000, i))
+
+    delay = np.array(detection_delay) * 1000 if detection_delay else np.zeros(1)
+    steady = frames_per_second[60:-1] if seconds > 120 else frames_per_second
+    print(f"{label:<12}{steady.mean():>10.1f}{np.percentile(steady, 99):>10.0f}"
+          f"{risky_frames / max(1, frames_per_second.sum()) * 100:>10.1f}"
+          f"{np.percentile(delay, 50):>10.0f}{np.percentile(delay, 95):>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--minutes', type=float, default=30.0)
+    parser.add_argument('--risky-share', type=float, default=0.05)
+    parser.add_argument('--budget-fps', type=float, default=40.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{args.students} students, {args.risky_share:.0%} of exam time risky, budget {args.budget_fps:.0f} fps")
+    print(f"{'policy':<12}{'mean fps':>10}{'p99 fps':>10}{'risky %':>10}"
+          f"{'p50 ms':>10}{'p95 ms':>10}   (ms = delay to first frame inside a risky episode)")
+    simulate(args, 'fixed 500', fixed_ms=500)
+    budget_ms = args.students * 1000 / args.budget_fps
+    simulate(args, f'fixed {budget_ms:.0f}', fixed_ms=budget_ms)
+    simulate(args, 'adaptive')
+
+
+if __name__ == "__main__":
+    main()
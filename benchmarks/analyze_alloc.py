@@ -0,0 +1,99 @@
+"""
+Per-frame allocation, latency jitter and response size of FrameAnalyzer.analyze:
+the previous implementation (executor per call, three full-frame copies), the
+pooled rendering path and the headless structured-result path.
+
+Needs the real models:
+    python -m benchmarks.analyze_alloc [--weights models/best.pt --frames 100]
+"""
+import argparse
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+
+from benchmarks import setup_django, synthetic_frame
+
+
+def legacy_analyze(analyzer, frame, session):
+    # The pre-refactor pipeline, kept here as the baseline.
+    with ThreadPoolExecutor(max_workers=2) as exe:
+        f_face = exe.submit(analyzer.face_monitor.analyze_face, frame.copy(), session)
+        f_obj = exe.submit(analyzer._run_object, frame.copy())
+        face_img = f_face.result()
+        det_result = f_obj.result()
+    detections = []
+    for box, cls, conf in zip(det_result.boxes.xyxy.tolist(), det_result.boxes.cls.tolist(),
+                              det_result.boxes.conf.tolist()):
+        detections.append({'box': list(map(int, box)), 'class_id': int(cls),
+                           'class_name': analyzer.model.names[int(cls)], 'confidence': float(conf)})
+    face_url = analyzer._encode_image(face_img)
+    obj_img = frame.copy()
+    for d in detections:
+        x1, y1, x2, y2 = d['box']
+        cv2.rectangle(obj_img, (x1, y1), (x2, y2), (0, 255, 0), 2)
+    object_url = analyzer._encode_image(obj_img)
+    return {'face_image': face_url, 'object_image': object_url, 'detections': detections}
+
+
+def run(label, fn, frames):
+    gc.collect()
+    gc_before = sum(s['collections'] for s in gc.get_stats())
+    latencies = []
+    response_bytes = 0
+    cpu0 = time.process_time()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    for frame in frames:
+        start = time.perf_counter()
+        result = fn(frame)
+        latencies.append((time.perf_counter() - start) * 1000)
+        response_bytes = len(json.dumps(result))
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot_total = sum(stat.size for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    cpu_ms = (time.process_time() - cpu0) * 1000 / len(frames)
+    gc_runs = sum(s['collections'] for s in gc.get_stats()) - gc_before
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<10}{peak / 1024:>12.0f}{snapshot_total / 1024:>12.0f}"
+          f"{p50:>9.1f}{p99:>9.1f}{statistics.pstdev(latencies):>9.2f}{cpu_ms:>9.1f}"
+          f"{gc_runs:>6}{response_bytes / 1024:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--weights', type=Path, default=Path('models') / 'best.pt')
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    args = parser.parse_args()
+
+    setup_django()
+    from integrity_app.analyzers import FrameAnalyzer
+    from integrity_app.monitoring import FaceMonitor
+    from integrity_app.sessions import MonitorSession
+
+    analyzer = FrameAnalyzer(args.weights, FaceMonitor())
+    session = MonitorSession('bench')
+    frames = [synthetic_frame(args.width, args.height, seed=i % 8) for i in range(args.frames)]
+    # Warm up models and buffer pools.
+    for frame in frames[:5]:
+        analyzer.analyze(frame, session, render=True)
+
+    print(f"{'path':<10}{'peak KiB':>12}{'live KiB':>12}{'p50 ms':>9}{'p99 ms':>9}{'sd ms':>9}"
+          f"{'cpu ms':>9}{'gc':>6}{'json KiB':>10}")
+    run('legacy', lambda f: legacy_analyze(analyzer, f, session), frames)
+    run('pooled', lambda f: analyzer.analyze(f, session, render=True), frames)
+    run('headless', lambda f: analyzer.analyze(f, session), frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Per-chunk cost of preparing an uploaded WebM/Opus recording for speech recognition:
+the previous path (save the WebM, pydub decode -> MP3 export, MP3 decode -> WAV
+export, read the WAV back with sr.AudioFile) versus one in-memory ffmpeg decode to
+16 kHz mono PCM. Recognition itself is not timed. CPU includes the ffmpeg child
+processes; "disk" is the bytes written per chunk on the request path.
+
+The chunk is synthetic (voiced harmonics and noise encoded to WebM/Opus with
+ffmpeg) unless --input points at a real recording. Needs ffmpeg on PATH; the
+previous path also needs pydub and SpeechRecognition.
+
+    python -m benchmarks.audio_decode [--seconds 5 --repeat 20 --input chunk.webm]
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from integrity_app.audio import AudioArchiver, decode_pcm
+
+
+def synthetic_webm(seconds: float, rate=48000, seed=0) -> bytes:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = (np.sin(2 * np.pi * 3.5 * t) > 0).astype(np.float32)
+    signal = 0.3 * voiced * syllables + 0.01 * rng.normal(size=t.shape)
+    pcm = (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+    stereo = np.repeat(pcm[:, None], 2, axis=1)
+    proc = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-f', 's16le', '-ar', str(rate), '-ac', '2',
+         '-i', 'pipe:0', '-c:a', 'libopus', '-b:a', '48k', '-f', 'webm', 'pipe:1'],
+        input=stereo.tobytes(), stdout=subprocess.PIPE, check=True)
+    return proc.stdout
+
+
+def legacy(data: bytes, directory: Path) -> int:
+    from pydub import AudioSegment
+    import speech_recognition as sr
+
+    webm_fp = directory / 'recording.webm'
+    webm_fp.write_bytes(data)
+    written = len(data)
+    audio = AudioSegment.from_file(webm_fp)
+    mp3_fp = webm_fp.with_suffix('.mp3')
+    audio.export(mp3_fp, format='mp3')
+    written += mp3_fp.stat().st_size
+    webm_fp.unlink()
+    wav_fp = mp3_fp.with_suffix('.wav')
+    AudioSegment.from_file(mp3_fp, format='mp3').export(wav_fp, format='wav')
+    written += wav_fp.stat().st_size
+    with sr.AudioFile(str(wav_fp)) as src:
+        sr.Recognizer().record(src)
+    wav_fp.unlink()
+    mp3_fp.unlink()
+    return written
+
+
+def in_memory(data: bytes) -> int:
+    import speech_recognition as sr
+
+    pcm = decode_pcm(data)
+    sr.AudioData(pcm.tobytes(), 16000, 2)
+    return 0
+
+
+def timed(fn, repeat: int):
+    """(wall ms, CPU ms including child processes, result of the last call) per call."""
+    fn()
+    wall0, t0 = time.perf_counter(), os.times()
+    for _ in range(repeat):
+        result = fn()
+    t1 = os.times()
+    cpu = (t1.user + t1.system + t1.children_user + t1.children_system
+           - t0.user - t0.system - t0.children_user - t0.children_system)
+    return (time.perf_counter() - wall0) * 1000 / repeat, cpu * 1000 / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=5.0, help='length of the synthetic chunk')
+    parser.add_argument('--input', type=Path, default=None, help='a real WebM/Opus recording instead')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    data = args.input.read_bytes() if args.input else synthetic_webm(args.seconds)
+    pcm = decode_pcm(data)
+    print(f"chunk: {len(data) / 1024:.1f} KiB WebM, {len(pcm) / 16000:.2f} s of audio")
+    print(f"{'path':<28}{'wall ms':>9}{'cpu ms':>9}{'disk KiB':>10}")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            rows.append(('save + pydub MP3 -> WAV', *timed(lambda: legacy(data, Path(tmp)), args.repeat)))
+        except ImportError as e:
+            print(f"(previous path skipped: {e})")
+        rows.append(('in-memory PCM decode', *timed(lambda: in_memory(data), args.repeat)))
+        for name, wall, cpu, written in rows:
+            print(f"{name:<28}{wall:>9.1f}{cpu:>9.1f}{written / 1024:>10.1f}")
+
+        archiver = AudioArchiver(Path(tmp), '/media/')
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            archiver.submit(data)
+        submit_ms = (time.perf_counter() - start) * 1000 / args.repeat
+        archiver._executor.shutdown(wait=True)
+        archive_ms = (time.perf_counter() - start) * 1000 / args.repeat
+        stats = archiver.stats()
+        print(f"archival MP3: {submit_ms:.2f} ms on the request path, {archive_ms:.1f} ms per chunk in the "
+              f"background, {stats['bytes_written'] / max(1, stats['written']) / 1024:.1f} KiB written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Live audio decode throughput: an ffmpeg spawn per chunk (audio.decode_pcm, as
+for uploaded recordings; each chunk a self-contained WebM file) versus one
+persistent StreamDecoder per stream fed the consecutive chunks of a single WebM
+stream, as MediaRecorder.start(timeslice) produces them. Reports wall latency per
+chunk and chunks/sec per core (CPU including the ffmpeg processes).
+
+The stream is synthetic (see benchmarks.audio_decode); needs ffmpeg on PATH.
+
+    python -m benchmarks.audio_stream [--chunks 30 --chunk-seconds 1]
+"""
+import argparse
+import os
+import time
+
+from benchmarks.audio_decode import synthetic_webm
+from integrity_app.audio import decode_pcm
+from integrity_app.audio_stream import StreamDecoder
+
+
+def cpu_seconds() -> float:
+    # Includes child processes once they have been waited for.
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def split_stream(data: bytes, chunks: int) -> list:
+    # Equal byte slices: unlike MediaRecorder's cluster-aligned chunks, these cut
+    # through packets, which the decoder must carry over to the next chunk.
+    step = len(data) // chunks
+    return [data[i * step:(i + 1) * step if i < chunks - 1 else len(data)] for i in range(chunks)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunks', type=int, default=30)
+    parser.add_argument('--chunk-seconds', type=float, default=1.0)
+    args = parser.parse_args()
+
+    files = [synthetic_webm(args.chunk_seconds, seed=i) for i in range(args.chunks)]
+    stream = split_stream(synthetic_webm(args.chunk_seconds * args.chunks), args.chunks)
+
+    decode_pcm(files[0])
+    wall0, cpu0 = time.perf_counter(), cpu_seconds()
+    for data in files:
+        decode_pcm(data)
+    spawn_wall, spawn_cpu = time.perf_counter() - wall0, cpu_seconds() - cpu0
+
+    wall0, cpu0 = time.perf_counter(), cpu_seconds()
+    decoder = StreamDecoder()
+    samples = sum(len(decoder.feed(data)) for data in stream)
+    stream_wall = time.perf_counter() - wall0
+    samples += len(decoder.close())
+    stream_cpu = cpu_seconds() - cpu0
+
+    print(f"{args.chunks} chunks of {args.chunk_seconds:g} s; stream decoded to {samples / 16000:.2f} s of PCM")
+    print(f"{'decoder':<26}{'ms/chunk':>10}{'cpu ms/chunk':>14}{'chunks/s/core':>15}")
+    for name, wall, cpu in (('ffmpeg spawn per chunk', spawn_wall, spawn_cpu),
+                            ('persistent StreamDecoder', stream_wall, stream_cpu)):
+        print(f"{name:<26}{wall * 1000 / args.chunks:>10.1f}{cpu * 1000 / args.chunks:>14.2f}"
+              f"{args.chunks / max(cpu, 1e-9):>15.0f}")
+    print(f"(StreamDecoder ms/chunk includes its {decoder.settle * 1000:.0f} ms settle wait, which costs no CPU)")
+
+
+if __name__ == "__main__":
+    main()
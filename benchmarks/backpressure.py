@@ -0,0 +1,110 @@
+"""
+Tail latency of frame analysis when more students are online than the node can
+serve: browsers firing a frame every 500 ms regardless (the previous behaviour)
+versus per-session latest-frame-wins plus a global admission limit with clients
+honouring Retry-After / next_capture_ms.
+
+Analysis is simulated as `--service-ms` of work on one of `--cpus` slots.
+
+    python -m benchmarks.backpressure [--students 40 --cpus 4 --service-ms 80 --seconds 20]
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from integrity_app.admission import AdmissionController, Overloaded, Superseded
+from integrity_app.sessions import MonitorSession
+
+
+def simulate(args, controlled: bool):
+    cpus = threading.Semaphore(args.cpus)
+    admission = AdmissionController(args.cpus, base_interval_ms=args.interval_ms, wait_timeout=2.0)
+    latencies, lock = [], threading.Lock()
+    counts = {'served': 0, 'superseded': 0, 'rejected': 0}
+    stop = time.perf_counter() + args.seconds
+    requests = []
+
+    def analyse():
+        with cpus:
+            time.sleep(args.service_ms / 1000)
+
+    def request(session, pacing):
+        sent = time.perf_counter()
+        try:
+            if controlled:
+                if not admission.enter_session(session):
+                    raise Superseded(admission.capture_interval_ms(args.students))
+                try:
+                    admission.acquire(args.students)
+                    start = time.perf_counter()
+                    try:
+                        analyse()
+                    finally:
+                        admission.release((time.perf_counter() - start) * 1000)
+                finally:
+                    admission.leave_session(session)
+            else:
+                analyse()
+        except Superseded as e:
+            pacing['interval'] = e.next_capture_ms
+            with lock:
+                counts['superseded'] += 1
+            return
+        except Overloaded as e:
+            pacing['interval'] = e.next_capture_ms
+            pacing['paused_until'] = time.perf_counter() + e.retry_after_ms / 1000
+            with lock:
+                counts['rejected'] += 1
+            return
+        with lock:
+            counts['served'] += 1
+            latencies.append((time.perf_counter() - sent) * 1000)
+
+    def student(i):
+        session = MonitorSession(f'student-{i}')
+        pacing = {'interval': args.interval_ms, 'paused_until': 0.0}
+        time.sleep(i * args.interval_ms / 1000 / args.students)
+        while time.perf_counter() < stop:
+            t = threading.Thread(target=request, args=(session, pacing), daemon=True)
+            t.start()
+            requests.append(t)
+            wait = pacing['interval'] / 1000
+            if controlled:
+                wait = max(wait, pacing['paused_until'] - time.perf_counter())
+            time.sleep(wait)
+
+    students = [threading.Thread(target=student, args=(i,)) for i in range(args.students)]
+    for t in students:
+        t.start()
+    for t in students:
+        t.join()
+    for t in list(requests):
+        t.join()
+    lat = np.array(latencies) if latencies else np.zeros(1)
+    served_fps = counts['served'] / args.seconds
+    label = 'admission' if controlled else 'unbounded'
+    print(f"{label:<10}{np.percentile(lat, 50):>9.0f}{np.percentile(lat, 99):>9.0f}{lat.max():>9.0f}"
+          f"{served_fps:>9.1f}{counts['superseded']:>8}{counts['rejected']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--students', type=int, default=40)
+    parser.add_argument('--cpus', type=int, default=4)
+    parser.add_argument('--service-ms', type=float, default=80.0)
+    parser.add_argument('--interval-ms', type=int, default=500)
+    parser.add_argument('--seconds', type=float, default=20.0)
+    args = parser.parse_args()
+
+    capacity = args.cpus * 1000 / args.service_ms
+    offered = args.students * 1000 / args.interval_ms
+    print(f"capacity {capacity:.0f} frames/s, offered {offered:.0f} frames/s")
+    print(f"{'mode':<10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'served/s':>9}{'supers.':>8}{'503s':>8}")
+    simulate(args, controlled=False)
+    simulate(args, controlled=True)
+
+
+if __name__ == "__main__":
+    main()
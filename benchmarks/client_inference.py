@@ -0,0 +1,103 @@
+"""
+Server CPU and upload bandwidth per student: full frames analysed server-side
+versus client-inference packets (landmarks every capture, a thumbnail for object
+detection every --thumbnail-ms, and a --spot-check-rate share of full frames
+checked against the server face mesh).
+
+Packet decoding, the gaze/head rules and JPEG decoding are measured here. The face
+mesh is measured when MediaPipe is installed; the detector cost is taken from
+--detect-ms (see detector_backends for the figure on this machine).
+
+    python -m benchmarks.client_inference [--fps 2 --detect-ms 35 --face-mesh-ms 12]
+"""
+import argparse
+
+import cv2
+import numpy as np
+
+from benchmarks import encode_jpeg, measure, synthetic_frame
+from integrity_app import landmarks as lm
+from integrity_app.client_inference import FULL_FRAME, THUMBNAIL, decode_packet, encode_packet
+from integrity_app.frames import decode_frame_bytes
+
+
+def synthetic_landmarks(seed=0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0.3, 0.7, (lm.NUM_REFINED_LANDMARKS, 3)).astype(np.float32)
+    points[:, 2] -= 0.5
+    return points
+
+
+def apply_rules(points: np.ndarray):
+    # What FaceMonitor.evaluate_landmarks does per packet, minus the session bookkeeping.
+    lm.check_eye_gaze_ratio(points, 0.10)
+    lm.check_head_movement(points, 0.10)
+    lm.iris_centers(points)
+
+
+def face_mesh_ms(frame: np.ndarray):
+    try:
+        import mediapipe as mp
+    except ImportError:
+        return None
+    mesh = mp.solutions.face_mesh.FaceMesh(static_image_mode=True, refine_landmarks=True)
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    return measure(lambda: mesh.process(rgb), repeat=50)[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--fps', type=float, default=2.0, help='captures per second per student')
+    parser.add_argument('--thumbnail-ms', type=float, default=5000.0)
+    parser.add_argument('--spot-check-rate', type=float, default=0.05)
+    parser.add_argument('--detect-ms', type=float, default=35.0)
+    parser.add_argument('--face-mesh-ms', type=float, default=12.0,
+                        help='used when MediaPipe is not installed')
+    args = parser.parse_args()
+
+    frame = synthetic_frame()
+    full_jpeg = encode_jpeg(frame)
+    thumb_jpeg = encode_jpeg(cv2.resize(frame, (320, 240), interpolation=cv2.INTER_AREA), quality=70)
+    points = synthetic_landmarks()
+    packet = encode_packet(points)
+    thumb_packet = encode_packet(points, thumb_jpeg, THUMBNAIL)
+    full_packet = encode_packet(points, full_jpeg, FULL_FRAME)
+
+    decoded = decode_packet(packet).landmarks
+    print(f"float16 round trip: max error {np.abs(decoded - points).max():.5f} (normalised units)")
+
+    mesh_ms = face_mesh_ms(frame)
+    mesh_source = 'measured'
+    if mesh_ms is None:
+        mesh_ms, mesh_source = args.face_mesh_ms, 'from --face-mesh-ms'
+
+    decode_full = measure(lambda: decode_frame_bytes(full_jpeg))[1]
+    decode_thumb = measure(lambda: decode_frame_bytes(decode_packet(thumb_packet).image))[1]
+    landmarks_only = measure(lambda: apply_rules(decode_packet(packet).landmarks), repeat=2000)[1]
+
+    print(f"face mesh {mesh_ms:.2f} ms ({mesh_source}), detector {args.detect_ms:.2f} ms (from --detect-ms)")
+    print(f"decode 640x480 {decode_full:.2f} ms, decode 320x240 thumbnail {decode_thumb:.2f} ms, "
+          f"landmark packet + rules {landmarks_only:.3f} ms")
+
+    thumbs_per_s = min(args.fps, 1000 / args.thumbnail_ms)
+    spots_per_s = args.fps * args.spot_check_rate
+    frames_cpu = args.fps * (decode_full + mesh_ms + args.detect_ms)
+    client_cpu = (args.fps * landmarks_only
+                  + thumbs_per_s * (decode_thumb + args.detect_ms)
+                  + spots_per_s * (decode_full + mesh_ms))
+    frames_bytes = args.fps * len(full_jpeg)
+    client_bytes = (args.fps * len(packet) + thumbs_per_s * len(thumb_jpeg)
+                    + spots_per_s * len(full_jpeg))
+
+    print(f"\nper student at {args.fps:g} captures/s, a thumbnail every {args.thumbnail_ms:.0f} ms, "
+          f"{args.spot_check_rate:.0%} spot checks")
+    print(f"{'mode':<18}{'cpu ms/s':>10}{'KB/s up':>10}{'students/core':>15}")
+    for name, cpu, up in (('full frames', frames_cpu, frames_bytes), ('client inference', client_cpu, client_bytes)):
+        print(f"{name:<18}{cpu:>10.1f}{up / 1024:>10.1f}{1000 / cpu:>15.0f}")
+    print(f"packet sizes: landmarks {len(packet)} B, +thumbnail {len(thumb_packet)} B, "
+          f"+full frame {len(full_packet)} B")
+    print(f"server CPU reduction: {frames_cpu / client_cpu:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
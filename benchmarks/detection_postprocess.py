@@ -0,0 +1,95 @@
+"""
+Detector post-processing cost for a cluttered scene: the previous parsing (every
+class at the default confidence, three tensor->list conversions and a dict per
+box) versus the class whitelist and confidence threshold applied inside the model
+call, with the survivors parsed from one (n, 6) array.
+
+The raw candidates are synthetic; NMS is timed with cv2.dnn.NMSBoxes as a stand-in
+for the model's own NMS, to show how its cost follows the number of candidates.
+
+    python -m benchmarks.detection_postprocess [--candidates 300 --classes 600]
+"""
+import argparse
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from benchmarks import measure, setup_django
+
+
+class _Boxes:
+    # The attributes of ultralytics' Boxes that the parsers read.
+    def __init__(self, data: np.ndarray):
+        self.data = data
+        self.xyxy = data[:, :4]
+        self.conf = data[:, 4]
+        self.cls = data[:, 5]
+
+
+def legacy_parse(names, det_result) -> list:
+    detections = []
+    for box, cls, conf in zip(det_result.boxes.xyxy.tolist(), det_result.boxes.cls.tolist(),
+                              det_result.boxes.conf.tolist()):
+        x1, y1, x2, y2 = map(int, box)
+        detections.append({'box': [x1, y1, x2, y2], 'class_id': int(cls), 'class_name': names[int(cls)],
+                           'confidence': float(conf)})
+    return detections
+
+
+def candidates(n: int, num_classes: int, seed=0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, 600, (n, 2))
+    wh = rng.uniform(10, 200, (n, 2))
+    conf = rng.beta(1.2, 3.0, n)
+    cls = rng.integers(0, num_classes, n)
+    return np.column_stack([xy, xy + wh, conf, cls]).astype(np.float32)
+
+
+def nms(data: np.ndarray, conf: float):
+    boxes = np.column_stack([data[:, :2], data[:, 2:4] - data[:, :2]]).tolist()
+    return cv2.dnn.NMSBoxes(boxes, data[:, 4].tolist(), conf, 0.7)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--candidates', type=int, default=300, help='raw boxes above 0.25 before NMS')
+    parser.add_argument('--classes', type=int, default=600, help='model classes (Open Images V7 has 601)')
+    parser.add_argument('--conf', type=float, help='default: INTEGRITY_DETECTOR_CONF')
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from integrity_app.analyzers import FrameAnalyzer
+    from integrity_app.detectors import resolve_classes
+    if args.conf is None:
+        args.conf = settings.INTEGRITY_DETECTOR_CONF
+
+    names = {i: f'class {i}' for i in range(args.classes)}
+    for i, name in enumerate(settings.INTEGRITY_DETECTOR_CLASSES):
+        names[i * 37 % args.classes] = name
+    class_ids = resolve_classes(names, settings.INTEGRITY_DETECTOR_CLASSES)
+
+    raw = candidates(args.candidates, args.classes)
+    raw = raw[raw[:, 4] >= 0.25]
+    everything = raw[nms(raw, 0.25)]
+    kept = raw[(raw[:, 4] >= args.conf) & np.isin(raw[:, 5], class_ids)]
+    relevant = kept[nms(kept, args.conf)] if len(kept) else kept
+    analyzer = SimpleNamespace(names=names)
+
+    nms_all = measure(lambda: nms(raw, 0.25), repeat=args.repeat)[1]
+    nms_relevant = measure(lambda: nms(kept, args.conf), repeat=args.repeat)[1] if len(kept) else 0.0
+    parse_all = measure(lambda: legacy_parse(names, SimpleNamespace(boxes=_Boxes(everything))),
+                        repeat=args.repeat)[1]
+    parse_relevant = measure(lambda: FrameAnalyzer._parse_detections(analyzer, SimpleNamespace(
+        boxes=_Boxes(relevant))), repeat=args.repeat)[1]
+
+    print(f"{len(raw)} candidates over {args.classes} classes; whitelist of {len(class_ids)} classes")
+    print(f"{'mode':<12}{'NMS in':>8}{'boxes out':>11}{'NMS ms':>9}{'parse ms':>10}")
+    print(f"{'all classes':<12}{len(raw):>8}{len(everything):>11}{nms_all:>9.3f}{parse_all:>10.3f}")
+    print(f"{'whitelist':<12}{len(kept):>8}{len(relevant):>11}{nms_relevant:>9.3f}{parse_relevant:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Object-detector throughput per CPU core across backends (PyTorch, ONNX Runtime,
+OpenVINO, fp32 and int8), plus agreement of each backend's detections with the
+PyTorch reference.
+
+Backends whose artifacts are missing are exported first (int8 needs a folder of
+calibration frames). Frames come from --images when given, otherwise synthetic.
+
+    python -m benchmarks.detector_backends [--weights models/best.pt --images calibration/ --frames 100]
+"""
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+
+from benchmarks import synthetic_frame
+
+
+def _iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _detections(result):
+    return list(zip(result.boxes.xyxy.tolist(), result.boxes.cls.tolist(), result.boxes.conf.tolist()))
+
+
+def agreement(reference, candidate, iou_threshold=0.5) -> float:
+    """
+    Fraction of reference detections matched by a same-class candidate box with IoU >= threshold.
+    """
+    total = matched = 0
+    for ref, cand in zip(reference, candidate):
+        for box, cls, _ in ref:
+            total += 1
+            matched += any(c == cls and _iou(box, b) >= iou_threshold for b, c, _ in cand)
+    return matched / total if total else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--weights', type=Path, default=Path('models') / 'best.pt')
+    parser.add_argument('--images', type=Path, help='folder of real frames; also used for int8 calibration')
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx', 'onnx-int8', 'openvino', 'openvino-int8'])
+    args = parser.parse_args()
+
+    from integrity_app.detectors import CALIBRATION_EXTENSIONS, load_detector
+
+    if args.images:
+        paths = sorted(p for p in args.images.rglob('*') if p.suffix.lower() in CALIBRATION_EXTENSIONS)
+        frames = [cv2.imread(str(p)) for p in paths[:args.frames]]
+        frames = [f for f in frames if f is not None]
+    else:
+        frames = [synthetic_frame(640, 480, seed=i) for i in range(args.frames)]
+
+    reference = None
+    print(f"{'backend':<16}{'fps':>8}{'cpu ms':>9}{'fps/core':>10}{'agree':>8}")
+    for name in args.backends:
+        backend, _, quant = name.partition('-')
+        int8 = quant == 'int8'
+        if int8 and not args.images:
+            print(f"{name:<16}  skipped (needs --images for calibration)")
+            continue
+        try:
+            model = load_detector(args.weights, backend, int8, args.images, imgsz=args.imgsz)
+        except ImportError as e:
+            print(f"{name:<16}  skipped ({e})")
+            continue
+        device = 'cpu'
+        for frame in frames[:5]:
+            model(frame, device=device, imgsz=args.imgsz, verbose=False)
+
+        results = []
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        for frame in frames:
+            results.append(_detections(model(frame, device=device, imgsz=args.imgsz, verbose=False)[0]))
+        wall = time.perf_counter() - wall0
+        cpu = time.process_time() - cpu0
+
+        if reference is None:
+            reference = results
+        agree = agreement(reference, results)
+        print(f"{name:<16}{len(frames) / wall:>8.1f}{cpu * 1000 / len(frames):>9.1f}"
+              f"{len(frames) / cpu:>10.2f}{agree:>8.1%}")
+        del model
+
+
+if __name__ == "__main__":
+    main()
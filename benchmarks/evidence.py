@@ -0,0 +1,56 @@
+"""
+Cost of keeping violation evidence: the per-frame encode into a session's ring
+buffer (paid by every student, clean or not), how much history the byte budget
+holds at the base capture interval, and the one-off contact sheet / clip render
+that runs on the background thread when an alert fires.
+
+    python -m benchmarks.evidence [--budget 262144 --max-side 320 --quality 70]
+"""
+import argparse
+
+from benchmarks import measure, setup_django, synthetic_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--budget', type=int, default=None, help='bytes per session (default: the setting)')
+    parser.add_argument('--max-side', type=int, default=None)
+    parser.add_argument('--quality', type=int, default=None)
+    parser.add_argument('--sessions', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=300)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from integrity_app.evidence import EvidenceRecorder, clip, contact_sheet
+    from integrity_app.sessions import MonitorSession
+
+    budget = args.budget if args.budget is not None else settings.INTEGRITY_EVIDENCE_BUFFER_BYTES
+    max_side = args.max_side or settings.INTEGRITY_EVIDENCE_MAX_SIDE
+    quality = args.quality or settings.INTEGRITY_EVIDENCE_QUALITY
+    recorder = EvidenceRecorder(budget=budget, max_side=max_side, quality=quality)
+    interval_s = settings.INTEGRITY_CAPTURE_INTERVAL_MS / 1000
+
+    frame = synthetic_frame(settings.INTEGRITY_FRAME_MAX_SIDE, settings.INTEGRITY_FRAME_MAX_SIDE * 3 // 4)
+    session = MonitorSession('bench')
+    clock = iter(range(10 ** 9))
+    record_ms = measure(lambda: recorder.record(session, frame, next(clock) * interval_s), repeat=args.repeat)[1]
+    ring = session.evidence
+    frames = ring.frames()
+    per_frame = ring.nbytes / len(ring)
+
+    sheet_ms = measure(lambda: contact_sheet(frames), repeat=20, warmup=2)[1]
+    clip_ms = measure(lambda: clip(frames), repeat=5, warmup=1)[1]
+
+    print(f"analysed frame {frame.shape[1]}x{frame.shape[0]} -> evidence JPEG at {max_side}px, quality {quality}")
+    print(f"record per frame: {record_ms:.3f} ms CPU, {per_frame / 1024:.1f} KiB")
+    print(f"budget {budget / 1024:.0f} KiB holds {len(ring)} frames = {len(ring) * interval_s:.1f} s "
+          f"at {settings.INTEGRITY_CAPTURE_INTERVAL_MS} ms; {args.sessions} sessions: "
+          f"{budget * args.sessions / 2 ** 20:.0f} MiB at most")
+    print(f"on alert (background thread): contact sheet {sheet_ms:.1f} ms "
+          f"({len(contact_sheet(frames)) / 1024:.0f} KiB), clip {clip_ms:.1f} ms "
+          f"({len(clip(frames)) / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
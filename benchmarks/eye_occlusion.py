@@ -0,0 +1,104 @@
+"""
+Accuracy and per-frame cost of the eye-occlusion (sunglasses) classifier that
+face_monitor.FaceMonitor can use (INTEGRITY_EYE_OCCLUSION_CLASSIFIER, off by
+default), on a deterministic set of synthetic test faces: random
+skin tone, lighting, eye size, gaze and sensor noise, half of them wearing dark or
+tinted lenses (some with a specular highlight). Eye landmarks come from the
+renderer, so no face mesh is needed.
+
+    python -m benchmarks.eye_occlusion [--faces 400 --save-dir /tmp/eye_faces]
+"""
+import argparse
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from benchmarks import measure
+from integrity_app import landmarks as lm
+from integrity_app.eye_occlusion import EyeOcclusionClassifier
+
+
+def render_face(rng, covered: bool, width=640, height=480):
+    """Returns (BGR frame, (478, 3) landmarks with the eye boundaries filled in)."""
+    light = rng.uniform(0.45, 1.3)
+    background = rng.uniform(40, 200, 3)
+    frame = np.empty((height, width, 3), np.float32)
+    frame[:] = background
+    skin = rng.uniform([60, 90, 130], [180, 200, 235])
+    cx, cy = width / 2 + rng.uniform(-60, 60), height / 2 + rng.uniform(-30, 30)
+    face_w = rng.uniform(110, 170)
+    cv2.ellipse(frame, (int(cx), int(cy)), (int(face_w), int(face_w * 1.3)), 0, 0, 360, skin.tolist(), -1)
+
+    points = np.zeros((lm.NUM_REFINED_LANDMARKS, 3), np.float32)
+    eye_w = face_w * rng.uniform(0.32, 0.4)
+    eye_h = eye_w * rng.uniform(0.35, 0.5)
+    gaze = rng.uniform(-0.25, 0.25)
+    for side, (outer, inner, top, bottom) in zip((-1, 1), lm.EYE_BOUNDARIES):
+        ex, ey = cx + side * face_w * 0.42, cy - face_w * 0.25
+        sclera = rng.uniform(200, 250)
+        cv2.ellipse(frame, (int(ex), int(ey)), (int(eye_w / 2), int(eye_h / 2)), 0, 0, 360,
+                    (sclera, sclera, sclera), -1)
+        iris = rng.uniform([20, 30, 40], [110, 120, 130])
+        iris_x = int(ex + gaze * eye_w)
+        cv2.circle(frame, (iris_x, int(ey)), int(eye_h * 0.45), iris.tolist(), -1)
+        cv2.circle(frame, (iris_x, int(ey)), int(eye_h * 0.18), (10, 10, 10), -1)
+        cv2.ellipse(frame, (int(ex), int(ey)), (int(eye_w / 2), int(eye_h / 2)), 0, 180, 360,
+                    (skin * 0.5).tolist(), 2)
+        points[outer, :2] = (ex - side * eye_w / 2) / width, ey / height
+        points[inner, :2] = (ex + side * eye_w / 2) / width, ey / height
+        points[top, :2] = ex / width, (ey - eye_h / 2) / height
+        points[bottom, :2] = ex / width, (ey + eye_h / 2) / height
+        if covered:
+            lens = rng.uniform(10, 70) * np.array(rng.choice([[1, 1, 1], [1.2, 1, 0.6], [0.6, 0.9, 1.2]]))
+            axes = (int(eye_w * rng.uniform(0.75, 0.9)), int(eye_w * rng.uniform(0.5, 0.65)))
+            cv2.ellipse(frame, (int(ex), int(ey)), axes, 0, 0, 360, lens.tolist(), -1)
+            if rng.random() < 0.4:
+                x0 = int(ex - axes[0] * 0.5)
+                cv2.line(frame, (x0, int(ey - axes[1] * 0.4)), (x0 + axes[0] // 2, int(ey - axes[1] * 0.1)),
+                         (230, 230, 230), 2)
+    if covered:
+        cv2.line(frame, (int(cx - face_w * 0.12), int(cy - face_w * 0.25)),
+                 (int(cx + face_w * 0.12), int(cy - face_w * 0.25)), (30, 30, 30), 3)
+
+    frame = frame * light + rng.normal(0, 5, frame.shape)
+    frame = cv2.GaussianBlur(np.clip(frame, 0, 255).astype(np.uint8), (3, 3), 0)
+    return frame, points
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--faces', type=int, default=400)
+    parser.add_argument('--threshold', type=float, default=50.0, help='confidence (%%) to flag sunglasses')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-dir', type=Path, default=None, help='also write the test images here')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    classifier = EyeOcclusionClassifier()
+    labels = np.arange(args.faces) % 2 == 1
+    faces = [render_face(rng, covered) for covered in labels]
+    if args.save_dir:
+        args.save_dir.mkdir(parents=True, exist_ok=True)
+        for i, ((frame, _), covered) in enumerate(zip(faces, labels)):
+            cv2.imwrite(str(args.save_dir / f"{i:04d}_{'sunglasses' if covered else 'clear'}.jpg"), frame)
+
+    scores = np.array([classifier.classify(frame, points) for frame, points in faces])
+    flagged = scores >= args.threshold
+    tp, fp = (flagged & labels).sum(), (flagged & ~labels).sum()
+    fn, tn = (~flagged & labels).sum(), (~flagged & ~labels).sum()
+    print(f"{args.faces} synthetic faces, threshold {args.threshold:.0f}%")
+    print(f"accuracy {(tp + tn) / args.faces:.1%}  precision {tp / max(1, tp + fp):.1%}  "
+          f"recall {tp / max(1, tp + fn):.1%}  (tp {tp}, fp {fp}, fn {fn}, tn {tn})")
+    print(f"mean confidence: clear {scores[~labels].mean():.1f}%, sunglasses {scores[labels].mean():.1f}%")
+
+    frame, points = faces[0]
+    crops_ms = measure(lambda: classifier.crops(frame, points), repeat=2000)[0]
+    batch = classifier.crops(frame, points)
+    predict_ms = measure(lambda: classifier.predict(batch), repeat=2000)[0]
+    total_ms = measure(lambda: classifier.classify(frame, points), repeat=2000)[0]
+    print(f"per frame: crops {crops_ms:.3f} ms, predict {predict_ms:.3f} ms, classify {total_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
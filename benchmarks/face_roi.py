@@ -0,0 +1,116 @@
+"""
+Face mesh input cost at 720p and 1080p: the whole frame versus the session's
+face ROI cropped and downscaled to INTEGRITY_FACE_ROI_SIZE before the colour
+conversion.
+
+With MediaPipe installed the real FaceMesh.process call is timed. Without it,
+only the resolution-dependent part is: the BGR->RGB conversion, the copy into
+MediaPipe's image frame and the downscale to the face detector's 128x128 input
+(the landmark model itself always runs at 192x192). The face is the synthetic
+frame's centre ellipse.
+
+With MediaPipe installed it also prices the pooled graphs' static_image_mode:
+every frame runs the face detector that tracking mode would skip while the face
+stays in view, against the memory one tracking-mode graph per student would hold.
+
+    python -m benchmarks.face_roi [--roi-size 256 --padding 0.25 --students 1000]
+"""
+import argparse
+import os
+
+import cv2
+import numpy as np
+
+from benchmarks import measure, synthetic_frame
+from integrity_app.face_roi import FaceRoiTracker
+
+
+def face_points(width, height) -> np.ndarray:
+    # Outline of the synthetic face ellipse, normalised like MediaPipe landmarks.
+    angles = np.linspace(0, 2 * np.pi, 64)
+    xs = 0.5 + np.cos(angles) / 6
+    ys = 0.5 + np.sin(angles) / 4
+    return np.column_stack([xs, ys, np.zeros_like(xs)]).astype(np.float32)
+
+
+def mediapipe_mesh():
+    try:
+        import mediapipe as mp
+    except ImportError:
+        return None
+    mesh = mp.solutions.face_mesh.FaceMesh(static_image_mode=True, refine_landmarks=True)
+    return mesh.process
+
+
+def _rss_mb() -> float:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def static_mode_cost(size: int, repeat: int, students: int):
+    """
+    Static image mode re-runs the short-range face detector (the model FaceMesh
+    runs before the landmark model) on every frame. It is timed on the ROI input;
+    the alternative, a tracking-mode graph per student, is priced in memory.
+    """
+    import mediapipe as mp
+
+    image = np.random.default_rng(0).integers(0, 256, (size, size, 3), dtype=np.uint8)
+    detector = mp.solutions.face_detection.FaceDetection(model_selection=0)
+    detect_ms = measure(lambda: detector.process(image), repeat=repeat)[0]
+    graphs, before = [], _rss_mb()
+    for _ in range(4):
+        graphs.append(mp.solutions.face_mesh.FaceMesh(static_image_mode=False, refine_landmarks=True))
+        graphs[-1].process(image)
+    graph_mb = (_rss_mb() - before) / len(graphs)
+    print(f"static_image_mode: face detector {detect_ms:.2f} ms per frame at {size}x{size}")
+    print(f"tracking graph per student: {graph_mb:.1f} MB each, {graph_mb * students / 1024:.1f} GB"
+          f" for {students} students")
+
+
+def emulated_mesh(rgb: np.ndarray):
+    image_frame = rgb.copy()
+    cv2.resize(image_frame, (128, 128), interpolation=cv2.INTER_LINEAR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--roi-size', type=int, default=256)
+    parser.add_argument('--padding', type=float, default=0.25)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--students', type=int, default=1000)
+    args = parser.parse_args()
+
+    process = mediapipe_mesh()
+    label = 'FaceMesh.process' if process else 'input handling only (MediaPipe not installed)'
+    process = process or emulated_mesh
+    tracker = FaceRoiTracker(args.padding, args.roi_size)
+    print(f"timing: {label}")
+    print(f"{'input':<8}{'roi box':>14}{'full ms':>10}{'roi ms':>10}{'saving':>9}")
+
+    for width, height in ((1280, 720), (1920, 1080)):
+        frame = synthetic_frame(width, height)
+        box = tracker.box(face_points(width, height), width, height)
+        rgb = np.empty_like(frame)
+
+        def full():
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+            process(rgb)
+
+        roi_rgb = np.empty((args.roi_size, args.roi_size, 3), np.uint8)
+
+        def roi():
+            cv2.cvtColor(tracker.crop(frame, box), cv2.COLOR_BGR2RGB, dst=roi_rgb)
+            process(roi_rgb)
+
+        full_ms = measure(full, repeat=args.repeat)[0]
+        roi_ms = measure(roi, repeat=args.repeat)[0]
+        side = box[2] - box[0]
+        print(f"{height}p{'':<3}{f'{side}x{side}':>14}{full_ms:>10.2f}{roi_ms:>10.2f}{full_ms / roi_ms:>8.1f}x")
+
+    if process is not emulated_mesh:
+        static_mode_cost(args.roi_size, args.repeat, args.students)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Duplicate-frame gating: skip ratio on a still-then-moving webcam sequence, the
+cost of the gate itself, and (with --weights) CPU per frame of
+FrameAnalyzer.analyze with gating on and off.
+
+    python -m benchmarks.frame_gating [--frames 240 --threshold 2.0 --weights models/best.pt]
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks import setup_django, synthetic_frame
+
+
+def webcam_sequence(count: int, width: int = 640, height: int = 480, seed: int = 0):
+    """
+    A student who mostly sits still (sensor noise only) and moves their head for one
+    second out of every five, at 2 frames/sec.
+    """
+    rng = np.random.default_rng(seed)
+    base = synthetic_frame(width, height, seed=seed)
+    frames = []
+    for i in range(count):
+        shift = int(25 * np.sin(i / 2)) if i % 10 in (8, 9) else 0
+        frame = np.roll(base, shift, axis=1)
+        noise = rng.normal(0, 4, frame.shape).astype(np.int16)
+        frames.append(np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8))
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frames', type=int, default=240)
+    parser.add_argument('--threshold', type=float, default=2.0)
+    parser.add_argument('--max-age', type=float, default=3.0)
+    parser.add_argument('--weights', type=Path, help='also time the full analyzer (needs the models)')
+    args = parser.parse_args()
+
+    from integrity_app.gating import FrameGate
+    from integrity_app.sessions import MonitorSession
+    from integrity_app.tracking import small_grey
+
+    frames = webcam_sequence(args.frames)
+    gate = FrameGate(args.threshold, args.max_age)
+    session = MonitorSession('bench')
+    gate_ms = []
+    for frame in frames:
+        start = time.perf_counter()
+        thumb = gate.thumbnail(small_grey(frame))
+        cached = gate.check(thumb, session, render=False)
+        gate_ms.append((time.perf_counter() - start) * 1000)
+        if cached is None:
+            gate.store(thumb, session, {'face': {}}, render=False)
+    stats = gate.stats()
+    print(f"gate only: skipped {stats['skipped']}/{stats['checked']} ({stats['skip_ratio']:.0%}), "
+          f"cost p50 {np.median(gate_ms):.2f} ms, change score {stats['change_score']}")
+
+    if args.weights is None:
+        return
+    setup_django()
+    from integrity_app.analyzers import FrameAnalyzer
+    from integrity_app.monitoring import FaceMonitor
+
+    for threshold in (0.0, args.threshold):
+        analyzer = FrameAnalyzer(args.weights, FaceMonitor(), gate_threshold=threshold, gate_max_age=args.max_age)
+        session = MonitorSession('bench')
+        analyzer.analyze(frames[0], session)
+        cpu0, wall0 = time.process_time(), time.perf_counter()
+        for frame in frames:
+            analyzer.analyze(frame, session)
+        cpu = (time.process_time() - cpu0) * 1000 / len(frames)
+        wall = (time.perf_counter() - wall0) * 1000 / len(frames)
+        print(f"analyze, gate threshold {threshold}: {cpu:.1f} cpu ms/frame, {wall:.1f} wall ms/frame, "
+              f"skip ratio {analyzer.gate.stats()['skip_ratio']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compares the legacy base64 form-post ingest path of process_frame with the raw
+binary path: bytes on the wire and server CPU time to get from request to frame.
+Then, per upload resolution, the decode and resize time to reach the analysis
+size (--max-side): full decode plus resize versus reduced-scale JPEG decode plus
+the remaining resize.
+
+    python -m benchmarks.frame_ingest [--width 640 --height 480 --repeat 200 --max-side 640]
+"""
+import argparse
+import base64
+from urllib.parse import quote
+
+import cv2
+import numpy as np
+
+from benchmarks import encode_jpeg, measure, setup_django, synthetic_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--max-side', type=int, default=640)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test import RequestFactory
+    from integrity_app.frames import downscale, jpeg_size, read_frame, reduced_decode_flag
+
+    jpeg = encode_jpeg(synthetic_frame(args.width, args.height))
+    data_url = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode('ascii')
+    form_body = 'image=' + quote(data_url, safe='')
+    factory = RequestFactory()
+
+    def legacy_request():
+        return factory.post('/process-frame/', form_body,
+                            content_type='application/x-www-form-urlencoded')
+
+    def multipart_request():
+        upload = SimpleUploadedFile('frame.jpg', jpeg, content_type='image/jpeg')
+        return factory.post('/process-frame/', {'image': upload})
+
+    def raw_request():
+        return factory.post('/process-frame/', jpeg, content_type='image/jpeg')
+
+    modes = (
+        ('form/base64', legacy_request),
+        ('multipart', multipart_request),
+        ('raw body', raw_request),
+    )
+    reference = read_frame(raw_request())
+    for _, build in modes:
+        assert (read_frame(build()) == reference).all()
+
+    print(f"Frame {args.width}x{args.height}, JPEG payload {len(jpeg)} bytes")
+    print(f"{'mode':<12}{'wire bytes':>12}{'overhead':>10}{'wall ms':>10}{'cpu ms':>10}")
+    for name, build in modes:
+        wire = len(build().body)
+        wall, cpu = measure(lambda: read_frame(build()), repeat=args.repeat)
+        print(f"{name:<12}{wire:>12}{wire / len(jpeg) - 1:>10.0%}{wall:>10.3f}{cpu:>10.3f}")
+
+    print(f"\nDecode + resize to a longest side of {args.max_side} px (wall ms per frame)")
+    print(f"{'upload':<11}{'decode':<10}{'decoded':>11}{'decode ms':>11}{'resize ms':>11}{'total ms':>10}")
+    for width, height in ((640, 480), (1280, 720), (1920, 1080)):
+        data = np.frombuffer(encode_jpeg(synthetic_frame(width, height)), np.uint8)
+        for name, flag in (('full', cv2.IMREAD_COLOR),
+                           ('reduced', reduced_decode_flag(jpeg_size(data.tobytes()), args.max_side))):
+            decoded = cv2.imdecode(data, flag)
+            decode_ms = measure(lambda: cv2.imdecode(data, flag), repeat=args.repeat)[0]
+            resize_ms = measure(lambda: downscale(decoded, args.max_side), repeat=args.repeat)[0]
+            shape = f"{decoded.shape[1]}x{decoded.shape[0]}"
+            print(f"{f'{width}x{height}':<11}{name:<10}{shape:>11}{decode_ms:>11.2f}{resize_ms:>11.2f}"
+                  f"{decode_ms + resize_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
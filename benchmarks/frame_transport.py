@@ -0,0 +1,91 @@
+"""
+Per-frame transport overhead of the HTTP process_frame view versus the WebSocket
+FrameConsumer, and the students one worker could serve at 2 frames/sec each.
+
+Analysis is replaced by a constant result so that only transport, auth, session
+lookup, decode and serialization are measured; pass --analysis-ms with the
+measured analyzer cost (see analyze_alloc) to include it in the capacity estimate.
+Runs against a throwaway in-memory test database.
+
+    python -m benchmarks.frame_transport [--frames 500 --analysis-ms 40]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import encode_jpeg, setup_django, synthetic_frame
+
+FRAMES_PER_SECOND_PER_STUDENT = 2
+
+
+class _ConstantAnalyzer:
+    def analyze(self, frame, session, render=False):
+        return {'face_status': 'Normal Behavior', 'face': {'face_detected': True}, 'detections': [],
+                'detections_source': 'fresh', 'frame_size': [frame.shape[1], frame.shape[0]], 'gated': False}
+
+
+def bench_http(user, body, frames):
+    from django.test import Client
+    client = Client(HTTP_HOST='localhost')
+    client.force_login(user)
+    url = '/process-frame/?attempt=00000000-0000-0000-0000-000000000001'
+    for _ in range(10):
+        client.post(url, body, content_type='image/jpeg')
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    for _ in range(frames):
+        response = client.post(url, body, content_type='image/jpeg')
+        assert response.status_code == 200, response.status_code
+    return (time.perf_counter() - wall0) * 1000 / frames, (time.process_time() - cpu0) * 1000 / frames
+
+
+async def _bench_ws(user, body, frames):
+    from channels.routing import URLRouter
+    from channels.testing import WebsocketCommunicator
+    from integrity_app.routing import websocket_urlpatterns
+
+    communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns),
+                                         '/ws/frames/00000000-0000-0000-0000-000000000001/')
+    communicator.scope['user'] = user
+    connected, _ = await communicator.connect()
+    assert connected
+    for _ in range(10):
+        await communicator.send_to(bytes_data=body)
+        await communicator.receive_from(timeout=10)
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    for _ in range(frames):
+        await communicator.send_to(bytes_data=body)
+        await communicator.receive_from(timeout=10)
+    result = (time.perf_counter() - wall0) * 1000 / frames, (time.process_time() - cpu0) * 1000 / frames
+    await communicator.disconnect()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frames', type=int, default=500)
+    parser.add_argument('--analysis-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from django.contrib.auth import get_user_model
+    from integrity_app import pipeline
+
+    settings.ALLOWED_HOSTS = ['localhost']
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    user = get_user_model().objects.create_user('bench-student', password='x', user_type='student')
+    pipeline._frame_analyzer = _ConstantAnalyzer()
+    body = encode_jpeg(synthetic_frame())
+
+    print(f"{'path':<10}{'wall ms':>9}{'cpu ms':>9}{'students/worker':>17}")
+    for name, (wall, cpu) in (('http', bench_http(user, body, args.frames)),
+                              ('websocket', asyncio.run(_bench_ws(user, body, args.frames)))):
+        students = 1000 / ((cpu + args.analysis_ms) * FRAMES_PER_SECOND_PER_STUDENT)
+        print(f"{name:<10}{wall:>9.2f}{cpu:>9.2f}{students:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
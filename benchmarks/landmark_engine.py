@@ -0,0 +1,215 @@
+"""
+Micro-benchmark and equivalence check for the vectorized landmark engine against
+the previous per-landmark Python implementation of the gaze/head rules.
+
+Fixtures are (N, 478, 3) float32 arrays of MediaPipe landmarks. Recorded sessions
+can be passed with --fixture file.npy (integrity_app/testdata/landmarks.npy is a
+small recorded set, also used by the tests); otherwise a deterministic synthetic
+set covering centred, averted-gaze and head-turned poses is generated.
+
+    python -m benchmarks.landmark_engine [--fixture integrity_app/testdata/landmarks.npy --repeat 5]
+
+When mediapipe is installed the "incl. conversion" row starts from real
+NormalizedLandmarkList messages, as FaceMonitor.evaluate does; otherwise from plain
+Python point objects.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from integrity_app import landmarks as lm
+
+
+def _landmark_messages(fixtures):
+    try:
+        from mediapipe.framework.formats import landmark_pb2
+    except ImportError:
+        return None
+    messages = []
+    for face in fixtures:
+        message = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z in face.tolist():
+            message.landmark.add(x=x, y=y, z=z)
+        messages.append(message)
+    return messages
+
+
+class _Point:
+    # Stand-in for the MediaPipe NormalizedLandmark protobuf.
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+
+# ---------------- Previous implementation (reference) ----------------
+def _dist(p1, p2):
+    return ((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2) ** 0.5
+
+
+def legacy_eye_gaze_ratio(landmarks, center_tolerance=0.10):
+    if len(landmarks) >= 478:
+        suspicious_conditions = []
+        for side, idx, iris in (("Left", (33, 133, 159, 145), landmarks[473:478]),
+                                ("Right", (263, 362, 386, 374), landmarks[468:473])):
+            boundaries = [landmarks[i] for i in idx]
+            center = (sum(p.x for p in boundaries) / 4.0, sum(p.y for p in boundaries) / 4.0)
+            iris_center = (sum(p.x for p in iris) / len(iris), sum(p.y for p in iris) / len(iris))
+            for boundary, label in zip(boundaries, ["Outer", "Inner", "Top", "Bottom"]):
+                eye_boundary = (boundary.x, boundary.y)
+                d_baseline = _dist(center, eye_boundary)
+                d_iris = _dist(iris_center, eye_boundary)
+                if d_baseline > 0 and d_iris < 0.1 * d_baseline:
+                    suspicious_conditions.append(f"{side} {label}")
+        if suspicious_conditions:
+            return False, "Suspicious: " + ", ".join(suspicious_conditions)
+        return True, "Normal Behavior"
+    mid_x = (landmarks[33].x + landmarks[263].x) / 2
+    if abs(mid_x - 0.5) > center_tolerance:
+        return False, "Brief: Looking Left" if mid_x < 0.5 else "Brief: Looking Right"
+    avg_y = (landmarks[133].y + landmarks[362].y) / 2
+    if avg_y < 0.5 - 0.15:
+        return False, "Brief: Looking Up"
+    elif avg_y > 0.5 + 0.10:
+        return False, "Brief: Looking Down"
+    return True, "Normal Behavior"
+
+
+def legacy_eye_gaze_horizontal(landmarks, center_tolerance=0.10):
+    if len(landmarks) >= 478:
+        suspicious_conditions = []
+        norms = []
+        for a, b, iris in ((33, 133, landmarks[473:478]), (362, 263, landmarks[468:473])):
+            x_min = min(landmarks[a].x, landmarks[b].x)
+            x_max = max(landmarks[a].x, landmarks[b].x)
+            iris_x = sum(p.x for p in iris) / len(iris)
+            norms.append((iris_x - x_min) / (x_max - x_min) if (x_max - x_min) else 0.5)
+        if norms[0] < 0.10:
+            suspicious_conditions.append("Left Outer")
+        if norms[0] > 0.90:
+            suspicious_conditions.append("Left Inner")
+        if norms[1] < 0.10:
+            suspicious_conditions.append("Right Inner")
+        if norms[1] > 0.90:
+            suspicious_conditions.append("Right Outer")
+        if suspicious_conditions:
+            return False, "Suspicious: " + ", ".join(suspicious_conditions)
+        return True, "Normal Behavior"
+    mid_x = (landmarks[33].x + landmarks[263].x) / 2
+    if abs(mid_x - 0.5) > center_tolerance:
+        return False, "Brief: Looking Left" if mid_x < 0.5 else "Brief: Looking Right"
+    return True, "Normal Behavior"
+
+
+def legacy_head_movement(landmarks, center_tolerance=0.10):
+    nose = landmarks[1]
+    if abs(nose.x - 0.5) > center_tolerance:
+        return False, "Brief: Head Rotated Left" if nose.x < 0.5 else "Brief: Head Rotated Right"
+    if nose.y < 0.4:
+        return False, "Brief: Head Moved Up"
+    elif nose.y > 0.6:
+        return True, "Fully Acceptable: Head Moved Down"
+    return True, "Normal Behavior"
+
+
+# ---------------- Fixtures ----------------
+def synthetic_fixtures(count: int, seed: int = 0) -> np.ndarray:
+    """
+    Faces at random positions/scales with the irises placed anywhere from the eye
+    centre to beyond the corners, so every status branch is exercised.
+    """
+    rng = np.random.default_rng(seed)
+    faces = rng.uniform(0.0, 1.0, (count, lm.NUM_REFINED_LANDMARKS, 3)).astype(np.float32)
+    for face in faces:
+        cx, cy = rng.uniform(0.3, 0.7, 2)
+        scale = rng.uniform(0.05, 0.2)
+        face[lm.NOSE_TIP, :2] = (cx, cy)
+        for side, eye in zip((-1, 1), lm.EYE_BOUNDARIES):
+            ex, ey = cx + side * scale, cy - scale * 0.6
+            w, h = scale * 0.5, scale * 0.2
+            face[eye, 0] = (ex - side * w, ex + side * w, ex, ex)
+            face[eye, 1] = (ey, ey, ey - h, ey + h)
+        for eye, iris in zip(lm.EYE_BOUNDARIES, lm.IRISES):
+            centre = face[eye, :2].mean(axis=0) + rng.uniform(-1.2, 1.2, 2) * (face[eye[1], 0] - face[eye[0], 0]) / 2
+            face[iris, :2] = centre + rng.normal(0, scale * 0.02, (5, 2))
+    return faces
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--fixture', help='.npy file of recorded (N, 478, 3) landmarks')
+    parser.add_argument('--count', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    fixtures = np.load(args.fixture).astype(np.float32) if args.fixture else synthetic_fixtures(args.count)
+    protos = [[_Point(*p) for p in face] for face in fixtures]
+    messages = _landmark_messages(fixtures)
+    sources = messages if messages is not None else protos
+
+    pairs = (
+        ('eye gaze (ratio)', legacy_eye_gaze_ratio, lm.check_eye_gaze_ratio),
+        ('eye gaze (horizontal)', legacy_eye_gaze_horizontal, lm.check_eye_gaze_horizontal),
+        ('head movement', legacy_head_movement, lm.check_head_movement),
+    )
+
+    # Equivalence on every fixture, for the refined (478) and fallback (468) paths.
+    mismatches = 0
+    statuses = set()
+    for face, proto in zip(fixtures, protos):
+        for n in (478, 468):
+            for _, legacy, vectorized in pairs:
+                expected = legacy(proto[:n], 0.10)
+                actual = vectorized(face[:n], 0.10)
+                statuses.add(expected[1])
+                mismatches += expected != actual
+    # Batched flags over every fixture at once must agree with the per-frame rule.
+    flags = lm.gaze_flags(fixtures)
+    for face_flags, face in zip(flags, fixtures):
+        mismatches += bool(face_flags.any()) == lm.check_eye_gaze_ratio(face, 0.10)[0]
+    if messages is not None:
+        mismatches += sum(not np.array_equal(lm.to_array(m), face) for m, face in zip(messages, fixtures))
+    print(f"{len(fixtures)} fixtures, {len(statuses)} distinct statuses, {mismatches} mismatches")
+
+    # Per-frame cost: legacy runs all rules on protobuf-like points; the engine
+    # converts to an array once and then runs the same rules.
+    def run_legacy():
+        for proto in protos:
+            legacy_eye_gaze_ratio(proto)
+            legacy_head_movement(proto)
+
+    def run_vectorized():
+        for source in sources:
+            points = lm.to_array(source)
+            lm.check_eye_gaze_ratio(points, 0.10)
+            lm.check_head_movement(points, 0.10)
+
+    def run_vectorized_rules_only():
+        for face in fixtures:
+            lm.check_eye_gaze_ratio(face, 0.10)
+            lm.check_head_movement(face, 0.10)
+
+    def run_batched():
+        # Many frames at once, e.g. a backlog of client-side landmarks.
+        lm.gaze_flags(fixtures)
+        lm.iris_horizontal_position(fixtures)
+
+    source = 'protobuf' if messages is not None else 'py objects'
+    print(f"{'implementation':<34}{'us/frame':>10}")
+    for name, fn in (('legacy (python loops)', run_legacy),
+                     (f'engine (incl. {source} conversion)', run_vectorized),
+                     ('engine (rules only)', run_vectorized_rules_only),
+                     ('engine (batched, all frames)', run_batched)):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        elapsed = (time.perf_counter() - start) / (args.repeat * len(fixtures)) * 1e6
+        print(f"{name:<34}{elapsed:>10.1f}")
+
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
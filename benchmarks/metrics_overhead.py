@@ -0,0 +1,51 @@
+"""
+Cost of the pipeline instrumentation per frame, with metrics enabled and disabled.
+A frame passes through roughly ten stages (decode, gate, face, objects, detect,
+encode, serialize, total, in-flight and the frame counter).
+
+    python -m benchmarks.metrics_overhead [--frames 100000]
+"""
+import argparse
+import time
+
+from integrity_app.metrics import Metrics
+
+
+def instrumented_frame(m):
+    with m.in_flight_request(), m.stage('total'):
+        with m.stage('imdecode'):
+            pass
+        with m.stage('gate'):
+            pass
+        with m.stage('face'):
+            pass
+        with m.stage('objects'):
+            with m.stage('detect'):
+                pass
+        with m.stage('serialize'):
+            pass
+    m.frame_done()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frames', type=int, default=100000)
+    args = parser.parse_args()
+
+    for label, enabled in (('disabled', False), ('enabled', True)):
+        m = Metrics(enabled=enabled)
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            instrumented_frame(m)
+        per_frame_us = (time.perf_counter() - start) / args.frames * 1e6
+        print(f"{label:<9} {per_frame_us:6.2f} us/frame")
+    render = Metrics(enabled=True)
+    for _ in range(1000):
+        instrumented_frame(render)
+    start = time.perf_counter()
+    text = render.render_prometheus()
+    print(f"scrape    {(time.perf_counter() - start) * 1000:6.2f} ms, {len(text)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Measures memory per concurrent student held by the SessionRegistry and checks
+that it stays flat as the number of sessions grows and idle ones are evicted.
+
+    python -m benchmarks.session_memory [--students 200 1000 5000]
+"""
+import argparse
+import time
+import tracemalloc
+
+from integrity_app.sessions import SessionRegistry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--students', type=int, nargs='+', default=[200, 1000, 5000])
+    args = parser.parse_args()
+
+    print(f"{'students':>10}{'traced bytes':>15}{'bytes/student':>15}{'registry est.':>15}")
+    for count in args.students:
+        tracemalloc.start()
+        registry = SessionRegistry(ttl=300, max_sessions=count)
+        for i in range(count):
+            registry.get(f"{i}:attempt-{i:08d}")
+        traced, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        est = registry.stats()['bytes_per_session']
+        print(f"{count:>10}{traced:>15}{traced / count:>15.0f}{est:>15.0f}")
+
+    # Eviction: sessions idle past the TTL are dropped on the next access.
+    registry = SessionRegistry(ttl=0.05, max_sessions=10_000)
+    for i in range(1000):
+        registry.get(f"{i}:")
+    time.sleep(0.1)
+    registry.get("late:")
+    print(f"after TTL expiry: {len(registry)} live session(s), {registry.evicted} evicted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Speech backend throughput: --streams live streams each send --chunks chunks of
+speech at once through MultiLanguageRecognizer (English and Arabic), for every
+backend that can be loaded here. Engines that batch are run twice, one chunk per
+call and with chunks from concurrent streams batched. Reports chunks/s, chunk
+latency and CPU per chunk in this process (where the offline engines run; the
+network backends' cost is on the provider's side).
+
+The audio is synthetic voiced speech, so transcripts are meaningless; only cost is
+measured. Backends are skipped with the reason when their package, model or
+service is unavailable: vosk needs the vosk package and a model directory per
+language (--vosk-en / --vosk-ar), google and gcp need network access (and gcp
+credentials). The stub's per-call latency (--stub-latency) is the same whatever
+the batch size, so its batched figures show the ceiling batching allows, not an
+engine's.
+
+    python -m benchmarks.speech_backends [--backends stub,vosk,google --streams 8 --chunks 4]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from integrity_app.audio import SAMPLE_RATE
+from integrity_app.recognition import OK, MultiLanguageRecognizer
+from integrity_app.speech import load_backend
+
+LANGUAGES = {'English': 'en', 'Arabic': 'ar'}
+
+
+def speech_pcm(seconds: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = rng.uniform(100, 200) * (1 + 0.1 * np.sin(2 * np.pi * 0.7 * t))
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t) * 3, 0, 1)
+    signal = 0.2 * voiced * syllables + 0.005 * rng.normal(size=t.shape)
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+
+
+def load(name: str, args):
+    backend = load_backend(name, timeout=args.timeout, stub_latency=args.stub_latency,
+                           vosk_models={'en': args.vosk_en, 'ar': args.vosk_ar}, max_batch=args.max_batch)
+    # One call per language up front: loads models, opens connections, and fails fast.
+    for code in LANGUAGES.values():
+        backend.transcribe(speech_pcm(0.5), code)
+    return backend
+
+
+def run(backend, max_batch: int, streams: int, chunks: list, args) -> dict:
+    backend.max_batch = max_batch
+    recognizer = MultiLanguageRecognizer(backend, workers=args.workers, timeout=args.timeout,
+                                         max_wait_ms=args.batch_wait_ms)
+    latencies, ok = [], 0
+
+    def stream(i):
+        out = []
+        for pcm in chunks[i]:
+            start = time.perf_counter()
+            results = recognizer.recognize(pcm, LANGUAGES)
+            out.append(((time.perf_counter() - start) * 1000, sum(r.status == OK for r in results.values())))
+        return out
+
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    with ThreadPoolExecutor(max_workers=streams) as clients:
+        for out in clients.map(stream, range(streams)):
+            latencies += [ms for ms, _ in out]
+            ok += sum(n for _, n in out)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    latencies.sort()
+    stats = recognizer.stats()
+    return {'chunks_s': len(latencies) / wall, 'p50': latencies[len(latencies) // 2],
+            'p95': latencies[int(len(latencies) * 0.95)], 'cpu_ms': cpu * 1000 / len(latencies),
+            'batch': stats['mean_batch_size'], 'ok': ok / (len(latencies) * len(LANGUAGES))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--backends', default='stub,vosk,google,gcp')
+    parser.add_argument('--streams', type=int, default=8, help='concurrent live streams')
+    parser.add_argument('--chunks', type=int, default=4, help='chunks per stream')
+    parser.add_argument('--chunk-seconds', type=float, default=2.0)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--max-batch', type=int, default=8)
+    parser.add_argument('--batch-wait-ms', type=float, default=20.0)
+    parser.add_argument('--stub-latency', type=float, default=0.3)
+    parser.add_argument('--vosk-en', default='models/vosk-en')
+    parser.add_argument('--vosk-ar', default='models/vosk-ar')
+    args = parser.parse_args()
+
+    chunks = [[speech_pcm(args.chunk_seconds, seed=s * args.chunks + c) for c in range(args.chunks)]
+              for s in range(args.streams)]
+    print(f"{args.streams} streams x {args.chunks} chunks of {args.chunk_seconds:g} s, "
+          f"{len(LANGUAGES)} languages, pool of {args.workers}")
+    print(f"{'backend':<18}{'chunks/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'cpu ms/chunk':>14}{'batch':>7}{'answered':>10}")
+    for name in args.backends.split(','):
+        try:
+            backend = load(name, args)
+        except Exception as e:
+            print(f"{name:<18}skipped: {type(e).__name__}: {e}")
+            continue
+        sizes = (1, args.max_batch) if backend.max_batch > 1 else (1,)
+        for size in sizes:
+            r = run(backend, size, args.streams, chunks, args)
+            label = name if size == 1 else f"{name} batched"
+            print(f"{label:<18}{r['chunks_s']:>9.1f}{r['p50']:>9.0f}{r['p95']:>9.0f}{r['cpu_ms']:>14.2f}"
+                  f"{r['batch']:>7.1f}{r['ok']:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
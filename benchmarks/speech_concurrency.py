@@ -0,0 +1,104 @@
+"""
+Multi-language recognition latency: one recognize_google call per language in turn
+(the previous loop) versus MultiLanguageRecognizer, which runs the languages of a
+chunk concurrently on a bounded shared pool. `--students` chunks arrive at once,
+as when a class uploads together, so the pool bound is exercised too.
+
+Runs offline against speech.StubBackend, which answers after --latency
+seconds (a typical Web Speech round trip), plus --slow-every: every Nth call on
+that language takes --slow-latency instead, to show the per-call timeout.
+
+    python -m benchmarks.speech_concurrency [--students 8 --workers 16 --latency 0.3]
+"""
+import argparse
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from integrity_app.recognition import TIMEOUT, UNAVAILABLE, MultiLanguageRecognizer
+from integrity_app.speech import StubBackend
+
+LANGUAGES = {'English': 'en', 'Arabic': 'ar'}
+
+
+class SlowTail(StubBackend):
+    """Every `every`th call for `language` takes `slow` seconds; one chunk per call."""
+    def __init__(self, latency, slow, every, language='ar'):
+        super().__init__(latency, max_batch=1)
+        self.slow, self.every, self.language = slow, every, language
+        self._count = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def delay(self, language):
+        if self.every and language == self.language:
+            with self._lock:
+                if next(self._count) % self.every == 0:
+                    return self.slow
+        return self.latency
+
+
+def sequential(backend, pcm):
+    results = {}
+    for lang, code in LANGUAGES.items():
+        results[lang] = backend.transcribe(pcm, code)
+    return results
+
+
+def run(fn, students: int, rounds: int) -> list:
+    """Chunk latencies (ms) for `rounds` rounds of `students` simultaneous chunks."""
+    latencies = []
+
+    def one():
+        start = time.perf_counter()
+        fn()
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=students) as clients:
+        for _ in range(rounds):
+            latencies += clients.map(lambda _: one(), range(students))
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--students', type=int, default=8, help='chunks arriving at once')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=16, help='shared recognition pool size')
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--timeout', type=float, default=1.0)
+    parser.add_argument('--slow-every', type=int, default=10)
+    parser.add_argument('--slow-latency', type=float, default=3.0)
+    args = parser.parse_args()
+
+    # The sequential path has no timeout, as before; the pool path cuts calls off at --timeout.
+    backend = SlowTail(args.latency, args.slow_latency, args.slow_every)
+    pcm = (np.sin(np.arange(16000 * 3) / 5) * 8000).astype(np.int16)
+    logging.getLogger('integrity_app.recognition').setLevel(logging.CRITICAL)
+    cut_off = []
+    rows = [('sequential', run(lambda: sequential(backend, pcm), args.students, args.rounds))]
+    backend.timeout = args.timeout
+    recognizer = MultiLanguageRecognizer(backend, workers=args.workers, timeout=args.timeout)
+    # A slow call ends as TIMEOUT or, when the backend's own timeout fires first, as UNAVAILABLE.
+    rows.append(('concurrent pool', run(lambda: cut_off.extend(
+        r.status in (TIMEOUT, UNAVAILABLE) for r in recognizer.recognize(pcm, LANGUAGES).values()),
+        args.students, args.rounds)))
+
+    print(f"{len(LANGUAGES)} languages, {args.latency * 1000:.0f} ms per call, every {args.slow_every}th Arabic "
+          f"call {args.slow_latency * 1000:.0f} ms; {args.students} chunks at once, pool of {args.workers}, "
+          f"timeout {args.timeout * 1000:.0f} ms")
+    print(f"{'path':<18}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+    for name, lat in rows:
+        print(f"{name:<18}{lat[len(lat) // 2]:>9.0f}{lat[int(len(lat) * 0.95)]:>9.0f}{lat[-1]:>9.0f}")
+    print(f"language results cut off at the timeout: {sum(cut_off)}/{len(cut_off)} "
+          f"(sequential waits for every slow call)")
+    stats = recognizer.stats()
+    print(f"pool: {stats['calls']} calls, mean {stats['mean_call_ms']:.0f} ms per call "
+          f"(incl. queueing), {stats['mean_chunk_ms']:.0f} ms per chunk")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Startup cost of `manage.py check` (which imports the URLconf) and first-frame
+latency with and without warm-up. Each measurement runs in a fresh interpreter.
+
+    python -m benchmarks.startup [--repeat 3] [--skip-frames]
+
+Compare against the previous tree by running the same command on a checkout of
+the commit before lazy loading.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+FIRST_FRAME = r'''
+import time
+from benchmarks import setup_django, synthetic_frame
+setup_django()
+from integrity_app import pipeline
+from integrity_app.sessions import MonitorSession
+if {warm}:
+    pipeline.warmup()
+frame = synthetic_frame()
+t0 = time.perf_counter()
+pipeline.get_frame_analyzer().analyze(frame, MonitorSession('bench'))
+print((time.perf_counter() - t0) * 1000)
+'''
+
+HEAVY_MODULES = r'''
+from benchmarks import setup_django
+setup_django()
+import sys
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(",".join(m for m in ("torch", "ultralytics", "mediapipe", "pydub", "speech_recognition") if m in sys.modules))
+'''
+
+
+def _timed(cmd):
+    start = time.perf_counter()
+    out = subprocess.run(cmd, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if out.returncode:
+        raise SystemExit(f"{' '.join(cmd[:3])} failed:\n{out.stderr[-2000:]}")
+    return elapsed, out.stdout.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-frames', action='store_true', help="only time manage.py check (no models needed)")
+    args = parser.parse_args()
+
+    checks = [_timed([sys.executable, 'manage.py', 'check'])[0] for _ in range(args.repeat)]
+    print(f"manage.py check: median {statistics.median(checks):.2f}s over {args.repeat} runs")
+    _, heavy = _timed([sys.executable, '-c', HEAVY_MODULES])
+    print(f"heavy modules imported by the URLconf: {heavy or 'none'}")
+
+    if args.skip_frames:
+        return
+    for warm in (False, True):
+        _, latency = _timed([sys.executable, '-c', FIRST_FRAME.format(warm=warm)])
+        label = 'after warmup' if warm else 'cold'
+        print(f"first frame ({label}): {float(latency.splitlines()[-1]):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
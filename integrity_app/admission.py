@@ -0,0 +1,130 @@
+"""
+Backpressure for frame analysis.
+
+Per session: at most one frame is analysed at a time, plus one "latest" slot.
+A frame that arrives while another is in flight waits in the slot; a newer frame
+overwrites it, and the overwritten request returns at once as superseded, so a
+slow server never works through a backlog of stale frames.
+
+Globally: at most `max_concurrent` analyses run at once. Beyond that, requests
+are refused immediately (503 with Retry-After) together with a suggested capture
+interval that spreads the node's capacity over the online students.
+"""
+import math
+import threading
+
+
+class _Waiter:
+    __slots__ = ('event', 'superseded')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.superseded = False
+
+
+class Superseded(Exception):
+    def __init__(self, next_capture_ms: int):
+        super().__init__("A newer frame from this session replaced this one")
+        self.next_capture_ms = next_capture_ms
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after_ms: int, next_capture_ms: int):
+        super().__init__("Frame analysis capacity exhausted")
+        self.retry_after_ms = retry_after_ms
+        self.next_capture_ms = next_capture_ms
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int, base_interval_ms: int = 500, wait_timeout: float = 2.0,
+                 max_interval_ms: int = 5000):
+        self.max_concurrent = max_concurrent
+        self.base_interval_ms = base_interval_ms
+        self.wait_timeout = wait_timeout
+        self.max_interval_ms = max_interval_ms
+        self._lock = threading.Lock()
+        self.active = 0
+        self.admitted = 0
+        self.superseded = 0
+        self.rejected = 0
+        # Exponentially weighted mean analysis time, for the capture interval hint.
+        self.service_ms = 0.0
+
+    # ---------------- Per-session slots ----------------
+    def enter_session(self, session) -> bool:
+        """
+        Takes the session's in-flight slot, waiting in its latest slot if needed.
+        Returns False when this frame was superseded by a newer one (or waited
+        longer than wait_timeout) and should not be analysed.
+        """
+        with self._lock:
+            if not session.in_flight:
+                session.in_flight = True
+                return True
+            previous = session.waiting
+            if previous is not None:
+                previous.superseded = True
+                previous.event.set()
+            waiter = session.waiting = _Waiter()
+
+        waiter.event.wait(self.wait_timeout)
+        with self._lock:
+            if session.waiting is waiter:
+                # Timed out while still queued.
+                session.waiting = None
+                self.superseded += 1
+                return False
+            if waiter.superseded:
+                self.superseded += 1
+                return False
+            # leave_session handed the in-flight slot over to this frame.
+            return True
+
+    def leave_session(self, session):
+        with self._lock:
+            waiter = session.waiting
+            if waiter is not None:
+                session.waiting = None
+                waiter.event.set()
+            else:
+                session.in_flight = False
+
+    # ---------------- Global limit ----------------
+    def acquire(self, online_sessions: int):
+        """
+        Reserves one of the node's analysis slots or raises Overloaded.
+        """
+        with self._lock:
+            if self.active < self.max_concurrent:
+                self.active += 1
+                self.admitted += 1
+                return
+            self.rejected += 1
+            service_ms = self.service_ms
+        raise Overloaded(max(100, int(service_ms)), self.capture_interval_ms(online_sessions, service_ms))
+
+    def release(self, elapsed_ms: float):
+        with self._lock:
+            self.active -= 1
+            self.service_ms = elapsed_ms if not self.service_ms else 0.9 * self.service_ms + 0.1 * elapsed_ms
+
+    def capture_interval_ms(self, online_sessions: int, service_ms: float = None) -> int:
+        """
+        Capture interval at which every online student fits in the node's capacity:
+        students * service time / interval <= max_concurrent.
+        """
+        if service_ms is None:
+            service_ms = self.service_ms
+        needed = math.ceil(online_sessions * service_ms / self.max_concurrent) if self.max_concurrent else 0
+        return int(min(self.max_interval_ms, max(self.base_interval_ms, needed)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'active': self.active,
+                'admitted': self.admitted,
+                'superseded': self.superseded,
+                'rejected': self.rejected,
+                'service_ms': self.service_ms,
+            }
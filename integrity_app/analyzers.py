@@ -1,30 +1,175 @@
 import base64
-import datetime
 import logging
-from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from pathlib import Path
 
 import cv2
 import numpy as np
 import torch
 from ultralytics import YOLO
-from pydub import AudioSegment
-import speech_recognition as sr
 from django.conf import settings
 
+from . import recognition
+from .audio import AudioArchiver, decode_pcm
+from .client_inference import FULL_FRAME
+from .detectors import artifact_path, load_detector, resolve_classes
+from .frames import decode_frame_bytes, frame_buffers
+from .gating import FrameGate
+from .metrics import metrics
+from .tracking import ObjectTracker, small_grey
+from .vad import VoiceActivityDetector
+
 logger = logging.getLogger(__name__)
 
 
+def _percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(q / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class BatchingDetector:
+    """
+    Micro-batches YOLO inference across concurrent requests.
+
+    Callers submit single frames; a worker thread collects them until either
+    max_batch frames are queued or the oldest one has waited max_wait_ms, runs a
+    single batched model call and hands each caller its own result.
+    """
+    def __init__(self, model, device: str, max_batch: int = 8, max_wait_ms: float = 15.0,
+                 stats_window: int = 2048, predict_args: dict = None):
+        self.model = model
+        self.device = device
+        # Model call arguments shared with single-frame inference (imgsz, classes, conf).
+        self.predict_args = predict_args or {}
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+
+        # Metrics for tuning the window against tail latency.
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.frames = 0
+        self.batch_sizes = Counter()
+        self._wait_ms = deque(maxlen=stats_window)
+        self._infer_ms = deque(maxlen=stats_window)
+
+        self._worker = threading.Thread(target=self._loop, name='yolo-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, frame: np.ndarray) -> Future:
+        fut = Future()
+        self._queue.put((frame, fut, time.perf_counter()))
+        return fut
+
+    def predict(self, frame: np.ndarray):
+        return self.submit(frame).result()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Past the deadline, still take whatever is already queued.
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            try:
+                results = self.model([item[0] for item in batch], device=self.device, verbose=False,
+                                     **self.predict_args)
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Model returned {len(results)} results for a batch of {len(batch)}")
+            except Exception as e:
+                logger.error("Batched inference failed: %s", e)
+                for _, fut, _ in batch:
+                    fut.set_exception(e)
+                continue
+            end = time.perf_counter()
+            for (_, fut, _), result in zip(batch, results):
+                fut.set_result(result)
+
+            with self._stats_lock:
+                self.batches += 1
+                self.frames += len(batch)
+                self.batch_sizes[len(batch)] += 1
+                self._wait_ms.extend((start - queued) * 1000 for _, _, queued in batch)
+                self._infer_ms.append((end - start) * 1000)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            waits = sorted(self._wait_ms)
+            infer = sorted(self._infer_ms)
+            return {
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000,
+                'batches': self.batches,
+                'frames': self.frames,
+                'mean_batch_size': self.frames / self.batches if self.batches else 0.0,
+                'batch_size_histogram': dict(sorted(self.batch_sizes.items())),
+                'queue_depth': self._queue.qsize(),
+                'queue_wait_ms': {f'p{q}': _percentile(waits, q) for q in (50, 95, 99)},
+                'inference_ms': {f'p{q}': _percentile(infer, q) for q in (50, 95, 99)},
+            }
+
+
 class FrameAnalyzer:
     """
     Handles face monitoring and object detection on video frames.
+    With batch_size > 1, object detection goes through a shared BatchingDetector
+    so frames from concurrent requests are inferred together.
+    backend selects the detector runtime: 'torch' (the .pt weights on CUDA/MPS/CPU),
+    or 'onnx' / 'openvino' (exported, optionally int8, CPU only).
+    With detect_interval > 1 the detector runs only on each session's keyframes and
+    boxes are tracked in between (see tracking.ObjectTracker). With gate_threshold > 0
+    near-duplicate frames reuse the session's last result (see gating.FrameGate).
+    imgsz is the detector's input size, independent of the frame size the face mesh
+    sees (frames arrive already downscaled by frames.decode_frame_bytes).
     """
-    def __init__(self, weights_path: Path, face_monitor):
+    def __init__(self, weights_path: Path, face_monitor, batch_size: int = 1, batch_wait_ms: float = 15.0,
+                 workers: int = 4, backend: str = 'torch', int8: bool = False, calibration_dir=None,
+                 detect_interval: int = 1, motion_threshold: float = 6.0, gate_threshold: float = 0.0,
+                 gate_max_age: float = 3.0, imgsz: int = 640, classes=None, conf: float = 0.25):
         self.face_monitor = face_monitor
-        self.device = self._select_device()
-        # Load YOLO and move to correct device
-        self.model = YOLO(str(weights_path))
-        self.model.to(self.device)
+        self.imgsz = imgsz
+        self.conf = conf
+        self.tracker = ObjectTracker(detect_interval, motion_threshold)
+        self.gate = FrameGate(gate_threshold, gate_max_age)
+        # Long-lived pool for the face branch; object detection runs on the calling thread.
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='face-analyzer')
+        self.weights_path = Path(weights_path)
+        self.backend = backend
+        self.int8 = int8
+        if backend == 'torch':
+            self.device = self._select_device()
+            # Load YOLO and move to correct device
+            self.model = YOLO(str(weights_path))
+            self.model.to(self.device)
+        else:
+            self.device = 'cpu'
+            self.model = load_detector(weights_path, backend, int8, calibration_dir, imgsz)
+        self.names = self.model.names
+        # Class filtering and the confidence threshold run inside the model's NMS.
+        self.class_ids = resolve_classes(self.names, classes)
+        self.predict_args = {'imgsz': imgsz, 'conf': conf, 'classes': self.class_ids}
+        self.batcher = None
+        if batch_size > 1:
+            self.batcher = BatchingDetector(self.model, self.device, batch_size, batch_wait_ms,
+                                            predict_args=self.predict_args)
 
     def _select_device(self) -> str:
         if torch.cuda.is_available():
@@ -34,156 +179,238 @@ class FrameAnalyzer:
             return "mps"
         return "cpu"
 
-    def _run_face(self, frame: np.ndarray) -> np.ndarray:
-        return self.face_monitor.analyze_face(frame)
+    def _run_face(self, frame: np.ndarray, session, out=None) -> dict:
+        with metrics.stage('face'):
+            return self.face_monitor.evaluate(frame, session, out)
 
     def _run_object(self, frame: np.ndarray):
-        # run inference on selected device
-        return self.model(frame, device=self.device)[0]
+        with metrics.stage('detect'):
+            if self.batcher is not None:
+                return self.batcher.predict(frame)
+            # run inference on selected device
+            return self.model(frame, device=self.device, verbose=False, **self.predict_args)[0]
+
+    def model_memory(self) -> dict:
+        """
+        Approximate bytes held by the detector weights (parameters and buffers for
+        PyTorch, the exported file for ONNX/OpenVINO).
+        """
+        if self.backend == 'torch':
+            module = self.model.model
+            size = sum(t.numel() * t.element_size() for t in module.parameters())
+            size += sum(t.numel() * t.element_size() for t in module.buffers())
+            return {'detector': size}
+        path = artifact_path(self.weights_path, self.backend, self.int8)
+        files = path.rglob('*') if path.is_dir() else [path]
+        return {'detector': sum(f.stat().st_size for f in files if f.is_file())}
+
+    def stats(self) -> dict:
+        return {
+            'detector': {'backend': self.backend, 'int8': self.int8, 'device': self.device, 'imgsz': self.imgsz,
+                         'conf': self.conf,
+                         'classes': None if self.class_ids is None else [self.names[i] for i in self.class_ids]},
+            'batching': self.batcher.stats() if self.batcher is not None else None,
+            'tracking': self.tracker.stats(),
+            'gating': self.gate.stats(),
+            'face_mesh_pool': self.face_monitor.mesh_pool.stats(),
+            'face_roi': self.face_monitor.roi.stats(),
+            'frame_buffers': frame_buffers.stats(),
+        }
 
     def _encode_image(self, img: np.ndarray) -> str:
-        _, buf = cv2.imencode('.jpg', img)
+        with metrics.stage('encode'):
+            _, buf = cv2.imencode('.jpg', img)
         b64 = base64.b64encode(buf).decode('utf-8')
         return f"data:image/jpeg;base64,{b64}"
 
-    def analyze(self, frame: np.ndarray) -> dict:
-        # Run face and object detection in parallel
-        with ThreadPoolExecutor(max_workers=2) as exe:
-            f_face = exe.submit(self._run_face, frame.copy())
-            f_obj  = exe.submit(self._run_object, frame.copy())
-            face_img   = f_face.result()
-            det_result = f_obj.result()
-
-        # Parse detections
-        detections = []
-        names = self.model.names
-        for box, cls, conf in zip(
-            det_result.boxes.xyxy.tolist(),
-            det_result.boxes.cls.tolist(),
-            det_result.boxes.conf.tolist()
-        ):
-            x1, y1, x2, y2 = map(int, box)
-            detections.append({
-                'box': [x1, y1, x2, y2],
-                'class_id': int(cls),
-                'class_name': names[int(cls)],
-                'confidence': float(conf),
-            })
-
-        # Encode face image
-        face_url = self._encode_image(face_img)
-
-        # Annotate and encode object image
-        obj_img = frame.copy()
-        for d in detections:
-            x1, y1, x2, y2 = d['box']
-            cv2.rectangle(obj_img, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            cv2.putText(
-                obj_img,
-                f"{d['class_name']}:{d['confidence']:.2f}",
-                (x1, y1 - 5),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5, (0, 255, 0), 1
-            )
-        object_url = self._encode_image(obj_img)
+    def _parse_detections(self, det_result) -> list:
+        # boxes.data is one (n, 6) tensor: x1, y1, x2, y2, conf, cls. It is moved to
+        # NumPy in one transfer and only converted to Python for the JSON result.
+        data = det_result.boxes.data
+        if not len(data):
+            return []
+        data = data.cpu().numpy() if hasattr(data, 'cpu') else np.asarray(data)
+        names = self.names
+        return [
+            {'box': box, 'class_id': cls, 'class_name': names[cls], 'confidence': conf}
+            for box, conf, cls in zip(data[:, :4].astype(np.int32).tolist(), data[:, 4].tolist(),
+                                      data[:, 5].astype(np.int32).tolist())
+        ]
+
+    def _detect(self, view: np.ndarray, session, grey: np.ndarray, face_canvas=None):
+        # Face analysis on the pool, object detection on this thread, in parallel.
+        f_face = self.executor.submit(self._run_face, view, session, face_canvas)
+        try:
+            with metrics.stage('objects'):
+                detections, source = self.tracker.update(
+                    view, session, lambda: self._parse_detections(self._run_object(view)), grey)
+        finally:
+            wait([f_face])
+        return f_face.result(), detections, source
+
+    def analyze(self, frame: np.ndarray, session, render: bool = False) -> dict:
+        """
+        Returns structured results (status, flags, face landmarks, detection boxes,
+        and whether the boxes are 'fresh' from the detector or 'tracked').
+        With render=True the annotated face and object images are also drawn
+        server-side and returned as JPEG data URLs.
+        'gated' is True when the frame was a near-duplicate and the previous result
+        was reused with refreshed alert timers.
+        """
+        # Both detectors share one read-only view of the decoded frame.
+        view = frame.view()
+        view.flags.writeable = False
+        # One small greyscale copy serves the duplicate-frame gate and the tracker.
+        with metrics.stage('gate'):
+            grey = small_grey(view)
+            thumb = self.gate.thumbnail(grey)
+            cached = self.gate.check(thumb, session, render)
+        if cached is not None:
+            return {**cached, 'face': self.face_monitor.refresh(cached['face'], session), 'gated': True}
+
+        result = self._analyze(view, session, grey, render)
+        self.gate.store(thumb, session, result, render)
+        return {**result, 'gated': False}
+
+    def analyze_client(self, packet, session) -> dict:
+        """
+        Analyses a client-inference packet (see client_inference): the gaze/head rules
+        run on the browser's landmarks. An attached thumbnail goes through object
+        detection/tracking; an attached full frame is a spot check and goes through the
+        server face mesh instead, returned as 'server_landmarks' for comparison.
+        Results without an image carry no 'detections'.
+        """
+        with metrics.stage('client_face'):
+            face = self.face_monitor.evaluate_landmarks(packet.landmarks, session)
+        result = {'face_status': face['status'], 'face': face, 'client_inference': True}
+        if packet.image is None:
+            return result
+
+        frame = decode_frame_bytes(packet.image, settings.INTEGRITY_FRAME_MAX_SIDE)
+        view = frame.view()
+        view.flags.writeable = False
+        if packet.image_kind == FULL_FRAME:
+            with metrics.stage('face'):
+                result['server_landmarks'] = self.face_monitor.mesh_landmarks(view)
+            return result
+
+        with metrics.stage('objects'):
+            detections, source = self.tracker.update(
+                view, session, lambda: self._parse_detections(self._run_object(view)))
+        result.update(detections=detections, detections_source=source,
+                      frame_size=[view.shape[1], view.shape[0]])
+        return result
+
+    def _analyze(self, view: np.ndarray, session, grey: np.ndarray, render: bool) -> dict:
+        height, width = view.shape[:2]
+        if not render:
+            face, detections, source = self._detect(view, session, grey)
+            return {
+                'face_status': face['status'],
+                'face': face,
+                'detections': detections,
+                'detections_source': source,
+                'frame_size': [width, height],
+            }
+
+        with frame_buffers.borrow(view.shape) as face_canvas:
+            face, detections, source = self._detect(view, session, grey, face_canvas)
+            face_url = self._encode_image(face_canvas)
+
+        # Annotate and encode object image (the bare frame when nothing was found)
+        if not detections:
+            object_url = self._encode_image(view)
+        else:
+            with frame_buffers.borrow(view.shape) as obj_img:
+                with metrics.stage('annotate'):
+                    np.copyto(obj_img, view)
+                    for d in detections:
+                        x1, y1, x2, y2 = d['box']
+                        cv2.rectangle(obj_img, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                        cv2.putText(
+                            obj_img,
+                            f"{d['class_name']}:{d['confidence']:.2f}",
+                            (x1, y1 - 5),
+                            cv2.FONT_HERSHEY_SIMPLEX,
+                            0.5, (0, 255, 0), 1
+                        )
+                object_url = self._encode_image(obj_img)
 
         return {
             'face_image':   face_url,
-            'face_status':  self.face_monitor.current_status,
+            'face_status':  face['status'],
+            'face':         face,
             'object_image': object_url,
             'detections':   detections,
+            'detections_source': source,
+            'frame_size':   [width, height],
         }
 
 
 class AudioAnalyzer:
     """
-    Handles saving, format-conversion, and speech recognition for audio streams.
+    Decodes uploaded audio chunks in memory and runs speech recognition on them.
+    With archive=True the original recording is also kept as an MP3 under
+    media_root, encoded in the background (audio.AudioArchiver). With vad=True only
+    the speech segments are recognized, and chunks without speech are not sent.
+    Every language is recognized concurrently through `recognizer`
+    (recognition.MultiLanguageRecognizer, usually shared with SoundMonitor), on
+    whichever speech.SpeechBackend it was built with.
     """
-    def __init__(self, media_root: Path):
+    def __init__(self, media_root: Path, ffmpeg: str = 'ffmpeg', archive: bool = True, vad: bool = True,
+                 recognizer=None, languages=None):
         self.media_root = media_root
-
-    def _save_temp(self, data: bytes, prefix: str, ext: str) -> Path:
-        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        fp = self.media_root / f"{prefix}_{ts}.{ext}"
-        fp.parent.mkdir(parents=True, exist_ok=True)
-        with open(fp, "wb") as f:
-            f.write(data)
-        return fp
+        self.recognizer = recognizer if recognizer is not None else recognition.MultiLanguageRecognizer()
+        self.languages = languages if languages is not None else {'English': 'en', 'Arabic': 'ar'}
+        self.ffmpeg = ffmpeg
+        self.archiver = AudioArchiver(media_root, settings.MEDIA_URL, ffmpeg) if archive else None
+        self.vad = VoiceActivityDetector() if vad else None
 
     def process(self, webm_bytes: bytes) -> dict:
-        # Save WebM
-        try:
-            webm_fp = self._save_temp(webm_bytes, 'recording', 'webm')
-        except Exception as e:
-            logger.error("Saving WebM failed: %s", e)
-            return {'status':'failure','feedback':'Failed to save recording.'}
-
-        # Convert WebM to MP3 with fallbacks
+        # One decode, straight to 16 kHz mono PCM
         try:
-            audio = AudioSegment.from_file(webm_fp)
-        except Exception:
-            audio = None
-            for fmt in ('ogg', 'opus'):
-                try:
-                    audio = AudioSegment.from_file(webm_fp, format=fmt)
-                    break
-                except Exception:
-                    pass
-            if audio is None:
-                return {'status':'failure','feedback':'Failed to convert to MP3.'}
-
-        # Export MP3 (and keep it)
-        mp3_fp = webm_fp.with_suffix('.mp3')
-        try:
-            audio.export(mp3_fp, format='mp3')
-        except Exception as e:
-            logger.error("MP3 export failed: %s", e)
-            return {'status':'failure','feedback':'Failed to export MP3.'}
-
-        # Build the media URL for the MP3
-        mp3_url = settings.MEDIA_URL.rstrip('/') + '/' + mp3_fp.name
+            with metrics.stage('audio_decode'):
+                pcm = decode_pcm(webm_bytes, ffmpeg=self.ffmpeg)
+        except ValueError as e:
+            logger.error("Audio decode failed: %s", e)
+            return {'status':'failure','feedback':'Failed to decode recording.'}
 
-        # Remove original WebM
-        try:
-            webm_fp.unlink()
-        except:
-            pass
+        # Archival MP3, encoded off the request path
+        mp3_url = self.archiver.submit(webm_bytes) if self.archiver is not None else None
+        saved = f"Recording saved! MP3 available at: {mp3_url}\n\n" if mp3_url else ''
 
-        # Convert MP3 → WAV
-        wav_fp = mp3_fp.with_suffix('.wav')
-        try:
-            AudioSegment.from_file(mp3_fp, format='mp3').export(wav_fp, format='wav')
-        except Exception as e:
-            logger.error("WAV conversion failed: %s", e)
-            return {'status':'failure','feedback':'Failed to convert to WAV.'}
+        # Voice-activity gate: only the speech segments go to recognition
+        speech_ratio = None
+        if self.vad is not None:
+            with metrics.stage('vad'):
+                vad = self.vad.detect(pcm)
+            pcm, speech_ratio = vad.speech, vad.speech_ratio
+            if not vad.segments:
+                return {'status':'success','feedback': f"{saved}No speech detected.", 'mp3_url': mp3_url,
+                        'speech_detected': False, 'speech_ratio': speech_ratio}
 
-        # Speech recognition
-        rec = sr.Recognizer()
-        try:
-            with sr.AudioFile(str(wav_fp)) as src:
-                audio_file = rec.record(src)
-            text_en = rec.recognize_google(audio_file, language='en')
-            text_ar = rec.recognize_google(audio_file, language='ar')
-        except sr.UnknownValueError:
-            text_en = 'Could not understand English.'
-            text_ar = 'Could not understand Arabic.'
-        except sr.RequestError as e:
-            logger.error('Speech API error: %s', e)
-            text_en = 'Google API error (EN).'
-            text_ar = 'Google API error (AR).'
-        except Exception as e:
-            logger.error('General SR error: %s', e)
+        # Speech recognition, all languages concurrently
+        with metrics.stage('speech'):
+            results = self.recognizer.recognize(pcm, self.languages)
+        if any(r.status == recognition.FAILED for r in results.values()):
             return {'status':'failure','feedback':'Error during speech recognition.'}
 
-        # Cleanup WAV
-        try:
-            wav_fp.unlink()
-        except:
-            pass
-
-        feedback = (
-            f"Recording saved! MP3 available at: {mp3_url}\n\n"
-            f"English: {text_en}\n\n"
-            f"Arabic: {text_ar}"
-        )
-        return {'status':'success','feedback': feedback, 'mp3_url': mp3_url}
+        texts = []
+        for lang, result in results.items():
+            code = self.languages[lang]
+            if result.status == recognition.OK:
+                texts.append(f"{lang}: {result.text}")
+            elif result.status == recognition.NO_SPEECH:
+                texts.append(f"{lang}: Could not understand {lang}.")
+            elif result.status == recognition.TIMEOUT:
+                texts.append(f"{lang}: Recognition timed out ({code.upper()}).")
+            else:
+                texts.append(f"{lang}: Speech API error ({code.upper()}).")
+        feedback = saved + "\n\n".join(texts)
+        speech_detected = any(r.status == recognition.OK for r in results.values())
+        return {'status':'success','feedback': feedback, 'mp3_url': mp3_url, 'speech_detected': speech_detected,
+                'speech_ratio': speech_ratio, 'recognition_ms': recognition.timings(results)}
+
+    def stats(self) -> dict:
+        return {'archive': self.archiver.stats() if self.archiver is not None else None,
+                'vad': self.vad.stats() if self.vad is not None else None}
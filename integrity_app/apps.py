@@ -2,4 +2,9 @@ from django.apps import AppConfig
 
 class IntegrityAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'integrity_app'
\ No newline at end of file
+    name = 'integrity_app'
+
+    def ready(self):
+        from django.conf import settings
+        from .metrics import metrics
+        metrics.enabled = settings.INTEGRITY_METRICS_ENABLED
\ No newline at end of file
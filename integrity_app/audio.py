@@ -0,0 +1,109 @@
+"""
+Audio decoding for speech recognition.
+
+An uploaded WebM/Opus chunk is decoded in a single ffmpeg pass that reads the
+compressed bytes from stdin and writes 16 kHz mono 16-bit PCM to stdout, which is
+what the recognizer consumes; nothing is written to disk on the request path.
+Archival MP3s, when enabled, are encoded from the original bytes on a background
+thread (AudioArchiver).
+"""
+import datetime
+import logging
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # bytes per sample (s16le)
+
+
+def pcm_output_args(rate: int = SAMPLE_RATE) -> list:
+    # Raw signed 16-bit little-endian mono at `rate`, with no container.
+    return ['-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(rate)]
+
+
+def decode_pcm(data: bytes, rate: int = SAMPLE_RATE, ffmpeg: str = 'ffmpeg', timeout: float = 30.0) -> np.ndarray:
+    """
+    Decodes compressed audio bytes (WebM/Opus, Ogg, MP3, WAV, ...) to an int16
+    mono array at `rate`. Raises ValueError if ffmpeg cannot decode them.
+    """
+    try:
+        proc = subprocess.run(
+            [ffmpeg, '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0', *pcm_output_args(rate), 'pipe:1'],
+            input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise ValueError(f"ffmpeg failed: {e}") from e
+    if proc.returncode != 0 or not proc.stdout:
+        raise ValueError(f"Could not decode audio: {proc.stderr.decode(errors='replace').strip()[-200:]}")
+    return np.frombuffer(proc.stdout, np.int16)
+
+
+class AudioArchiver:
+    """
+    Encodes uploaded recordings to MP3 under `directory` on one background thread.
+    submit() returns the file's URL immediately; the file appears once encoded.
+    At most `max_pending` recordings wait for encoding, further ones are dropped.
+    """
+    def __init__(self, directory: Path, url_prefix: str, ffmpeg: str = 'ffmpeg', max_pending: int = 32):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix.rstrip('/')
+        self.ffmpeg = ffmpeg
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.written = 0
+        self.bytes_written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, data: bytes, prefix: str = 'recording'):
+        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = self.directory / f"{prefix}_{ts}_{uuid.uuid4().hex[:8]}.mp3"
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return None
+            self.pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='audio-archive')
+        self._executor.submit(self._encode, data, path)
+        return f"{self.url_prefix}/{path.name}"
+
+    def _encode(self, data: bytes, path: Path):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            proc = subprocess.run(
+                [self.ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-i', 'pipe:0', '-vn', '-f', 'mp3',
+                 str(path)],
+                input=data, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=120,
+            )
+            if proc.returncode != 0:
+                raise RuntimeError(proc.stderr.decode(errors='replace').strip()[-200:])
+            with self._lock:
+                self.written += 1
+                self.bytes_written += path.stat().st_size
+        except Exception as e:
+            logger.error("MP3 archival of %s failed: %s", path.name, e)
+            with self._lock:
+                self.failed += 1
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'pending': self.pending,
+                'written': self.written,
+                'bytes_written': self.bytes_written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+            }
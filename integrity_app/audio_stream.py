@@ -0,0 +1,124 @@
+"""
+Streaming audio decoder for live microphone streams.
+
+A MediaRecorder started with a timeslice produces one continuous WebM/Opus stream
+split into chunks; only the first carries the container header. StreamDecoder keeps
+one ffmpeg process per stream and writes each chunk to its stdin as it arrives; a
+reader thread collects the 16 kHz mono PCM from stdout, and feed() returns what
+the chunk decoded to. Process spawn, codec initialisation and container probing
+are paid once per stream instead of once per chunk.
+"""
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+from .audio import SAMPLE_RATE, pcm_output_args
+
+_live_lock = threading.Lock()
+_live = {'open': 0, 'opened': 0, 'closed': 0}
+
+
+def stats() -> dict:
+    with _live_lock:
+        return dict(_live)
+
+
+class StreamDecoder:
+    """
+    feed() waits up to `first_output` seconds for the chunk's first PCM, then until
+    no more arrives for `settle` seconds (capped at `timeout`). PCM that arrives
+    late is returned with the next chunk, so no audio is lost. Close the decoder
+    (or use it as a context manager) when the stream ends.
+    """
+    def __init__(self, ffmpeg: str = 'ffmpeg', rate: int = SAMPLE_RATE, settle: float = 0.005,
+                 first_output: float = 0.25, timeout: float = 2.0):
+        self.rate = rate
+        self.settle = settle
+        self.first_output = first_output
+        self.timeout = timeout
+        self.chunks = 0
+        self.samples = 0
+        self._buffer = bytearray()
+        self._cond = threading.Condition()
+        self._eof = False
+        # nobuffer / analyzeduration 0: start decoding as soon as the header is read;
+        # flush_packets: write each decoded packet to the pipe straight away.
+        self._proc = subprocess.Popen(
+            [ffmpeg, '-hide_banner', '-loglevel', 'error', '-fflags', 'nobuffer', '-analyzeduration', '0',
+             '-i', 'pipe:0', *pcm_output_args(rate), '-flush_packets', '1', 'pipe:1'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0,
+        )
+        self._reader = threading.Thread(target=self._read, name='audio-decoder', daemon=True)
+        self._reader.start()
+        with _live_lock:
+            _live['open'] += 1
+            _live['opened'] += 1
+
+    def _read(self):
+        stdout = self._proc.stdout
+        while True:
+            data = stdout.read(65536)
+            if not data:
+                break
+            with self._cond:
+                self._buffer += data
+                self._cond.notify_all()
+        with self._cond:
+            self._eof = True
+            self._cond.notify_all()
+
+    def feed(self, data: bytes) -> np.ndarray:
+        """
+        Writes the next chunk of the stream and returns the int16 PCM decoded since
+        the previous call. Raises ValueError once the decoder has exited (e.g. the
+        stream was not decodable).
+        """
+        try:
+            self._proc.stdin.write(data)
+        except (BrokenPipeError, ValueError, OSError) as e:
+            raise ValueError("Audio decoder has exited") from e
+        self.chunks += 1
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            self._cond.wait_for(lambda: self._buffer or self._eof, self.first_output)
+            size = -1
+            while not self._eof and len(self._buffer) != size and time.monotonic() < deadline:
+                size = len(self._buffer)
+                self._cond.wait(self.settle)
+            return self._take()
+
+    def _take(self) -> np.ndarray:
+        # Only whole samples; an odd trailing byte waits for the rest of its sample.
+        n = len(self._buffer) & ~1
+        pcm = np.frombuffer(bytes(self._buffer[:n]), np.int16)
+        del self._buffer[:n]
+        self.samples += len(pcm)
+        return pcm
+
+    def close(self) -> np.ndarray:
+        """Ends the stream and returns any PCM still buffered in the decoder."""
+        if self._proc.stdin.closed:
+            return np.empty(0, np.int16)
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._proc.wait(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+            self._proc.wait()
+        self._reader.join(self.timeout)
+        with _live_lock:
+            _live['open'] -= 1
+            _live['closed'] += 1
+        with self._cond:
+            return self._take()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
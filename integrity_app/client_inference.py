@@ -0,0 +1,189 @@
+"""
+Client-side face landmarks.
+
+In client-inference mode the browser runs the MediaPipe FaceLandmarker itself and
+sends only the landmarks, packed as one binary message:
+
+    offset  size  field
+    0       4     magic b'LMK1'
+    4       1     value type: 1 = float16, 2 = float32 (little-endian)
+    5       1     attached image: 0 = none, 1 = thumbnail, 2 = full frame
+    6       2     number of points (0 when no face was found, else 468 or 478)
+    8       n*12  normalised (x, y, z) per point, n*6 bytes for float16
+    ...           attached JPEG/WebP image, to the end of the message
+
+The server applies the usual gaze/head rules to the landmarks. Thumbnails, sent
+at a low rate, go through object detection only. Because the landmarks come from
+an untrusted client, the server randomly asks for a full frame instead
+(spot_check in the response); the client attaches the frame its next landmarks
+were computed on, and the server compares them with its own face mesh.
+"""
+import random
+import struct
+import threading
+
+import numpy as np
+
+from . import landmarks as lm
+
+MAGIC = b'LMK1'
+HEADER = struct.Struct('<4sBBH')
+CONTENT_TYPE = 'application/vnd.integrity.landmarks'
+
+VALUE_TYPES = {1: np.dtype('<f2'), 2: np.dtype('<f4')}
+NO_IMAGE, THUMBNAIL, FULL_FRAME = 0, 1, 2
+POINT_COUNTS = (0, 468, lm.NUM_REFINED_LANDMARKS)
+# Normalised coordinates leave [0, 1] only a little when the face is cut off by the
+# frame edge; anything beyond this is not from a face landmarker.
+MAX_COORDINATE = 2.0
+# A full 1080p JPEG is well under this.
+MAX_IMAGE_BYTES = 4 << 20
+
+
+class LandmarkPacket:
+    __slots__ = ('landmarks', 'image', 'image_kind')
+
+    def __init__(self, landmarks, image=None, image_kind=NO_IMAGE):
+        # (n, 3) float32 array, or None when the client found no face.
+        self.landmarks = landmarks
+        self.image = image
+        self.image_kind = image_kind
+
+
+def is_packet(data) -> bool:
+    return data[:len(MAGIC)] == MAGIC
+
+
+def decode_packet(data) -> LandmarkPacket:
+    """
+    Parses a landmark message without copying the attached image.
+    Raises ValueError on anything malformed.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Landmark packet too short")
+    magic, value_type, image_kind, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a landmark packet")
+    dtype = VALUE_TYPES.get(value_type)
+    if dtype is None or image_kind not in (NO_IMAGE, THUMBNAIL, FULL_FRAME) or count not in POINT_COUNTS:
+        raise ValueError("Unsupported landmark packet")
+    end = HEADER.size + count * 3 * dtype.itemsize
+    if len(data) < end:
+        raise ValueError("Truncated landmark packet")
+    points = None
+    if count:
+        points = np.frombuffer(data, dtype, count * 3, HEADER.size).astype(np.float32).reshape(count, 3)
+        if not np.isfinite(points).all():
+            raise ValueError("Non-finite landmarks")
+        if np.abs(points).max() > MAX_COORDINATE:
+            raise ValueError("Landmarks out of range")
+    image = memoryview(data)[end:] if image_kind != NO_IMAGE else None
+    if image_kind == NO_IMAGE and len(data) > end:
+        raise ValueError("Trailing data in landmark packet")
+    if image_kind != NO_IMAGE and not len(image):
+        raise ValueError("Missing attached image")
+    if image is not None and len(image) > MAX_IMAGE_BYTES:
+        raise ValueError("Attached image too large")
+    return LandmarkPacket(points, image, image_kind)
+
+
+def encode_packet(points, image: bytes = b'', image_kind: int = NO_IMAGE, value_type: int = 1) -> bytes:
+    """
+    Packs landmarks the way the dashboard does; for scripted clients and benchmarks.
+    """
+    points = np.empty((0, 3)) if points is None else np.asarray(points)[:, :3]
+    header = HEADER.pack(MAGIC, value_type, image_kind, len(points))
+    return header + points.astype(VALUE_TYPES[value_type]).tobytes() + bytes(image)
+
+
+def landmark_deviation(client_points, server_points) -> float:
+    """
+    Mean distance, in normalised image units, between the client's and the
+    server's (x, y) landmarks. inf when only one side found a face.
+    """
+    if client_points is None or server_points is None:
+        return 0.0 if client_points is None and server_points is None else float('inf')
+    n = min(len(client_points), len(server_points))
+    diff = client_points[:n, :2] - server_points[:n, :2]
+    return float(np.sqrt((diff * diff).sum(axis=1)).mean())
+
+
+class SpotChecker:
+    """
+    Decides when to ask a client-inference session for a full frame and records
+    the verdicts. A session that fails `max_failures` checks (a mismatch, or no
+    full frame within `grace_packets` packets of asking) loses client inference
+    and is told to send full frames again.
+    """
+    def __init__(self, rate: float = 0.05, tolerance: float = 0.03, max_failures: int = 2,
+                 grace_packets: int = 3, rng=None):
+        self.rate = rate
+        self.tolerance = tolerance
+        self.max_failures = max_failures
+        self.grace_packets = grace_packets
+        self._random = rng or random.Random()
+        self._lock = threading.Lock()
+        self.packets = 0
+        self.checks = 0
+        self.failures = 0
+        self.revoked = 0
+        self.deviations = []
+
+    def on_packet(self, session, packet: LandmarkPacket) -> bool:
+        """
+        Counts down an outstanding request for a packet that did not carry a full
+        frame. Returns False once the session has stopped being trusted.
+        """
+        with self._lock:
+            self.packets += 1
+        if session.spot_check_due and packet.image_kind != FULL_FRAME:
+            session.spot_check_due -= 1
+            if not session.spot_check_due:
+                self._record(session, ok=False)
+        return session.client_trusted
+
+    def verify(self, session, client_points, server_points) -> float:
+        """
+        Compares the landmarks of a spot-checked frame and records the verdict.
+        """
+        deviation = landmark_deviation(client_points, server_points)
+        session.spot_check_due = 0
+        with self._lock:
+            self.checks += 1
+            if deviation != float('inf'):
+                self.deviations = self.deviations[-511:] + [deviation]
+        self._record(session, ok=deviation <= self.tolerance)
+        return deviation
+
+    def request(self, session) -> bool:
+        """
+        Randomly asks for a full frame. Never more than one request outstanding.
+        """
+        if session.spot_check_due or self._random.random() >= self.rate:
+            return False
+        session.spot_check_due = self.grace_packets
+        return True
+
+    def _record(self, session, ok: bool):
+        if ok:
+            return
+        session.spot_check_failures += 1
+        with self._lock:
+            self.failures += 1
+            if session.client_trusted and session.spot_check_failures >= self.max_failures:
+                session.client_trusted = False
+                self.revoked += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            deviations = np.asarray(self.deviations)
+            return {
+                'rate': self.rate,
+                'tolerance': self.tolerance,
+                'packets': self.packets,
+                'checks': self.checks,
+                'failures': self.failures,
+                'revoked_sessions': self.revoked,
+                'deviation': {f'p{q}': float(np.percentile(deviations, q)) if len(deviations) else 0.0
+                              for q in (50, 95, 99)},
+            }
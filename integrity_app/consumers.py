@@ -1,7 +1,18 @@
+import asyncio
 import json
 import logging
+import numpy as np
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from django.conf import settings
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from . import pipeline
+from .admission import Overloaded, Superseded
+from .client_inference import decode_packet, is_packet
+from .frames import decode_frame_bytes
+from .metrics import metrics
+
 logger = logging.getLogger(__name__)
 
 class AudioConsumer(AsyncWebsocketConsumer):
@@ -26,4 +37,182 @@ class AudioConsumer(AsyncWebsocketConsumer):
             logger.info("Sent response: %s", response)
         except Exception as e:
             logger.error("Error processing message: %s", e)
-            await self.send(text_data=json.dumps({'error': 'Processing error'}))
\ No newline at end of file
+            await self.send(text_data=json.dumps({'error': 'Processing error'}))
+
+class FrameConsumer(AsyncWebsocketConsumer):
+    """
+    Webcam frame ingest over one persistent, authenticated socket per attempt.
+
+    The client sends each frame as a binary JPEG/WebP message (or, in
+    client-inference mode, a binary landmark packet) and receives the structured
+    analysis result as a JSON text message. Analysis runs on a worker
+    thread, never on the event loop. While a frame is being analysed only the
+    newest frame received is kept, so a slow server drops stale frames instead of
+    queueing them.
+    """
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated or user.user_type != 'student':
+            await self.close(code=4401)
+            return
+        attempt_id = self.scope['url_route']['kwargs']['attempt_id']
+        self.session_key = await database_sync_to_async(pipeline.resolve_session_key)(user.pk, attempt_id)
+        self.pending = None
+        self.wakeup = asyncio.Event()
+        self.worker = asyncio.create_task(self._process_frames())
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        worker = getattr(self, 'worker', None)
+        if worker is not None:
+            worker.cancel()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if bytes_data is None:
+            await self.send(text_data=json.dumps({'error': 'Frames must be sent as binary messages'}))
+            return
+        self.pending = bytes_data
+        self.wakeup.set()
+
+    async def _process_frames(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            data, self.pending = self.pending, None
+            if data is None:
+                continue
+            try:
+                result = await sync_to_async(self._analyze, thread_sensitive=False)(data)
+            except Superseded as e:
+                result = {'superseded': True, 'next_capture_ms': e.next_capture_ms}
+            except Overloaded as e:
+                result = {'error': 'Server busy', 'retry_after_ms': e.retry_after_ms,
+                          'next_capture_ms': e.next_capture_ms}
+            except ValueError:
+                result = {'error': 'Bad image data'}
+            except Exception as e:
+                logger.error("Frame analysis failed: %s", e)
+                result = {'error': 'Processing error'}
+            await self.send(text_data=json.dumps(result))
+
+    def _analyze(self, data: bytes) -> dict:
+        session = pipeline.sessions.get(self.session_key)
+        with metrics.in_flight_request(), metrics.stage('total'):
+            if is_packet(data):
+                result = pipeline.handle_frame(session, lambda: decode_packet(data), pipeline.analyze_client)
+            else:
+                result = pipeline.handle_frame(
+                    session, lambda: decode_frame_bytes(data, settings.INTEGRITY_FRAME_MAX_SIDE))
+        metrics.frame_done()
+        return result
+
+
+class AudioStreamConsumer(AsyncWebsocketConsumer):
+    """
+    Live microphone audio for one attempt.
+
+    The client sends the chunks of a single MediaRecorder stream (started with a
+    timeslice) as binary messages. They are decoded in order by one ffmpeg process
+    kept for the lifetime of the socket (audio_stream.StreamDecoder), which is
+    closed on disconnect. Speech recognition runs on a worker thread; PCM decoded
+    while it is busy is merged into the next call, and each result is sent back as
+    a JSON text message.
+
+    When recording stops the client sends {"type": "end"}: the audio still queued or
+    buffered in ffmpeg is recognized, the last result is sent with "final": true,
+    and the server closes the socket.
+    """
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated or user.user_type != 'student':
+            await self.close(code=4401)
+            return
+        attempt_id = self.scope['url_route']['kwargs']['attempt_id']
+        self.session_key = await database_sync_to_async(pipeline.resolve_session_key)(user.pk, attempt_id)
+        self.ending = False
+        # The first connection builds the speech backend (model loads, clients), so not on the event loop.
+        self.monitor = await sync_to_async(pipeline.get_sound_monitor, thread_sensitive=False)()
+        try:
+            self.decoder = await sync_to_async(self.monitor.open_stream, thread_sensitive=False)()
+        except OSError as e:
+            # ffmpeg missing or not runnable; the client falls back to posting the recording.
+            logger.error("Could not start the audio stream decoder: %s", e)
+            await self.close(code=1011)
+            return
+        self.pending = []
+        self.wakeup = asyncio.Event()
+        self.worker = asyncio.create_task(self._recognize())
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        worker = getattr(self, 'worker', None)
+        if worker is not None:
+            worker.cancel()
+        decoder = getattr(self, 'decoder', None)
+        if decoder is not None:
+            self.decoder = None
+            await sync_to_async(decoder.close, thread_sensitive=False)()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if bytes_data is None:
+            if self._is_end(text_data):
+                await self._end()
+            else:
+                await self.send(text_data=json.dumps({'error': 'Audio must be sent as binary messages'}))
+            return
+        if self.decoder is None:
+            return
+        try:
+            pcm = await sync_to_async(self.decoder.feed, thread_sensitive=False)(bytes_data)
+        except ValueError:
+            await self.send(text_data=json.dumps({'error': 'Bad audio data'}))
+            await self.close()
+            return
+        if len(pcm):
+            self.pending.append(pcm)
+            self.wakeup.set()
+
+    @staticmethod
+    def _is_end(text_data) -> bool:
+        try:
+            return json.loads(text_data).get('type') == 'end'
+        except (TypeError, ValueError, AttributeError):
+            return False
+
+    async def _end(self):
+        decoder, self.decoder = self.decoder, None
+        if decoder is None:
+            return
+        # Whatever ffmpeg still holds is recognized along with the queued audio.
+        tail = await sync_to_async(decoder.close, thread_sensitive=False)()
+        if len(tail):
+            self.pending.append(tail)
+        self.ending = True
+        self.wakeup.set()
+
+    async def _recognize(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            pcm, self.pending = self.pending, []
+            if pcm:
+                try:
+                    result = await sync_to_async(self.monitor.process_pcm, thread_sensitive=False)(np.concatenate(pcm))
+                except Exception as e:
+                    logger.error("Audio recognition failed: %s", e)
+                    result = {'error': 'Processing error'}
+                # Speech during the exam is an audio violation: sample this student's webcam faster.
+                if result.get('speech_detected'):
+                    session = pipeline.sessions.peek(self.session_key)
+                    if session is not None:
+                        pipeline.sampling.boost(session)
+            elif self.ending:
+                result = {}
+            else:
+                continue
+            if self.ending and not self.pending:
+                result['final'] = True
+                await self.send(text_data=json.dumps(result))
+                await self.close()
+                return
+            await self.send(text_data=json.dumps(result))
@@ -0,0 +1,181 @@
+"""
+Object detector backends.
+
+The PyTorch weights are exported once next to the .pt file (ONNX, optionally
+statically quantized to int8, or an OpenVINO IR built from it) and loaded back
+through ultralytics.YOLO, so every backend returns the same Results objects and
+the box/class/confidence output keeps its format.
+
+onnx, onnxruntime and openvino are only needed for the backends that use them.
+"""
+import logging
+import shutil
+from pathlib import Path
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+CALIBRATION_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+
+
+def artifact_path(weights_path: Path, backend: str, int8: bool = False) -> Path:
+    """
+    Where the exported model for a backend lives, e.g. models/best.int8.onnx or
+    models/best_int8_openvino_model/.
+    """
+    weights_path = Path(weights_path)
+    if backend == 'torch':
+        return weights_path
+    stem = weights_path.stem
+    if backend == 'onnx':
+        return weights_path.with_name(f"{stem}.int8.onnx" if int8 else f"{stem}.onnx")
+    if backend == 'openvino':
+        return weights_path.with_name(f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model")
+    raise ValueError(f"Unknown detector backend {backend!r}; expected one of {BACKENDS}")
+
+
+def resolve_classes(names: dict, wanted):
+    """
+    Model class ids for the configured class names (case-insensitive), for the
+    model call's `classes=` filter. None (no filtering) when `wanted` is empty or
+    none of its names exist in this model.
+    """
+    if not wanted:
+        return None
+    by_name = {name.lower(): class_id for class_id, name in names.items()}
+    ids = sorted({by_name[name.lower()] for name in wanted if name.lower() in by_name})
+    missing = [name for name in wanted if name.lower() not in by_name]
+    if missing:
+        logger.info("Detector has no classes named %s", ', '.join(missing))
+    if not ids:
+        logger.warning("None of the configured detector classes exist in the model; detecting all classes")
+        return None
+    return ids
+
+
+def letterbox(image: np.ndarray, size: int) -> np.ndarray:
+    """
+    Resizes keeping the aspect ratio and pads to size x size with grey (114), the
+    same preprocessing ultralytics applies before inference.
+    """
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((size, size, 3), 114, np.uint8)
+    top, left = (size - new_h) // 2, (size - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = resized
+    return canvas
+
+
+class ImageFolderCalibrationReader:
+    """
+    Feeds letterboxed images from a local folder to onnxruntime's static
+    quantization, one (1, 3, size, size) float32 batch at a time.
+    """
+    def __init__(self, folder: Path, input_name: str, size: int = 640, limit: int = 200):
+        self.input_name = input_name
+        self.size = size
+        self.paths = sorted(p for p in Path(folder).rglob('*') if p.suffix.lower() in CALIBRATION_EXTENSIONS)[:limit]
+        if not self.paths:
+            raise ValueError(f"No calibration images found in {folder}")
+        self._iter = iter(self.paths)
+
+    def get_next(self):
+        for path in self._iter:
+            image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if image is None:
+                logger.warning("Skipping unreadable calibration image %s", path)
+                continue
+            rgb = cv2.cvtColor(letterbox(image, self.size), cv2.COLOR_BGR2RGB)
+            tensor = rgb.transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+            return {self.input_name: tensor}
+        return None
+
+    def rewind(self):
+        self._iter = iter(self.paths)
+
+
+def _quantize_onnx(fp32_path: Path, int8_path: Path, calibration_dir: Path, imgsz: int, head_prefix: str,
+                   calibration_limit: int):
+    import onnx
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    input_name = ort.InferenceSession(str(fp32_path), providers=['CPUExecutionProvider']).get_inputs()[0].name
+    fp32_model = onnx.load(str(fp32_path))
+    # Keep the detect head's box decoding (DFL, anchors, sigmoid, concat) in float;
+    # only its convolutions are quantized.
+    excluded = [node.name for node in fp32_model.graph.node
+                if node.name.startswith(head_prefix) and node.op_type != 'Conv']
+    quantize_static(
+        str(fp32_path), str(int8_path),
+        ImageFolderCalibrationReader(calibration_dir, input_name, imgsz, calibration_limit),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=CalibrationMethod.MinMax,
+        nodes_to_exclude=excluded,
+    )
+
+    # ultralytics reads class names, stride and imgsz from the model metadata.
+    int8_model = onnx.load(str(int8_path))
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, str(int8_path))
+
+
+def export_detector(weights_path: Path, backend: str = 'onnx', int8: bool = False, calibration_dir=None,
+                    imgsz: int = 640, calibration_limit: int = 200) -> Path:
+    """
+    Exports the PyTorch weights for the given backend and returns the artifact path.
+    int8 needs a folder of representative webcam frames for static calibration.
+    """
+    weights_path = Path(weights_path)
+    target = artifact_path(weights_path, backend, int8)
+    if backend == 'torch':
+        return target
+    if int8 and not calibration_dir:
+        raise ValueError("int8 export needs a calibration image folder")
+
+    model = YOLO(str(weights_path))
+    # Dynamic batch so the micro-batcher can send several frames per call.
+    fp32_onnx = Path(model.export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True))
+    onnx_path = fp32_onnx
+    if int8:
+        onnx_path = artifact_path(weights_path, 'onnx', int8=True)
+        head_prefix = f"/model.{len(model.model.model) - 1}/"
+        _quantize_onnx(fp32_onnx, onnx_path, Path(calibration_dir), imgsz, head_prefix, calibration_limit)
+    if backend == 'onnx':
+        return onnx_path
+
+    # OpenVINO: ultralytics' own IR export provides metadata.yaml; an int8 IR is
+    # converted from the quantized ONNX, whose QDQ nodes OpenVINO runs as int8.
+    fp32_ir = Path(model.export(format='openvino', imgsz=imgsz, dynamic=True))
+    if not int8:
+        return fp32_ir
+    import openvino as ov
+    target.mkdir(parents=True, exist_ok=True)
+    ov.save_model(ov.convert_model(str(onnx_path)), str(target / f"{weights_path.stem}.xml"),
+                  compress_to_fp16=False)
+    shutil.copy(fp32_ir / 'metadata.yaml', target / 'metadata.yaml')
+    return target
+
+
+def load_detector(weights_path: Path, backend: str = 'torch', int8: bool = False, calibration_dir=None,
+                  imgsz: int = 640) -> YOLO:
+    """
+    Loads the detector for a backend, exporting it first if the artifact is missing.
+    Prefer running the export_detector management command at deploy time.
+    """
+    path = artifact_path(weights_path, backend, int8)
+    if not path.exists():
+        logger.warning("No %s%s detector at %s; exporting from %s", backend, ' int8' if int8 else '',
+                       path, weights_path)
+        path = export_detector(weights_path, backend, int8, calibration_dir, imgsz)
+    return YOLO(str(path), task='detect')
@@ -0,0 +1,251 @@
+"""
+Violation evidence.
+
+Every analysed frame is downscaled and JPEG-encoded into a per-session ring buffer
+(EvidenceRing) with a fixed byte budget, so each student costs a bounded amount of
+memory and nothing is written to disk while a session stays clean. When a face
+alert fires (suspicious behaviour has lasted past FaceMonitor.suspicious_threshold),
+the buffered frames are handed to a background thread, which renders a contact
+sheet (or an MJPEG clip), stores it under MEDIA_ROOT/evidence/ through Django's
+default storage, and links it from a new Alert and the attempt's latest Answer.
+One evidence file is saved per alert episode, at most once per `cooldown` seconds.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from .frames import downscale
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SHEET = 'sheet'
+CLIP = 'clip'
+
+
+class EvidenceRing:
+    """
+    Recent (timestamp, JPEG bytes) frames of one session, oldest dropped first
+    once their total size exceeds `budget` bytes.
+    """
+    __slots__ = ('budget', 'nbytes', '_frames')
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.nbytes = 0
+        self._frames = deque()
+
+    def push(self, timestamp: float, data: bytes):
+        self._frames.append((timestamp, data))
+        self.nbytes += len(data)
+        while self.nbytes > self.budget and len(self._frames) > 1:
+            self.nbytes -= len(self._frames.popleft()[1])
+
+    def frames(self) -> list:
+        return list(self._frames)
+
+    def __len__(self):
+        return len(self._frames)
+
+
+def contact_sheet(frames: list, columns: int = 4, tiles: int = 12, quality: int = 85) -> bytes:
+    """
+    One JPEG grid of up to `tiles` frames sampled evenly over the buffer (always
+    ending with the newest), each labelled with its offset from the newest frame.
+    """
+    picks = np.unique(np.linspace(0, len(frames) - 1, min(tiles, len(frames))).round().astype(int))
+    newest = frames[-1][0]
+    images = []
+    for i in picks.tolist():
+        timestamp, data = frames[i]
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        cv2.putText(image, f"{timestamp - newest:+.1f}s", (6, 18), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+        images.append(image)
+    height, width = images[-1].shape[:2]
+    rows = -(-len(images) // columns)
+    sheet = np.zeros((rows * height, min(columns, len(images)) * width, 3), np.uint8)
+    for i, image in enumerate(images):
+        row, col = divmod(i, columns)
+        if image.shape[:2] != (height, width):
+            image = cv2.resize(image, (width, height), interpolation=cv2.INTER_LINEAR)
+        sheet[row * height:(row + 1) * height, col * width:(col + 1) * width] = image
+    return cv2.imencode('.jpg', sheet, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+def clip(frames: list) -> bytes:
+    """
+    An MJPEG .avi of the buffered frames, played at their average capture rate.
+    """
+    span = frames[-1][0] - frames[0][0]
+    fps = min(30.0, max(1.0, (len(frames) - 1) / span)) if span > 0 else 1.0
+    first = cv2.imdecode(np.frombuffer(frames[0][1], np.uint8), cv2.IMREAD_COLOR)
+    height, width = first.shape[:2]
+    fd, path = tempfile.mkstemp(suffix='.avi')
+    os.close(fd)
+    try:
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+        for _, data in frames:
+            image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            if image.shape[:2] != (height, width):
+                image = cv2.resize(image, (width, height), interpolation=cv2.INTER_LINEAR)
+            writer.write(image)
+        writer.release()
+        with open(path, 'rb') as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+def owner_of(session_key: str):
+    """
+    (user pk, attempt id) from a pipeline.session_key "<user pk>:<attempt id>", or
+    None for a per-user key without an attempt.
+    """
+    user_pk, _, attempt_id = session_key.partition(':')
+    return (user_pk, attempt_id) if attempt_id else None
+
+
+def link_evidence(user_pk, attempt_id, store, description: str):
+    """
+    Stores the evidence via store(attempt) -> URL and records it: a face Alert for
+    the exam's proctor carrying the link, a violation on the attempt, and the link
+    on the attempt's latest Answer (unless it already has one). Returns the URL, or
+    None if the attempt does not exist or does not belong to user_pk (nothing is
+    stored then).
+    """
+    from django.core.exceptions import ValidationError
+    from django.db.models import F
+
+    from alert.models import Alert
+    from student.models import Attempt
+
+    try:
+        attempt = Attempt.objects.select_related('exam').filter(attempt_id=attempt_id, student_id=user_pk).first()
+    except ValidationError:
+        attempt = None
+    if attempt is None:
+        return None
+    url = store(attempt)
+    Alert.objects.create(proctor_id=attempt.exam.proctor_id, attempt=attempt, alert_type='face',
+                         alert_description=description, evidence_link=url)
+    Attempt.objects.filter(pk=attempt.pk).update(violation_count=F('violation_count') + 1)
+    answer = attempt.answers.order_by('-date_submitted').first()
+    if answer is not None:
+        answer.violation_flag = True
+        if not answer.violation_evidence_link:
+            answer.violation_evidence_link = url
+        answer.save(update_fields=['violation_flag', 'violation_evidence_link'])
+    return url
+
+
+class EvidenceRecorder:
+    """
+    budget=0 disables evidence capture (frames are not even encoded).
+    `fmt` is 'sheet' (contact sheet JPEG) or 'clip' (MJPEG .avi).
+    """
+    def __init__(self, budget: int = 256 * 1024, max_side: int = 320, quality: int = 70, fmt: str = SHEET,
+                 cooldown: float = 30.0, max_pending: int = 8, link=link_evidence):
+        if fmt not in (SHEET, CLIP):
+            raise ValueError(f"Unknown evidence format {fmt!r}")
+        self.budget = budget
+        self.max_side = max_side
+        self.quality = quality
+        self.fmt = fmt
+        self.cooldown = cooldown
+        self.max_pending = max_pending
+        self.link = link
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.triggered = 0
+        self.saved = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def record(self, session, frame: np.ndarray, now: float = None):
+        """Adds the analysed frame to the session's ring buffer."""
+        now = time.time() if now is None else now
+        with metrics.stage('evidence'):
+            small = downscale(frame, self.max_side)
+            data = cv2.imencode('.jpg', small, [cv2.IMWRITE_JPEG_QUALITY, self.quality])[1].tobytes()
+        if session.evidence is None:
+            session.evidence = EvidenceRing(self.budget)
+        session.evidence.push(now, data)
+
+    def observe(self, session, frame: np.ndarray, result: dict, now: float = None) -> bool:
+        """
+        Records the frame and, on the first frame of a face alert, saves the buffer
+        in the background. Returns True when evidence was queued.
+        """
+        if not self.budget:
+            return False
+        now = time.time() if now is None else now
+        self.record(session, frame, now)
+        face = result.get('face') or {}
+        alert = bool(face.get('alert'))
+        started = alert and not session.evidence_active
+        session.evidence_active = alert
+        if not started or now - session.evidence_at < self.cooldown:
+            return False
+        session.evidence_at = now
+        return self.submit(session.key, session.evidence.frames(), face.get('status', ''), now)
+
+    def submit(self, session_key: str, frames: list, status: str, now: float) -> bool:
+        owner = owner_of(session_key)
+        with self._lock:
+            self.triggered += 1
+            if owner is None or not frames or self.pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self.pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='evidence')
+        self._executor.submit(self._save, owner, frames, status, now)
+        return True
+
+    def render(self, frames: list) -> bytes:
+        return clip(frames) if self.fmt == CLIP else contact_sheet(frames)
+
+    def _save(self, owner: tuple, frames: list, status: str, now: float):
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from django.db import close_old_connections
+
+        def store(attempt):
+            extension = 'avi' if self.fmt == CLIP else 'jpg'
+            name = f"evidence/{attempt.attempt_id}/{time.strftime('%Y%m%d_%H%M%S', time.localtime(now))}.{extension}"
+            return default_storage.url(default_storage.save(name, ContentFile(self.render(frames))))
+
+        try:
+            url = self.link(*owner, store, f"Suspicious: {status}")
+            with self._lock:
+                self.saved += url is not None
+                self.dropped += url is None
+        except Exception:
+            logger.exception("Saving violation evidence for attempt %s failed", owner[1])
+            with self._lock:
+                self.failed += 1
+        finally:
+            with self._lock:
+                self.pending -= 1
+            close_old_connections()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'budget_bytes': self.budget,
+                'max_side': self.max_side,
+                'format': self.fmt,
+                'pending': self.pending,
+                'triggered': self.triggered,
+                'saved': self.saved,
+                'dropped': self.dropped,
+                'failed': self.failed,
+            }
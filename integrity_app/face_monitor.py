@@ -2,12 +2,17 @@ import cv2
 import time
 import numpy as np
 import mediapipe as mp
+from django.conf import settings
+
+from . import landmarks as lm
+from .eye_occlusion import EyeOcclusionClassifier
 
 
 class FaceMonitor:
     def __init__(self,
                  sunglasses_detection_threshold=50,  # Minimum confidence (%) to flag sunglasses.
-                 object_detection_threshold=40  # Minimum confidence (%) to flag a cheating object.
+                 object_detection_threshold=40,  # Minimum confidence (%) to flag a cheating object.
+                 eye_occlusion_classifier=None  # Score sunglasses from the eye crops; None: the setting.
                  ):
         # Initialize MediaPipe's face mesh with refined landmarks.
         self.face_mesh_module = mp.solutions.face_mesh
@@ -21,6 +26,9 @@ class FaceMonitor:
         # Sensitivity parameters for external classifiers.
         self.sunglasses_detection_threshold = sunglasses_detection_threshold
         self.object_detection_threshold = object_detection_threshold
+        if eye_occlusion_classifier is None:
+            eye_occlusion_classifier = settings.INTEGRITY_EYE_OCCLUSION_CLASSIFIER
+        self.sunglasses_classifier = EyeOcclusionClassifier() if eye_occlusion_classifier else None
 
         # Timing and status tracking.
         self.last_normal_time = time.time()
@@ -31,21 +39,17 @@ class FaceMonitor:
         self.sunglasses_detection = {"detected": False, "confidence": 0}
         self.object_detection = {"detected": False, "confidence": 0}
 
-    # ---------------- Helper Functions ----------------
-    def _point(self, p):
-        return (p.x, p.y)
-
-    def _dist(self, p1, p2):
-        return ((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2) ** 0.5
-
-    # ---------------- Simulated External Detection ----------------
-    def classify_sunglasses(self, frame):
+    # ---------------- External Detection ----------------
+    def classify_sunglasses(self, frame, landmarks=None):
         """
-        Simulates a MediaPipe image classification model for sunglasses detection.
-        Returns a confidence percentage (0-100). Replace with your actual classifier.
+        Sunglasses confidence (0-100) from the eye-occlusion classifier, run on the same
+        two eye boxes that _draw_sunglasses_box draws. 0 when no face landmarks are available
+        or the classifier is off (INTEGRITY_EYE_OCCLUSION_CLASSIFIER). Only this class uses it;
+        the live pipeline (monitoring.FaceMonitor) relies on the object detector's Sunglasses class.
         """
-        simulated_confidence = 68.0  # Example simulated value.
-        return simulated_confidence
+        if landmarks is None or self.sunglasses_classifier is None:
+            return 0.0
+        return self.sunglasses_classifier.classify(frame, landmarks)
 
     def detect_cheating_objects_classification(self, frame):
         """
@@ -55,27 +59,21 @@ class FaceMonitor:
         simulated_confidence = 45.0  # Example simulated value.
         return simulated_confidence
 
+    def external_confidences(self, frame, faces):
+        """
+        Runs the external detectors once for a frame: the object confidence, and one
+        sunglasses confidence per face (same order as `faces`). Call it before anything
+        is drawn on the frame: the classifier crops the eye boxes from it as it is.
+        """
+        return ([self.classify_sunglasses(frame, landmarks) for landmarks in faces],
+                self.detect_cheating_objects_classification(frame))
+
     def _draw_sunglasses_box(self, frame, landmarks, width, height):
         """
         Draws green rectangles around both eye regions using specified landmarks.
         """
-        # Left eye: landmarks 33, 133, 159, 145.
-        left_points = [landmarks[33], landmarks[133], landmarks[159], landmarks[145]]
-        left_coords = [(int(p.x * width), int(p.y * height)) for p in left_points]
-        x_min_left = min(pt[0] for pt in left_coords)
-        y_min_left = min(pt[1] for pt in left_coords)
-        x_max_left = max(pt[0] for pt in left_coords)
-        y_max_left = max(pt[1] for pt in left_coords)
-        cv2.rectangle(frame, (x_min_left, y_min_left), (x_max_left, y_max_left), (0, 255, 0), 2)
-
-        # Right eye: landmarks 362, 263, 386, 374.
-        right_points = [landmarks[362], landmarks[263], landmarks[386], landmarks[374]]
-        right_coords = [(int(p.x * width), int(p.y * height)) for p in right_points]
-        x_min_right = min(pt[0] for pt in right_coords)
-        y_min_right = min(pt[1] for pt in right_coords)
-        x_max_right = max(pt[0] for pt in right_coords)
-        y_max_right = max(pt[1] for pt in right_coords)
-        cv2.rectangle(frame, (x_min_right, y_min_right), (x_max_right, y_max_right), (0, 255, 0), 2)
+        for x_min, y_min, x_max, y_max in lm.eye_boxes(lm.to_array(landmarks), width, height).tolist():
+            cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), (0, 255, 0), 2)
 
     def _draw_cheating_object_box(self, frame):
         """
@@ -94,16 +92,21 @@ class FaceMonitor:
         head_ok = self._check_head_movement(landmarks)
         return eyes_ok and head_ok
 
-    def detect_violation(self, frame, landmarks):
+    def detect_violation(self, frame, landmarks, sunglasses_confidence=None, object_confidence=None):
         """
         Combines the results of gaze/head analysis with external detection results for sunglasses and objects.
         Builds a status string that includes the detection confidence percentages.
+        The confidences come from external_confidences(); when not given, they are computed
+        here, so `frame` must not have been drawn on yet.
         """
         is_normal = self.track_gaze(landmarks)
 
-        # Run external classifiers on the full frame.
-        sunglasses_confidence = self.classify_sunglasses(frame)
-        object_confidence = self.detect_cheating_objects_classification(frame)
+        if sunglasses_confidence is None or object_confidence is None:
+            (face_confidence,), frame_confidence = self.external_confidences(frame, [landmarks])
+            if sunglasses_confidence is None:
+                sunglasses_confidence = face_confidence
+            if object_confidence is None:
+                object_confidence = frame_confidence
 
         # Save the external results in separate variables.
         self.sunglasses_detection = {
@@ -162,28 +165,23 @@ class FaceMonitor:
 
     def analyze_face(self, frame):
         """
-        Always runs external detection on the full frame (for sunglasses and objects),
-        then attempts to detect and analyze the face using MediaPipe's face mesh.
-        If no face is detected, a "No face detected" label is added.
+        Runs MediaPipe's face mesh, then the external detectors (objects on the full
+        frame, sunglasses on each face's eye crops) once, before anything is drawn, and
+        analyzes each face. If no face is detected, a "No face detected" label is added.
         """
-        # Always run external detectors on the full frame.
-        # Run object detection classification.
-        object_confidence = self.detect_cheating_objects_classification(frame)
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        results = self.face_mesh.process(rgb_frame)
+        faces = [lm.to_array(face_landmarks) for face_landmarks in results.multi_face_landmarks or ()]
+
+        # Classify on the clean frame; every face gets its own sunglasses confidence.
+        sunglasses_confidences, object_confidence = self.external_confidences(frame, faces)
         if object_confidence >= self.object_detection_threshold:
             self._draw_cheating_object_box(frame)
 
-        # Run sunglasses classification.
-        sunglasses_confidence = self.classify_sunglasses(frame)
-        # Note: for drawing the sunglasses box, we need face landmarks.
-        # That will be handled later if a face is detected.
-
-        # Always attempt face analysis.
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb_frame)
-        if results.multi_face_landmarks:
+        if faces:
             drawing_spec = self.drawing_utils.DrawingSpec(color=(245, 245, 245), thickness=1, circle_radius=1)
-            for face_landmarks in results.multi_face_landmarks:
-                landmarks = face_landmarks.landmark
+            for face_landmarks, landmarks, sunglasses_confidence in zip(results.multi_face_landmarks, faces,
+                                                                        sunglasses_confidences):
                 self.drawing_utils.draw_landmarks(
                     frame,
                     face_landmarks,
@@ -192,10 +190,8 @@ class FaceMonitor:
                     connection_drawing_spec=drawing_spec
                 )
                 self._draw_eye_points(frame, landmarks)
-                frame = self.detect_violation(frame, landmarks)
-                # If sunglasses are detected externally, draw the box using face landmarks.
-                if sunglasses_confidence >= self.sunglasses_detection_threshold:
-                    self._draw_sunglasses_box(frame, landmarks, frame.shape[1], frame.shape[0])
+                # Also draws the sunglasses box when the classifier flags this face.
+                frame = self.detect_violation(frame, landmarks, sunglasses_confidence, object_confidence)
         else:
             cv2.putText(frame, "No face detected", (50, 150), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
         return frame
@@ -205,118 +201,39 @@ class FaceMonitor:
         Draws key eye landmarks and bounding rectangles ("squares") around the eyes.
         """
         height, width, _ = frame.shape
-
-        # --- LEFT EYE (landmarks 33, 133, 159, 145) ---
-        left_points = [landmarks[33], landmarks[133], landmarks[159], landmarks[145]]
-        left_coords = [(int(p.x * width), int(p.y * height)) for p in left_points]
-        cv2.circle(frame, left_coords[0], 2, (0, 0, 255), -1)  # Red (Outer)
-        cv2.circle(frame, left_coords[1], 2, (0, 255, 0), -1)  # Green (Inner)
-        cv2.circle(frame, left_coords[2], 2, (255, 0, 255), -1)  # Magenta (Top)
-        cv2.circle(frame, left_coords[3], 2, (255, 255, 0), -1)  # Cyan (Bottom)
-        x_min_left = min(pt[0] for pt in left_coords)
-        x_max_left = max(pt[0] for pt in left_coords)
-        y_min_left = min(pt[1] for pt in left_coords)
-        y_max_left = max(pt[1] for pt in left_coords)
-        cv2.rectangle(frame, (x_min_left, y_min_left), (x_max_left, y_max_left), (200, 200, 200), 1)
-        left_iris_points = landmarks[473:478]
-        left_iris_center = (int(sum(p.x for p in left_iris_points) / len(left_iris_points) * width),
-                            int(sum(p.y for p in left_iris_points) / len(left_iris_points) * height))
-        cv2.circle(frame, left_iris_center, 2, (255, 0, 0), -1)  # Blue
-
-        # --- RIGHT EYE (landmarks 362, 263, 386, 374) ---
-        right_points = [landmarks[362], landmarks[263], landmarks[386], landmarks[374]]
-        right_coords = [(int(p.x * width), int(p.y * height)) for p in right_points]
-        cv2.circle(frame, right_coords[0], 2, (0, 255, 255), -1)  # Yellow (Inner)
-        cv2.circle(frame, right_coords[1], 2, (255, 0, 255), -1)  # Magenta (Outer)
-        cv2.circle(frame, right_coords[2], 2, (0, 128, 255), -1)  # Orange-ish (Top)
-        cv2.circle(frame, right_coords[3], 2, (255, 128, 0), -1)  # Light Blue (Bottom)
-        x_min_right = min(pt[0] for pt in right_coords)
-        x_max_right = max(pt[0] for pt in right_coords)
-        y_min_right = min(pt[1] for pt in right_coords)
-        y_max_right = max(pt[1] for pt in right_coords)
-        cv2.rectangle(frame, (x_min_right, y_min_right), (x_max_right, y_max_right), (200, 200, 200), 1)
-        right_iris_points = landmarks[468:473]
-        right_iris_center = (int(sum(p.x for p in right_iris_points) / len(right_iris_points) * width),
-                             int(sum(p.y for p in right_iris_points) / len(right_iris_points) * height))
-        cv2.circle(frame, right_iris_center, 2, (100, 100, 255), -1)  # Light Purple
+        points = lm.to_array(landmarks)
+
+        eyes = lm.eye_pixels(points, width, height)
+        boxes = np.concatenate([eyes.min(axis=1), eyes.max(axis=1)], axis=1)
+        irises = lm.iris_pixels(points, width, height)
+        for eye, colors, box, iris, iris_color in zip(eyes.tolist(), lm.EYE_POINT_COLORS, boxes.tolist(),
+                                                      irises.tolist(), lm.IRIS_COLORS):
+            for point, color in zip(eye, colors):
+                cv2.circle(frame, tuple(point), 2, color, -1)
+            cv2.rectangle(frame, (box[0], box[1]), (box[2], box[3]), (200, 200, 200), 1)
+            cv2.circle(frame, tuple(iris), 2, iris_color, -1)
 
     def _check_eye_gaze(self, landmarks):
         """
         Uses the horizontal positions of the iris centers (derived from the face mesh landmarks)
         relative to the eye boxes to flag suspicious gaze. (Vertical evaluation is not performed here.)
         """
-        if len(landmarks) >= 478:
-            suspicious_conditions = []
-
-            # --- LEFT EYE ---
-            left_boundaries = {"Outer": landmarks[33], "Inner": landmarks[133]}
-            left_x_min = min(left_boundaries["Outer"].x, left_boundaries["Inner"].x)
-            left_x_max = max(left_boundaries["Outer"].x, left_boundaries["Inner"].x)
-            left_iris_points = landmarks[473:478]
-            left_iris_center = (sum(p.x for p in left_iris_points) / len(left_iris_points),
-                                sum(p.y for p in left_iris_points) / len(left_iris_points))
-            norm_left_x = (left_iris_center[0] - left_x_min) / (left_x_max - left_x_min) if (
-                        left_x_max - left_x_min) else 0.5
-
-            # --- RIGHT EYE ---
-            right_boundaries = {"Inner": landmarks[362], "Outer": landmarks[263]}
-            right_x_min = min(right_boundaries["Inner"].x, right_boundaries["Outer"].x)
-            right_x_max = max(right_boundaries["Inner"].x, right_boundaries["Outer"].x)
-            right_iris_points = landmarks[468:473]
-            right_iris_center = (sum(p.x for p in right_iris_points) / len(right_iris_points),
-                                 sum(p.y for p in right_iris_points) / len(right_iris_points))
-            norm_right_x = (right_iris_center[0] - right_x_min) / (right_x_max - right_x_min) if (
-                        right_x_max - right_x_min) else 0.5
-
-            # Check horizontal proximity: flag if iris center is very near the extreme edges (<0.10 or >0.90).
-            if norm_left_x < 0.10:
-                suspicious_conditions.append("Left Outer")
-            if norm_left_x > 0.90:
-                suspicious_conditions.append("Left Inner")
-            if norm_right_x < 0.10:
-                suspicious_conditions.append("Right Inner")
-            if norm_right_x > 0.90:
-                suspicious_conditions.append("Right Outer")
-
-            if suspicious_conditions:
-                self.current_status = "Suspicious: " + ", ".join(suspicious_conditions)
-                return False
-            else:
-                self.current_status = "Normal Behavior"
-                return True
-        else:
-            # Fallback: simple horizontal check.
-            left_eye_outer = landmarks[33]
-            right_eye_outer = landmarks[263]
-            mid_x = (left_eye_outer.x + right_eye_outer.x) / 2
-            if abs(mid_x - 0.5) > self.center_tolerance:
-                self.current_status = "Brief: Looking Left" if mid_x < 0.5 else "Brief: Looking Right"
-                return False
-            else:
-                self.current_status = "Normal Behavior"
-                return True
+        is_normal, self.current_status = lm.check_eye_gaze_horizontal(
+            lm.to_array(landmarks), self.center_tolerance)
+        return is_normal
 
     def _check_head_movement(self, landmarks):
         """
         Checks head position using the nose tip (landmark 1).
         """
-        nose = landmarks[1]
-        if abs(nose.x - 0.5) > self.center_tolerance:
-            self.current_status = "Brief: Head Rotated Left" if nose.x < 0.5 else "Brief: Head Rotated Right"
-            return False
-        if nose.y < 0.4:
-            self.current_status = "Brief: Head Moved Up"
-            return False
-        elif nose.y > 0.6:
-            self.current_status = "Fully Acceptable: Head Moved Down"
-            return True
-        self.current_status = "Normal Behavior"
-        return True
+        is_normal, self.current_status = lm.check_head_movement(
+            lm.to_array(landmarks), self.center_tolerance)
+        return is_normal
 
     def process_frame(self, frame_bytes):
         """
-        Processes a frame from byte data. Always runs external detection (sunglasses and object)
-        on the full frame, then runs face detection/analysis if a face is present.
+        Processes a frame from byte data. Runs the face mesh, then external detection once
+        (objects on the full frame, sunglasses on each face's eye crops), then the face analysis.
         Returns a dictionary with:
           - "status": overall status string,
           - "sunglasses_detection": dictionary with sunglasses detection result and confidence,
@@ -328,9 +245,14 @@ class FaceMonitor:
         frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
         height, width, _ = frame.shape
 
-        # Always run external classifiers on the full frame.
-        sunglasses_confidence = self.classify_sunglasses(frame)
-        object_confidence = self.detect_cheating_objects_classification(frame)
+        # Run face mesh detection first, so the sunglasses classifier gets the eye boxes.
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        results = self.face_mesh.process(rgb_frame)
+        faces = [lm.to_array(face_landmarks) for face_landmarks in results.multi_face_landmarks or ()]
+
+        # Run the external classifiers once, before anything is drawn on the frame.
+        sunglasses_confidences, object_confidence = self.external_confidences(frame, faces)
+        sunglasses_confidence = max(sunglasses_confidences, default=0.0)
         self.sunglasses_detection = {
             "detected": sunglasses_confidence >= self.sunglasses_detection_threshold,
             "confidence": sunglasses_confidence
@@ -343,23 +265,17 @@ class FaceMonitor:
         # Draw external detection indicators even if no face is detected.
         if self.object_detection["detected"]:
             self._draw_cheating_object_box(frame)
-        # Note: For sunglasses, drawing the eye boxes requires face landmarks.
 
-        # Run face mesh detection.
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb_frame)
-        if results.multi_face_landmarks:
-            for face_landmarks in results.multi_face_landmarks:
-                landmarks = face_landmarks.landmark
-                if self.sunglasses_detection["detected"]:
-                    self._draw_sunglasses_box(frame, landmarks, width, height)
-                drawing_spec = self.drawing_utils.DrawingSpec(color=(245, 245, 245), thickness=1, circle_radius=1)
+        if faces:
+            drawing_spec = self.drawing_utils.DrawingSpec(color=(245, 245, 245), thickness=1, circle_radius=1)
+            for face_landmarks, landmarks, face_confidence in zip(results.multi_face_landmarks, faces,
+                                                                  sunglasses_confidences):
                 self.drawing_utils.draw_landmarks(
                     frame, face_landmarks, self.face_mesh_module.FACEMESH_TESSELATION,
                     landmark_drawing_spec=drawing_spec, connection_drawing_spec=drawing_spec
                 )
                 self._draw_eye_points(frame, landmarks)
-                frame = self.detect_violation(frame, landmarks)
+                frame = self.detect_violation(frame, landmarks, face_confidence, object_confidence)
         else:
             cv2.putText(frame, "No face detected", (50, 150), cv2.FONT_HERSHEY_SIMPLEX,
                         1, (0, 0, 255), 2)
@@ -0,0 +1,121 @@
+"""
+Face region-of-interest tracking for the face mesh.
+
+Once a session's face has been found, the next frame is not sent to FaceMesh
+whole: the previous landmarks' bounding box, padded and made square, is cropped
+and downscaled to `size` x `size` before the colour conversion, so both the
+conversion and MediaPipe's own copy/resize work on a small image whatever the
+webcam resolution. Landmarks found in the crop are mapped back to full-frame
+normalised coordinates, so the gaze and head rules see the same values as before.
+When the face is not found in the crop, the whole frame is searched again, and
+with `full_every` it is also searched periodically so faces outside the crop (a
+second person) are still counted.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+# Crops smaller than this (in frame pixels) are not worth tracking.
+MIN_ROI = 32
+
+
+class FaceRoiTracker:
+    """
+    size=0 disables ROI tracking (every frame is searched whole). full_every > 0
+    searches the whole frame at least every `full_every` frames while tracking.
+    """
+    def __init__(self, padding: float = 0.25, size: int = 256, full_every: int = 0):
+        self.padding = padding
+        self.size = size
+        self.full_every = full_every
+        self._lock = threading.Lock()
+        self.roi_hits = 0
+        self.full_frame = 0
+        self.lost = 0
+        self.rechecks = 0
+
+    def locate(self, frame: np.ndarray, session, mesh):
+        """
+        Returns the session's face landmarks in `frame` as an (n, 3) array in
+        full-frame normalised coordinates, or None, and updates session.face_count.
+        `mesh(image)` runs the face mesh on a BGR image and returns a list with the
+        landmarks of every face found, normalised to that image.
+        """
+        height, width = frame.shape[:2]
+        box = session.face_roi if self.size else None
+        recheck = box is not None and 0 < self.full_every <= session.face_roi_frames
+        faces = []
+        if box is not None and not recheck:
+            faces = [self.to_frame(points, box, width, height) for points in mesh(self.crop(frame, box))]
+        with self._lock:
+            if faces:
+                self.roi_hits += 1
+            else:
+                self.full_frame += 1
+                self.lost += box is not None and not recheck
+                self.rechecks += recheck
+        if faces:
+            session.face_roi_frames += 1
+            # The crop may miss a second face, so the last full-frame count stands.
+            session.face_count = max(session.face_count, len(faces))
+        else:
+            faces = mesh(frame)
+            session.face_roi_frames = 0
+            session.face_count = len(faces)
+        points = self._nearest(faces, box, width, height) if faces else None
+        session.face_roi = self.box(points, width, height) if points is not None and self.size else None
+        return points
+
+    @staticmethod
+    def _nearest(faces, box, width: int, height: int) -> np.ndarray:
+        # With several faces in view, keep following the one closest to the last box.
+        if box is None or len(faces) == 1:
+            return faces[0]
+        centre = np.array([(box[0] + box[2]) / 2 / width, (box[1] + box[3]) / 2 / height])
+        return min(faces, key=lambda points: np.abs(points[:, :2].mean(axis=0) - centre).sum())
+
+    def crop(self, frame: np.ndarray, box) -> np.ndarray:
+        # box is square, so the crop keeps the face's aspect ratio at size x size.
+        # Bilinear, like MediaPipe's own input resize; INTER_AREA costs ~20x more here.
+        x0, y0, x1, y1 = box
+        return cv2.resize(frame[y0:y1, x0:x1], (self.size, self.size), interpolation=cv2.INTER_LINEAR)
+
+    def box(self, points: np.ndarray, width: int, height: int):
+        """
+        Padded square pixel box (x0, y0, x1, y1) around the landmarks, shifted to lie
+        inside the frame; None when the face is too small to track.
+        """
+        xs = points[:, 0] * width
+        ys = points[:, 1] * height
+        x_min, x_max, y_min, y_max = xs.min(), xs.max(), ys.min(), ys.max()
+        side = int(min(max(x_max - x_min, y_max - y_min) * (1 + 2 * self.padding), width, height))
+        if side < MIN_ROI:
+            return None
+        x0 = int(np.clip(round((x_min + x_max - side) / 2), 0, width - side))
+        y0 = int(np.clip(round((y_min + y_max - side) / 2), 0, height - side))
+        return x0, y0, x0 + side, y0 + side
+
+    @staticmethod
+    def to_frame(points: np.ndarray, box, width: int, height: int) -> np.ndarray:
+        """Maps crop-normalised landmarks to full-frame normalised coordinates."""
+        x0, y0, x1, _ = box
+        side = x1 - x0
+        # MediaPipe's z is on the same scale as x, i.e. relative to the image width.
+        scale = np.array([side / width, side / height, side / width], np.float32)
+        offset = np.array([x0 / width, y0 / height, 0.0], np.float32)
+        return points * scale + offset
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.roi_hits + self.full_frame
+            return {
+                'padding': self.padding,
+                'size': self.size,
+                'full_every': self.full_every,
+                'roi_hits': self.roi_hits,
+                'full_frame': self.full_frame,
+                'lost': self.lost,
+                'rechecks': self.rechecks,
+                'roi_fraction': self.roi_hits / total if total else 0.0,
+            }
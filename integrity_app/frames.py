@@ -0,0 +1,212 @@
+import base64
+import struct
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from .metrics import metrics
+
+# Content types accepted as a raw request body by process_frame.
+RAW_FRAME_TYPES = ('image/jpeg', 'image/webp')
+
+# libjpeg can decode straight to 1/2, 1/4 or 1/8 scale (DCT scaling), which is
+# much cheaper than a full decode followed by a resize.
+REDUCED_JPEG_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                      (2, cv2.IMREAD_REDUCED_COLOR_2))
+# JPEG start-of-frame markers (baseline, progressive, ...), which carry the image size.
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(data):
+    """
+    (width, height) from a JPEG's start-of-frame header without decoding it,
+    or None if `data` is not a readable JPEG.
+    """
+    if data[:2] != b'\xff\xd8':
+        return None
+    i, end = 2, len(data) - 9
+    while i < end:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack_from('>HH', data, i + 5)
+            return width, height
+        i += 2 + struct.unpack_from('>H', data, i + 2)[0]
+    return None
+
+
+def reduced_decode_flag(size, max_side: int) -> int:
+    """
+    The cheapest imdecode flag whose output still has a longest side >= max_side.
+    """
+    if not max_side or size is None:
+        return cv2.IMREAD_COLOR
+    longest = max(size)
+    for factor, flag in REDUCED_JPEG_FLAGS:
+        if longest >= max_side * factor:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def downscale(frame: np.ndarray, max_side: int) -> np.ndarray:
+    """
+    Resizes so the longest side is at most max_side: the one resize shared by the
+    face mesh and the object detector. Returns the frame itself if it already fits.
+    """
+    height, width = frame.shape[:2]
+    longest = max(width, height)
+    if not max_side or longest <= max_side:
+        return frame
+    scale = max_side / longest
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    # After a reduced decode the factor is below 2, where bilinear is accurate and
+    # INTER_AREA (non-integer factors) is several times slower.
+    interpolation = cv2.INTER_LINEAR if longest < 2 * max_side else cv2.INTER_AREA
+    return cv2.resize(frame, size, interpolation=interpolation)
+
+
+def decode_frame_bytes(data, max_side: int = 0) -> np.ndarray:
+    """
+    Decodes compressed JPEG/WebP bytes straight into a BGR frame.
+    np.frombuffer wraps the bytes without copying them.
+    With max_side, large JPEGs are decoded at reduced scale and the result is
+    downscaled so that its longest side is at most max_side.
+    Raises ValueError for empty or undecodable data.
+    """
+    if not len(data):
+        # imdecode asserts on an empty buffer instead of returning None.
+        raise ValueError("Empty image data")
+    flag = reduced_decode_flag(jpeg_size(data), max_side) if max_side else cv2.IMREAD_COLOR
+    with metrics.stage('imdecode'):
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+    if frame is None:
+        raise ValueError("Could not decode image data")
+    if max_side and max(frame.shape[:2]) > max_side:
+        with metrics.stage('resize'):
+            frame = downscale(frame, max_side)
+    return frame
+
+
+def decode_data_url(data_url: str, max_side: int = 0) -> np.ndarray:
+    """
+    Decodes a base64 'data:image/jpeg;base64,...' string (legacy form clients).
+    """
+    with metrics.stage('base64_decode'):
+        _, b64 = data_url.split(',', 1)
+        data = base64.b64decode(b64)
+    return decode_frame_bytes(data, max_side)
+
+
+def read_frame(request, max_side: int = 0) -> np.ndarray:
+    """
+    Extracts the webcam frame from a process_frame request.
+
+    Supported ingest modes:
+      - raw body with Content-Type image/jpeg or image/webp (preferred),
+      - multipart/form-data with the encoded image in the 'image' file field,
+      - application/x-www-form-urlencoded with a base64 data URL in 'image' (legacy).
+    max_side is passed on to decode_frame_bytes.
+    Raises ValueError if no decodable image is found.
+    """
+    content_type = request.content_type
+    if content_type in RAW_FRAME_TYPES:
+        return decode_frame_bytes(request.body, max_side)
+
+    if content_type == 'multipart/form-data':
+        upload = request.FILES.get('image')
+        if upload is not None:
+            return decode_frame_bytes(upload.read(), max_side)
+
+    data_url = request.POST.get('image', '')
+    if not data_url:
+        raise ValueError("No image data in request")
+    return decode_data_url(data_url, max_side)
+
+
+class FrameBufferPool:
+    """
+    Reusable uint8 image buffers keyed by shape, so per-frame scratch images
+    (annotation canvases, colour conversions) are not reallocated on every request.
+
+    Shapes come from client uploads, so the pool is bounded: at most `per_shape`
+    idle buffers per shape and `max_bytes` idle in total, the least recently used
+    shapes being dropped first, and at most `max_buffers` buffers owned by the pool
+    (idle or lent out). Beyond that, borrow() hands out a one-off buffer that is
+    not kept.
+    """
+    def __init__(self, per_shape: int = 8, max_bytes: int = 64 << 20, max_buffers: int = 64):
+        self.per_shape = per_shape
+        self.max_bytes = max_bytes
+        self.max_buffers = max_buffers
+        # shape -> idle buffers, least recently used shape first.
+        self._free = OrderedDict()
+        self._lock = threading.Lock()
+        self.allocated = 0
+        self.pooled_bytes = 0
+        self.overflow = 0
+        self.evicted = 0
+
+    @contextmanager
+    def borrow(self, shape):
+        shape = tuple(shape)
+        buf, owned = None, True
+        with self._lock:
+            free = self._free.get(shape)
+            if free:
+                buf = free.pop()
+                self.pooled_bytes -= buf.nbytes
+                if not free:
+                    del self._free[shape]
+            elif self.allocated < self.max_buffers:
+                self.allocated += 1
+            else:
+                owned = False
+                self.overflow += 1
+        if buf is None:
+            buf = np.empty(shape, np.uint8)
+        try:
+            yield buf
+        finally:
+            if owned:
+                self._give_back(shape, buf)
+
+    def _give_back(self, shape, buf):
+        with self._lock:
+            free = self._free.setdefault(shape, [])
+            self._free.move_to_end(shape)
+            if len(free) >= self.per_shape or buf.nbytes > self.max_bytes:
+                self.allocated -= 1
+                if not free:
+                    del self._free[shape]
+                return
+            free.append(buf)
+            self.pooled_bytes += buf.nbytes
+            # The shape just returned is the most recent, so it is dropped last.
+            while self.pooled_bytes > self.max_bytes:
+                oldest, bufs = next(iter(self._free.items()))
+                self.pooled_bytes -= bufs.pop().nbytes
+                self.allocated -= 1
+                self.evicted += 1
+                if not bufs:
+                    del self._free[oldest]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'allocated': self.allocated,
+                'pooled_bytes': self.pooled_bytes,
+                'overflow': self.overflow,
+                'evicted': self.evicted,
+                'free': {'x'.join(map(str, shape)): len(bufs) for shape, bufs in self._free.items()},
+            }
+
+
+# Shared by FrameAnalyzer and FaceMonitor within a worker process.
+frame_buffers = FrameBufferPool()
@@ -0,0 +1,96 @@
+"""
+Duplicate-frame gating in front of FrameAnalyzer.analyze.
+
+Each session keeps a tiny greyscale thumbnail of the last frame that was fully
+analysed. A new frame whose thumbnail differs from it by less than `threshold`
+(mean absolute difference, 0-255) reuses that frame's result; only the temporal
+violation timers are refreshed. Comparing against the analysed frame rather than
+the previous one means slow drift still adds up and eventually triggers a pass,
+and `max_age` bounds how long one result can be reused.
+"""
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from .tracking import motion_score
+
+GATE_WIDTH = 64
+
+
+class GateState:
+    """
+    Per-session gate state, kept on MonitorSession.gate.
+    """
+    __slots__ = ('thumb', 'result', 'rendered', 'analysed_at', 'skipped')
+
+    def __init__(self):
+        self.thumb = None
+        self.result = None
+        self.rendered = False
+        self.analysed_at = 0.0
+        self.skipped = 0
+
+
+class FrameGate:
+    """
+    threshold=0 disables gating. Skip counts and recent change scores are kept so
+    the threshold can be tuned against real sessions (see detector_stats).
+    """
+    def __init__(self, threshold: float = 2.0, max_age: float = 3.0, stats_window: int = 2048):
+        self.threshold = threshold
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.skipped = 0
+        self._scores = deque(maxlen=stats_window)
+
+    def thumbnail(self, grey: np.ndarray) -> np.ndarray:
+        height = max(1, round(grey.shape[0] * GATE_WIDTH / grey.shape[1]))
+        return cv2.resize(grey, (GATE_WIDTH, height), interpolation=cv2.INTER_AREA)
+
+    def check(self, thumb: np.ndarray, session, render: bool):
+        """
+        Returns the session's cached result when this frame can be skipped, else None.
+        """
+        if self.threshold <= 0:
+            return None
+        state = session.gate
+        if state is None:
+            state = session.gate = GateState()
+        score = motion_score(state.thumb, thumb)
+        skip = (state.result is not None and score < self.threshold
+                and time.time() - state.analysed_at <= self.max_age
+                and (state.rendered or not render))
+        with self._lock:
+            self.checked += 1
+            self.skipped += skip
+            if score != float('inf'):
+                self._scores.append(score)
+        if not skip:
+            return None
+        state.skipped += 1
+        return state.result
+
+    def store(self, thumb: np.ndarray, session, result: dict, render: bool):
+        if self.threshold <= 0:
+            return
+        state = session.gate
+        state.thumb = thumb
+        state.result = result
+        state.rendered = render
+        state.analysed_at = time.time()
+
+    def stats(self) -> dict:
+        with self._lock:
+            scores = np.array(self._scores) if self._scores else np.zeros(1)
+            return {
+                'threshold': self.threshold,
+                'max_age': self.max_age,
+                'checked': self.checked,
+                'skipped': self.skipped,
+                'skip_ratio': self.skipped / self.checked if self.checked else 0.0,
+                'change_score': {f'p{q}': float(np.percentile(scores, q)) for q in (10, 50, 90)},
+            }
@@ -1,23 +1,21 @@
-from google.cloud import speech
+import numpy as np
 
+from .speech import BackendError, GoogleCloudBackend
 
-def gcp_speech_to_text(audio_bytes, sample_rate=16000, language_code='en-US'):
-    client = speech.SpeechClient()
+_backend = None
 
-    audio = speech.RecognitionAudio(content=audio_bytes)
-    config = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,  # Changed to LINEAR16
-        sample_rate_hertz=sample_rate,
-        language_code=language_code,
-        enable_automatic_punctuation=True
-    )
 
+def gcp_speech_to_text(audio_bytes, sample_rate=16000, language_code='en-US'):
+    """
+    Transcribes LINEAR16 audio at `sample_rate` with Cloud Speech-to-Text through
+    speech.GoogleCloudBackend, whose SpeechClient is created once and reused.
+    """
+    global _backend
+    if len(audio_bytes) % 2:
+        return "Transcription Error: LINEAR16 audio must have an even number of bytes"
+    if _backend is None:
+        _backend = GoogleCloudBackend()
     try:
-        response = client.recognize(config=config, audio=audio)
-        return " ".join(
-            result.alternatives[0].transcript
-            for result in response.results
-        ).strip()
-
-    except Exception as e:
-        return f"Transcription Error: {str(e)}"
\ No newline at end of file
+        return _backend.transcribe(np.frombuffer(audio_bytes, np.int16), language_code, sample_rate=sample_rate)
+    except BackendError as e:
+        return f"Transcription Error: {str(e)}"
@@ -0,0 +1,208 @@
+"""
+Vectorized landmark engine for the gaze and head-movement rules.
+
+MediaPipe landmarks are converted once per frame into an (N, 3) float32 array;
+eye centres, iris centres and boundary distances are then computed with NumPy over
+the precomputed index arrays below instead of per-point Python loops. The geometry
+helpers also accept a leading batch dimension, e.g. (frames, 478, 3).
+"""
+import numpy as np
+
+NUM_REFINED_LANDMARKS = 478
+
+# Eye boundaries, in (outer, inner, top, bottom) order, one row per eye: left, right.
+EYE_BOUNDARIES = np.array([[33, 133, 159, 145],
+                           [263, 362, 386, 374]])
+EYE_LABELS = ("Outer", "Inner", "Top", "Bottom")
+SIDE_LABELS = ("Left", "Right")
+# Iris rings, one row per eye: left, right.
+IRISES = np.array([[473, 474, 475, 476, 477],
+                   [468, 469, 470, 471, 472]])
+NOSE_TIP = 1
+
+# Points used by the gaze rules, one row per eye: 4 boundary points then 5 iris points.
+GAZE_POINTS = np.concatenate([EYE_BOUNDARIES, IRISES], axis=1)
+
+# BGR colours for drawing the eye keypoints in EYE_BOUNDARIES order: left (red, green,
+# magenta, cyan), right (magenta, yellow, orange-ish, light blue); iris centres blue
+# and light purple.
+EYE_POINT_COLORS = (
+    ((0, 0, 255), (0, 255, 0), (255, 0, 255), (255, 255, 0)),
+    ((255, 0, 255), (0, 255, 255), (0, 128, 255), (255, 128, 0)),
+)
+IRIS_COLORS = ((255, 0, 0), (100, 100, 255))
+
+
+def _from_serialized(data: bytes):
+    """
+    Reads x/y/z straight out of a serialized NormalizedLandmarkList through a strided
+    float32 view when every record has the same layout; returns None otherwise.
+
+    Record layout (proto2, so x/y/z are always written, in field order):
+    0x0a <len> 0x0d <x:4> 0x15 <y:4> 0x1d <z:4> [visibility] [presence]
+    """
+    if len(data) < 17 or data[0] != 0x0a:
+        return None
+    record = data[1] + 2
+    if record < 17 or len(data) % record or data[2] != 0x0d or data[7] != 0x15 or data[12] != 0x1d:
+        return None
+    # Every record must carry the same length byte, or the stride would drift.
+    if not (np.frombuffer(data, np.uint8)[1::record] == record - 2).all():
+        return None
+    xyz = np.ndarray((len(data) // record, 3), dtype='<f4', buffer=data, offset=3, strides=(record, 5))
+    return xyz.astype(np.float32)
+
+
+def to_array(landmarks) -> np.ndarray:
+    """
+    Converts MediaPipe landmarks into an (N, 3) float32 array.
+
+    Accepts a NormalizedLandmarkList (read from its serialized bytes, which avoids one
+    Python attribute access per coordinate), a landmark sequence, or an array, which
+    is returned unchanged so callers can convert once and pass the result on.
+    """
+    if isinstance(landmarks, np.ndarray):
+        return landmarks
+    if hasattr(landmarks, 'SerializeToString'):
+        points = _from_serialized(landmarks.SerializeToString())
+        if points is not None:
+            return points
+        landmarks = landmarks.landmark
+    return np.array([(p.x, p.y, p.z) for p in landmarks], dtype=np.float32)
+
+
+def gaze_points(points: np.ndarray):
+    """
+    One gather for both eyes: (..., 2, 4, 2) boundary points and (..., 2, 5, 2) iris
+    points, in float64 so results match the previous scalar rules exactly.
+    """
+    gathered = points[..., GAZE_POINTS, :2].astype(np.float64)
+    return gathered[..., :4, :], gathered[..., 4:, :]
+
+
+def eye_centers(points: np.ndarray) -> np.ndarray:
+    """(..., 2, 2) mean of the four boundary points of each eye."""
+    return points[..., EYE_BOUNDARIES, :2].astype(np.float64).sum(axis=-2) / 4.0
+
+
+def iris_centers(points: np.ndarray) -> np.ndarray:
+    """(..., 2, 2) centre of each iris ring."""
+    return points[..., IRISES, :2].astype(np.float64).sum(axis=-2) / IRISES.shape[1]
+
+
+def boundary_distances(points: np.ndarray):
+    """
+    Distances from each eye boundary point to the iris centre and to the eye centre.
+    Returns (d_iris, d_baseline), both (..., 2, 4).
+    """
+    boundaries, iris = gaze_points(points)
+    # (..., 2, 2, 1, 2): [iris centre, eye centre] per eye.
+    centres = np.stack((iris.sum(axis=-2) / IRISES.shape[1], boundaries.sum(axis=-2) / 4.0), axis=-3)
+    diff = boundaries[..., None, :, :, :] - centres[..., None, :]
+    dist = np.sqrt((diff * diff).sum(axis=-1))
+    return dist[..., 0, :, :], dist[..., 1, :, :]
+
+
+def gaze_flags(points: np.ndarray) -> np.ndarray:
+    """
+    (..., 2, 4) True where the iris centre lies within 10% of the eye-centre-to-boundary
+    distance of that boundary point.
+    """
+    d_iris, d_baseline = boundary_distances(points)
+    return (d_baseline > 0) & (d_iris < 0.1 * d_baseline)
+
+
+def iris_horizontal_position(points: np.ndarray) -> np.ndarray:
+    """
+    (..., 2) iris centre x normalised to each eye's outer/inner corner span
+    (0.5 when the span is degenerate).
+    """
+    boundaries, iris = gaze_points(points)
+    corners_x = boundaries[..., :2, 0]
+    x_min = corners_x.min(axis=-1)
+    span = corners_x.max(axis=-1) - x_min
+    iris_x = iris[..., 0].sum(axis=-1) / IRISES.shape[1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(span != 0, (iris_x - x_min) / span, 0.5)
+
+
+def eye_pixels(points: np.ndarray, width: int, height: int) -> np.ndarray:
+    """(2, 4, 2) pixel coordinates of the eye boundary points."""
+    return (points[EYE_BOUNDARIES, :2].astype(np.float64) * (width, height)).astype(np.int32)
+
+
+def iris_pixels(points: np.ndarray, width: int, height: int) -> np.ndarray:
+    """(2, 2) pixel coordinates of the iris centres."""
+    return (iris_centers(points) * (width, height)).astype(np.int32)
+
+
+def eye_boxes(points: np.ndarray, width: int, height: int) -> np.ndarray:
+    """(2, 4) pixel boxes (x_min, y_min, x_max, y_max) around each eye's boundary points."""
+    pixels = eye_pixels(points, width, height)
+    return np.concatenate([pixels.min(axis=1), pixels.max(axis=1)], axis=1)
+
+
+def check_eye_gaze_ratio(points: np.ndarray, center_tolerance: float):
+    """
+    Iris-to-boundary rule: suspicious when the iris centre sits within 10% of the
+    eye-centre-to-boundary distance of any boundary point.
+    Returns (is_normal, status).
+    """
+    if len(points) >= NUM_REFINED_LANDMARKS:
+        flagged = gaze_flags(points)
+        if not flagged.any():
+            return True, "Normal Behavior"
+        conditions = [f"{SIDE_LABELS[side]} {EYE_LABELS[i]}" for side, i in zip(*np.nonzero(flagged))]
+        return False, "Suspicious: " + ", ".join(conditions)
+
+    # Fallback: simple checks (not using iris)
+    mid_x = (float(points[33, 0]) + float(points[263, 0])) / 2
+    if abs(mid_x - 0.5) > center_tolerance:
+        return False, "Brief: Looking Left" if mid_x < 0.5 else "Brief: Looking Right"
+    avg_y = (float(points[133, 1]) + float(points[362, 1])) / 2
+    if avg_y < 0.5 - 0.15:
+        return False, "Brief: Looking Up"
+    if avg_y > 0.5 + 0.10:
+        return False, "Brief: Looking Down"
+    return True, "Normal Behavior"
+
+
+def check_eye_gaze_horizontal(points: np.ndarray, center_tolerance: float):
+    """
+    Horizontal rule: suspicious when an iris centre is within the outer 10% of its
+    eye's corner-to-corner span. Returns (is_normal, status).
+    """
+    if len(points) >= NUM_REFINED_LANDMARKS:
+        norm_left_x, norm_right_x = iris_horizontal_position(points).tolist()
+        conditions = []
+        if norm_left_x < 0.10:
+            conditions.append("Left Outer")
+        if norm_left_x > 0.90:
+            conditions.append("Left Inner")
+        if norm_right_x < 0.10:
+            conditions.append("Right Inner")
+        if norm_right_x > 0.90:
+            conditions.append("Right Outer")
+        if conditions:
+            return False, "Suspicious: " + ", ".join(conditions)
+        return True, "Normal Behavior"
+
+    # Fallback: simple horizontal check.
+    mid_x = (float(points[33, 0]) + float(points[263, 0])) / 2
+    if abs(mid_x - 0.5) > center_tolerance:
+        return False, "Brief: Looking Left" if mid_x < 0.5 else "Brief: Looking Right"
+    return True, "Normal Behavior"
+
+
+def check_head_movement(points: np.ndarray, center_tolerance: float):
+    """
+    Head position from the nose tip (landmark 1). Returns (is_normal, status).
+    """
+    nose_x, nose_y = points[NOSE_TIP, :2].tolist()
+    if abs(nose_x - 0.5) > center_tolerance:
+        return False, "Brief: Head Rotated Left" if nose_x < 0.5 else "Brief: Head Rotated Right"
+    if nose_y < 0.4:
+        return False, "Brief: Head Moved Up"
+    if nose_y > 0.6:
+        return True, "Fully Acceptable: Head Moved Down"
+    return True, "Normal Behavior"
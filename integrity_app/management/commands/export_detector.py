@@ -0,0 +1,35 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from integrity_app.detectors import BACKENDS, export_detector
+
+
+class Command(BaseCommand):
+    help = "Exports models/best.pt for the ONNX Runtime or OpenVINO detector backend (optionally int8)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', choices=BACKENDS[1:], default=None,
+                            help="Defaults to INTEGRITY_DETECTOR_BACKEND.")
+        parser.add_argument('--int8', action='store_true', default=None,
+                            help="Static int8 quantization; defaults to INTEGRITY_DETECTOR_INT8.")
+        parser.add_argument('--calibration-dir', type=Path, default=None,
+                            help="Folder of representative webcam frames for int8 calibration.")
+        parser.add_argument('--calibration-limit', type=int, default=200)
+        parser.add_argument('--imgsz', type=int, default=settings.INTEGRITY_YOLO_IMGSZ,
+                            help="Defaults to INTEGRITY_YOLO_IMGSZ.")
+        parser.add_argument('--weights', type=Path, default=Path(settings.BASE_DIR) / 'models' / 'best.pt')
+
+    def handle(self, *args, **options):
+        backend = options['backend'] or settings.INTEGRITY_DETECTOR_BACKEND
+        if backend == 'torch':
+            raise CommandError("INTEGRITY_DETECTOR_BACKEND is 'torch'; pass --backend onnx or --backend openvino.")
+        int8 = settings.INTEGRITY_DETECTOR_INT8 if options['int8'] is None else options['int8']
+        calibration_dir = options['calibration_dir'] or settings.INTEGRITY_DETECTOR_CALIBRATION_DIR
+        try:
+            path = export_detector(options['weights'], backend, int8, calibration_dir,
+                                   imgsz=options['imgsz'], calibration_limit=options['calibration_limit'])
+        except (ValueError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Exported {backend}{' int8' if int8 else ''} detector to {path}"))
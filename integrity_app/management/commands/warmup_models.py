@@ -0,0 +1,19 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from integrity_app import pipeline
+
+
+class Command(BaseCommand):
+    help = ("Loads the face and object models and runs dummy batches through them, printing the timings. "
+            "Use it at deploy time to fail fast on missing weights and to build exported detectors; "
+            "server processes warm themselves (see INTEGRITY_WARMUP_ON_START and /ready/).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--frames', type=int, default=3, help="Sequential dummy frames before the batched round.")
+
+    def handle(self, *args, **options):
+        timings = pipeline.warmup(frames=options['frames'])
+        self.stdout.write(json.dumps(timings, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Models warm in {timings['total_s']:.2f}s"))
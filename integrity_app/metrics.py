@@ -0,0 +1,232 @@
+"""
+In-process metrics for the frame pipeline, exposed in Prometheus text format.
+
+Per-stage latencies go into fixed-bucket histograms (one bisect and two integer
+increments per observation), from which p50/p95/p99 are estimated. When metrics
+are disabled, `stage()` hands back a shared no-op context manager and `observe()`
+returns immediately, so instrumented code costs one attribute check.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Latency buckets in seconds, 0.5 ms to 10 s.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.0075, 0.01, 0.015, 0.02, 0.03, 0.05, 0.075,
+                   0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (50, 95, 99)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the q-th percentile by linear interpolation inside its bucket,
+        as Prometheus' histogram_quantile does.
+        """
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class _Stage:
+    __slots__ = ('_metrics', '_name', '_start')
+
+    def __init__(self, metrics, name):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.observe(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _InFlight:
+    __slots__ = ('_metrics',)
+
+    def __init__(self, metrics):
+        self._metrics = metrics
+
+    def __enter__(self):
+        with self._metrics._lock:
+            self._metrics.in_flight += 1
+
+    def __exit__(self, *exc):
+        with self._metrics._lock:
+            self._metrics.in_flight -= 1
+        return False
+
+
+class Metrics:
+    """
+    Process-wide registry. Each server worker process keeps its own numbers and
+    labels them with its pid, so Prometheus can aggregate across workers.
+    """
+    def __init__(self, enabled: bool = False, rate_window: int = 10):
+        self.enabled = enabled
+        self.rate_window = rate_window
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self.frames = 0
+        self.in_flight = 0
+        # Ring of per-second frame counts and the second each slot currently holds.
+        self._slot_second = [0] * rate_window
+        self._per_second = [0] * rate_window
+        self._in_flight_ctx = _InFlight(self)
+        # Callables returning {name: bytes}, registered by loaded models.
+        self._memory_sources = []
+
+    def stage(self, name: str):
+        """
+        `with metrics.stage('imdecode'): ...` records the block's wall time.
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def observe(self, name: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = Histogram()
+            hist.observe(seconds)
+
+    def in_flight_request(self):
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._in_flight_ctx
+
+    def frame_done(self):
+        if not self.enabled:
+            return
+        now = int(time.time())
+        slot = now % self.rate_window
+        with self._lock:
+            self.frames += 1
+            if self._slot_second[slot] != now:
+                self._slot_second[slot] = now
+                self._per_second[slot] = 0
+            self._per_second[slot] += 1
+
+    def fps(self) -> float:
+        """Frames per second over the last rate_window - 1 complete seconds."""
+        now = int(time.time())
+        with self._lock:
+            total = sum(n for second, n in zip(self._slot_second, self._per_second)
+                        if now - self.rate_window < second < now)
+        return total / (self.rate_window - 1)
+
+    def register_memory(self, source):
+        with self._lock:
+            self._memory_sources.append(source)
+
+    def _memory(self) -> dict:
+        memory = {'rss': _rss_bytes()}
+        for source in list(self._memory_sources):
+            try:
+                memory.update(source())
+            except Exception:
+                pass
+        return memory
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {
+                name: {**{f'p{q}_ms': h.quantile(q) * 1000 for q in QUANTILES},
+                       'count': h.count, 'mean_ms': h.total / h.count * 1000 if h.count else 0.0}
+                for name, h in sorted(self._histograms.items())
+            }
+            frames, in_flight = self.frames, self.in_flight
+        return {'enabled': self.enabled, 'frames': frames, 'fps': self.fps(), 'in_flight': in_flight,
+                'stages': stages, 'memory_bytes': self._memory()}
+
+    def render_prometheus(self) -> str:
+        pid = os.getpid()
+        lines = [
+            '# HELP integrity_stage_seconds Frame pipeline stage latency.',
+            '# TYPE integrity_stage_seconds histogram',
+        ]
+        with self._lock:
+            histograms = [(name, list(h.counts), h.total, h.count, [h.quantile(q) for q in QUANTILES])
+                          for name, h in sorted(self._histograms.items())]
+            frames, in_flight = self.frames, self.in_flight
+        for name, counts, total, count, _ in histograms:
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS + ('+Inf',), counts):
+                cumulative += n
+                lines.append(f'integrity_stage_seconds_bucket{{stage="{name}",pid="{pid}",le="{bound}"}} {cumulative}')
+            lines.append(f'integrity_stage_seconds_sum{{stage="{name}",pid="{pid}"}} {total}')
+            lines.append(f'integrity_stage_seconds_count{{stage="{name}",pid="{pid}"}} {count}')
+        lines += ['# HELP integrity_stage_quantile_seconds Estimated per-stage latency quantiles in this worker.',
+                  '# TYPE integrity_stage_quantile_seconds gauge']
+        for name, _, _, _, quantiles in histograms:
+            for q, value in zip(QUANTILES, quantiles):
+                lines.append(f'integrity_stage_quantile_seconds{{stage="{name}",pid="{pid}",quantile="0.{q}"}} {value}')
+        lines += [
+            '# HELP integrity_frames_total Frames analysed.',
+            '# TYPE integrity_frames_total counter',
+            f'integrity_frames_total{{pid="{pid}"}} {frames}',
+            '# HELP integrity_frames_per_second Frames analysed per second over the last few seconds.',
+            '# TYPE integrity_frames_per_second gauge',
+            f'integrity_frames_per_second{{pid="{pid}"}} {self.fps()}',
+            '# HELP integrity_in_flight_requests Frame requests currently being processed.',
+            '# TYPE integrity_in_flight_requests gauge',
+            f'integrity_in_flight_requests{{pid="{pid}"}} {in_flight}',
+            '# HELP integrity_memory_bytes Worker resident memory and model sizes.',
+            '# TYPE integrity_memory_bytes gauge',
+        ]
+        for kind, value in sorted(self._memory().items()):
+            lines.append(f'integrity_memory_bytes{{kind="{kind}",pid="{pid}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+metrics = Metrics()
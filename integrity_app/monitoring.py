@@ -3,47 +3,78 @@ import time
 import numpy as np
 import mediapipe as mp
 
+from . import landmarks as lm
+from .face_roi import FaceRoiTracker
+from .frames import frame_buffers
+from .sessions import FaceMeshPool
+
+# Landmarks returned to clients so they can draw the face overlay themselves.
+OVERLAY_LANDMARKS = {
+    'left_outer': 33, 'left_inner': 133, 'left_top': 159, 'left_bottom': 145,
+    'right_outer': 263, 'right_inner': 362, 'right_top': 386, 'right_bottom': 374,
+    'nose': 1,
+}
+MESH_COLOR = (245, 245, 245)
+# Faces the mesh looks for: enough to tell that someone else is in view.
+MAX_FACES = 2
+
 
 class FaceMonitor:
-    def __init__(self):
+    """
+    Stateless gaze/head rules shared by all students.
+    Temporal state (status, suspicious timer, face ROI) lives on the MonitorSession
+    passed to each call, and FaceMesh graphs are borrowed from a bounded pool.
+    With roi_size > 0 the mesh runs on a crop around the session's last face
+    (see face_roi.FaceRoiTracker), and the whole frame is searched again every
+    roi_full_every frames so a second face is still counted.
+    """
+    def __init__(self, pool_size=2, roi_padding=0.25, roi_size=256, roi_full_every=0):
         self.face_mesh_module = mp.solutions.face_mesh
-        # Initialize face mesh with refined landmarks (which include iris info).
-        self.face_mesh = self.face_mesh_module.FaceMesh(refine_landmarks=True)
-        self.drawing_utils = mp.solutions.drawing_utils
+        # Face mesh graphs with refined landmarks (which include iris info).
+        # Static image mode: a pooled graph serves many students, so it must not
+        # carry tracking state from one student's frame to the next. The price is
+        # the face detector on every frame (about 2.5 ms on the ROI crop), which a
+        # tracking-mode graph per student would skip but at ~20 MB of memory each;
+        # benchmarks.face_roi measures both.
+        self.mesh_pool = FaceMeshPool(
+            lambda: self.face_mesh_module.FaceMesh(static_image_mode=True, refine_landmarks=True,
+                                                   max_num_faces=MAX_FACES),
+            pool_size
+        )
+        self.roi = FaceRoiTracker(roi_padding, roi_size, roi_full_every)
+        # Tesselation edges as an (k, 2) index array, for drawing from landmark arrays.
+        self._tesselation = np.array(sorted(self.face_mesh_module.FACEMESH_TESSELATION), np.int32)
 
         # Parameters
         self.suspicious_threshold = 1.5  # seconds before alerting
         self.center_tolerance = 0.10  # fallback if iris not available
 
-        self.last_normal_time = time.time()
-        self.suspicious_active = False
-        self.current_status = "Normal Behavior"
-
-    # Helper: extract point as tuple
-    def _point(self, p):
-        return (p.x, p.y)
-
-    # Helper: Euclidean distance between two points (tuples)
-    def _dist(self, p1, p2):
-        return ((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2) ** 0.5
-
-    def track_gaze(self, landmarks):
-        eyes_ok = self._check_eye_gaze(landmarks)
-        head_ok = self._check_head_movement(landmarks)
+    def track_gaze(self, landmarks, session):
+        eyes_ok = self._check_eye_gaze(landmarks, session)
+        head_ok = self._check_head_movement(landmarks, session)
         return eyes_ok and head_ok
 
-    def detect_violation(self, frame, landmarks):
-        is_normal = self.track_gaze(landmarks)
+    def update_violation(self, landmarks, session):
+        """
+        Applies the gaze/head rules and the suspicious-duration timer to the session.
+        Returns True once suspicious behaviour has lasted past suspicious_threshold.
+        """
+        is_normal = self.track_gaze(landmarks, session)
         if not is_normal:
-            if not self.suspicious_active:
-                self.last_normal_time = time.time()
-                self.suspicious_active = True
-            elif time.time() - self.last_normal_time > self.suspicious_threshold:
-                self.annotate_alert(frame, f"Suspicious: {self.current_status}")
+            if not session.suspicious_active:
+                session.last_normal_time = time.time()
+                session.suspicious_active = True
+            elif time.time() - session.last_normal_time > self.suspicious_threshold:
+                return True
         else:
-            self.suspicious_active = False
+            session.suspicious_active = False
+        return False
 
-        cv2.putText(frame, self.current_status, (50, 100),
+    def detect_violation(self, frame, landmarks, session):
+        if self.update_violation(landmarks, session):
+            self.annotate_alert(frame, f"Suspicious: {session.current_status}")
+
+        cv2.putText(frame, session.current_status, (50, 100),
                     cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
         return frame
 
@@ -51,150 +82,130 @@ class FaceMonitor:
         cv2.putText(frame, message, (50, 50),
                     cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
 
-    def analyze_face(self, frame):
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb_frame)
-        if results.multi_face_landmarks:
-            drawing_spec = self.drawing_utils.DrawingSpec(color=(245, 245, 245), thickness=1, circle_radius=1)
-            for face_landmarks in results.multi_face_landmarks:
-                self.drawing_utils.draw_landmarks(
-                    frame, face_landmarks, self.face_mesh_module.FACEMESH_TESSELATION,
-                    landmark_drawing_spec=drawing_spec,
-                    connection_drawing_spec=drawing_spec
-                )
-                self._draw_eye_points(frame, face_landmarks.landmark)
-                frame = self.detect_violation(frame, face_landmarks.landmark)
-        return frame
+    def analyze_face(self, frame, session, out=None):
+        """
+        Runs the face mesh on `frame` and draws the annotations onto `out`.
+        If `out` is None the frame is annotated in place; otherwise `frame` is only
+        read, so it may be a read-only view shared with other detectors.
+        """
+        if out is None:
+            out = frame
+        self.evaluate(frame, session, out)
+        return out
 
-    def _draw_eye_points(self, frame, landmarks):
+    def evaluate(self, frame, session, out=None):
+        """
+        Runs the face mesh and the violation rules and returns structured results:
+        status, flags, the number of faces in view and the landmark subset needed
+        to draw overlays client-side. The rules apply to the student's face only.
+        Annotations are rendered onto `out` only when it is given.
+        """
+        if out is not None and out is not frame:
+            np.copyto(out, frame)
+        landmarks = self.roi.locate(frame, session, self.mesh_faces)
+
+        face = {'face_detected': False, 'alert': False, 'landmarks': None,
+                'face_count': session.face_count, 'multiple_faces': session.face_count > 1}
+        if landmarks is not None:
+            if out is not None:
+                self._draw_mesh(out, landmarks)
+                self._draw_eye_points(out, landmarks)
+                self.detect_violation(out, landmarks, session)
+            else:
+                self.update_violation(landmarks, session)
+            face['face_detected'] = True
+            face['landmarks'] = self.landmark_subset(landmarks)
+        return self.refresh(face, session)
+
+    def evaluate_landmarks(self, landmarks, session):
+        """
+        Applies the violation rules to landmarks computed elsewhere (by the browser in
+        client-inference mode). `landmarks` is an (n, 3) array, or None for no face.
+        Returns the same structure as evaluate; the browser reports one face at most.
+        """
+        face = {'face_detected': False, 'alert': False, 'landmarks': None,
+                'face_count': int(landmarks is not None), 'multiple_faces': False}
+        if landmarks is not None:
+            self.update_violation(landmarks, session)
+            face['face_detected'] = True
+            face['landmarks'] = self.landmark_subset(landmarks)
+        return self.refresh(face, session)
+
+    def mesh_faces(self, frame):
+        """
+        Runs the face mesh alone and returns a list with each face's (n, 3) landmarks.
+        """
+        results = self._process(frame)
+        return [lm.to_array(face) for face in results.multi_face_landmarks or ()]
+
+    def mesh_landmarks(self, frame):
+        """
+        Runs the face mesh alone and returns the first face's (n, 3) landmarks, or None.
+        """
+        faces = self.mesh_faces(frame)
+        return faces[0] if faces else None
+
+    def _process(self, frame):
+        with frame_buffers.borrow(frame.shape) as rgb_frame:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_frame)
+            with self.mesh_pool.borrow() as face_mesh:
+                return face_mesh.process(rgb_frame)
+
+    def refresh(self, face, session):
+        """
+        Re-evaluates only the time-based fields of a previous face result, for a frame
+        that was skipped as a near-duplicate: the rules would give the same outcome,
+        but the suspicious timer keeps running.
+        """
+        return {
+            **face,
+            'status': session.current_status,
+            'suspicious': session.suspicious_active,
+            'alert': session.suspicious_active and (
+                    time.time() - session.last_normal_time > self.suspicious_threshold),
+        }
+
+    def landmark_subset(self, landmarks):
+        """
+        Normalised (x, y) of the eye corners/lids, iris centres and nose tip.
+        """
+        points = lm.to_array(landmarks)
+        subset = {name: [round(float(points[i, 0]), 4), round(float(points[i, 1]), 4)]
+                  for name, i in OVERLAY_LANDMARKS.items()}
+        if len(points) >= lm.NUM_REFINED_LANDMARKS:
+            for name, (x, y) in zip(('left_iris', 'right_iris'), lm.iris_centers(points)):
+                subset[name] = [round(float(x), 4), round(float(y), 4)]
+        return subset
+
+    def _draw_mesh(self, frame, landmarks):
         height, width, _ = frame.shape
+        pixels = np.rint(lm.to_array(landmarks)[:, :2] * (width, height)).astype(np.int32)
+        cv2.polylines(frame, pixels[self._tesselation], False, MESH_COLOR, 1)
+        for x, y in pixels.tolist():
+            cv2.circle(frame, (x, y), 1, MESH_COLOR, 1)
 
-        # Left eye boundaries.
-        left_outer = landmarks[33]
-        left_inner = landmarks[133]
-        left_top = landmarks[159]
-        left_bottom = landmarks[145]
-        # Draw left eye keypoints.
-        cv2.circle(frame, (int(left_outer.x * width), int(left_outer.y * height)), 2, (0, 0, 255), -1)  # Red
-        cv2.circle(frame, (int(left_inner.x * width), int(left_inner.y * height)), 2, (0, 255, 0), -1)  # Green
-        cv2.circle(frame, (int(left_top.x * width), int(left_top.y * height)), 2, (255, 0, 255), -1)  # Magenta
-        cv2.circle(frame, (int(left_bottom.x * width), int(left_bottom.y * height)), 2, (255, 255, 0), -1)  # Cyan
-
-        # Left iris.
-        left_iris_points = landmarks[473:478]
-        left_iris_center_x = sum(p.x for p in left_iris_points) / len(left_iris_points)
-        left_iris_center_y = sum(p.y for p in left_iris_points) / len(left_iris_points)
-        cv2.circle(frame, (int(left_iris_center_x * width), int(left_iris_center_y * height)), 2, (255, 0, 0),
-                   -1)  # Blue
-
-        # Right eye boundaries.
-        right_outer = landmarks[263]
-        right_inner = landmarks[362]
-        right_top = landmarks[386]
-        right_bottom = landmarks[374]
-        cv2.circle(frame, (int(right_outer.x * width), int(right_outer.y * height)), 2, (255, 0, 255), -1)  # Magenta
-        cv2.circle(frame, (int(right_inner.x * width), int(right_inner.y * height)), 2, (0, 255, 255), -1)  # Yellow
-        cv2.circle(frame, (int(right_top.x * width), int(right_top.y * height)), 2, (0, 128, 255), -1)  # Orange-ish
-        cv2.circle(frame, (int(right_bottom.x * width), int(right_bottom.y * height)), 2, (255, 128, 0),
-                   -1)  # Light Blue
-
-        # Right iris.
-        right_iris_points = landmarks[468:473]
-        right_iris_center_x = sum(p.x for p in right_iris_points) / len(right_iris_points)
-        right_iris_center_y = sum(p.y for p in right_iris_points) / len(right_iris_points)
-        cv2.circle(frame, (int(right_iris_center_x * width), int(right_iris_center_y * height)), 2, (100, 100, 255),
-                   -1)  # Light Purple
-
-    def _check_eye_gaze(self, landmarks):
-        # Use this method if we have refined landmarks (>=478).
-        if len(landmarks) >= 478:
-            # --- LEFT EYE ---
-            left_boundaries = [landmarks[33], landmarks[133], landmarks[159], landmarks[145]]
-            # Compute the center of the left eye (average of four boundary points).
-            left_center = (
-                sum(p.x for p in left_boundaries) / 4.0,
-                sum(p.y for p in left_boundaries) / 4.0
-            )
-            # Compute the iris center.
-            left_iris_points = landmarks[473:478]
-            left_iris_center = (
-                sum(p.x for p in left_iris_points) / len(left_iris_points),
-                sum(p.y for p in left_iris_points) / len(left_iris_points)
-            )
-            suspicious_conditions = []
-            # For each boundary of the left eye, check the ratio of
-            # distance(iris, boundary) / distance(eye_center, boundary)
-            left_labels = ["Outer", "Inner", "Top", "Bottom"]
-            for boundary, label in zip(left_boundaries, left_labels):
-                eye_boundary = self._point(boundary)
-                d_baseline = self._dist(left_center, eye_boundary)
-                d_iris = self._dist(left_iris_center, eye_boundary)
-                # If the iris is within 10% of the distance from the eye center to the boundary:
-                if d_baseline > 0 and d_iris < 0.1 * d_baseline:
-                    suspicious_conditions.append(f"Left {label}")
-
-            # --- RIGHT EYE ---
-            right_boundaries = [landmarks[263], landmarks[362], landmarks[386], landmarks[374]]
-            right_center = (
-                sum(p.x for p in right_boundaries) / 4.0,
-                sum(p.y for p in right_boundaries) / 4.0
-            )
-            right_iris_points = landmarks[468:473]
-            right_iris_center = (
-                sum(p.x for p in right_iris_points) / len(right_iris_points),
-                sum(p.y for p in right_iris_points) / len(right_iris_points)
-            )
-            right_labels = ["Outer", "Inner", "Top", "Bottom"]
-            for boundary, label in zip(right_boundaries, right_labels):
-                eye_boundary = self._point(boundary)
-                d_baseline = self._dist(right_center, eye_boundary)
-                d_iris = self._dist(right_iris_center, eye_boundary)
-                if d_baseline > 0 and d_iris < 0.1 * d_baseline:
-                    suspicious_conditions.append(f"Right {label}")
-
-            if suspicious_conditions:
-                self.current_status = "Suspicious: " + ", ".join(suspicious_conditions)
-                return False
-            else:
-                self.current_status = "Normal Behavior"
-                return True
-        else:
-            # Fallback: simple checks (not using iris)
-            left_eye_outer = landmarks[33]
-            right_eye_outer = landmarks[263]
-            mid_x = (left_eye_outer.x + right_eye_outer.x) / 2
-            horizontal_deviation = abs(mid_x - 0.5)
-            if horizontal_deviation > self.center_tolerance:
-                self.current_status = "Brief: Looking Left" if mid_x < 0.5 else "Brief: Looking Right"
-                return False
-            else:
-                avg_y = (landmarks[133].y + landmarks[362].y) / 2
-                center_y = 0.5
-                if avg_y < center_y - 0.15:
-                    self.current_status = "Brief: Looking Up"
-                    return False
-                elif avg_y > center_y + 0.10:
-                    self.current_status = "Brief: Looking Down"
-                    return False
-                else:
-                    self.current_status = "Normal Behavior"
-                    return True
-
-    def _check_head_movement(self, landmarks):
-        nose = landmarks[1]
-        if abs(nose.x - 0.5) > self.center_tolerance:
-            self.current_status = "Brief: Head Rotated Left" if nose.x < 0.5 else "Brief: Head Rotated Right"
-            return False
-        if nose.y < 0.4:
-            self.current_status = "Brief: Head Moved Up"
-            return False
-        elif nose.y > 0.6:
-            self.current_status = "Fully Acceptable: Head Moved Down"
-            return True
-        self.current_status = "Normal Behavior"
-        return True
-
-    def process_frame(self, frame_bytes):
+    def _draw_eye_points(self, frame, landmarks):
+        height, width, _ = frame.shape
+        points = lm.to_array(landmarks)
+
+        # Eye boundaries (outer, inner, top, bottom) and iris centres, left then right.
+        for eye, colors in zip(lm.eye_pixels(points, width, height), lm.EYE_POINT_COLORS):
+            for (x, y), color in zip(eye.tolist(), colors):
+                cv2.circle(frame, (x, y), 2, color, -1)
+        for (x, y), color in zip(lm.iris_pixels(points, width, height).tolist(), lm.IRIS_COLORS):
+            cv2.circle(frame, (x, y), 2, color, -1)
+
+    def _check_eye_gaze(self, landmarks, session):
+        is_normal, session.current_status = lm.check_eye_gaze_ratio(
+            lm.to_array(landmarks), self.center_tolerance)
+        return is_normal
+
+    def _check_head_movement(self, landmarks, session):
+        is_normal, session.current_status = lm.check_head_movement(
+            lm.to_array(landmarks), self.center_tolerance)
+        return is_normal
+
+    def process_frame(self, frame_bytes, session):
         """
         Process a frame from bytes data sent by the client.
         Returns a dictionary with the current status, a flag for suspicious behavior,
@@ -202,12 +213,12 @@ class FaceMonitor:
         """
         nparr = np.frombuffer(frame_bytes, np.uint8)
         frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        processed_frame = self.analyze_face(frame)
+        processed_frame = self.analyze_face(frame, session)
         retval, buffer = cv2.imencode('.jpg', processed_frame)
         processed_bytes = buffer.tobytes()
         return {
-            "status": self.current_status,
-            "is_suspicious": self.suspicious_active and (
-                        time.time() - self.last_normal_time > self.suspicious_threshold),
+            "status": session.current_status,
+            "is_suspicious": session.suspicious_active and (
+                        time.time() - session.last_normal_time > self.suspicious_threshold),
             "frame_data": processed_bytes
         }
\ No newline at end of file
@@ -0,0 +1,342 @@
+"""
+Lazily constructed analysis pipeline.
+
+Importing the URLconf no longer loads torch, ultralytics, MediaPipe or the YOLO
+weights: the analyzers are built on first use, and warm-up runs dummy frames
+through them so the first real frame does not pay the cold-inference cost.
+The readiness endpoint reports ready only once warm-up has finished.
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .admission import AdmissionController, Superseded
+from .client_inference import FULL_FRAME, SpotChecker
+from .evidence import EvidenceRecorder
+from .metrics import metrics
+from .sampling import SamplingPolicy
+from .sessions import SessionRegistry
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = Path(settings.BASE_DIR) / 'models' / 'best.pt'
+
+# Per-attempt monitoring state shared by the HTTP and WebSocket frame paths.
+sessions = SessionRegistry(
+    ttl=settings.INTEGRITY_SESSION_TTL,
+    max_sessions=settings.INTEGRITY_MAX_SESSIONS,
+)
+admission = AdmissionController(
+    settings.INTEGRITY_MAX_CONCURRENT_FRAMES,
+    base_interval_ms=settings.INTEGRITY_CAPTURE_INTERVAL_MS,
+    wait_timeout=settings.INTEGRITY_FRAME_WAIT_TIMEOUT,
+)
+sampling = SamplingPolicy(
+    min_ms=settings.INTEGRITY_CAPTURE_MIN_MS,
+    base_ms=settings.INTEGRITY_CAPTURE_INTERVAL_MS,
+    max_ms=settings.INTEGRITY_CAPTURE_MAX_MS,
+    calm_step=settings.INTEGRITY_CAPTURE_CALM_STEP,
+    boost_seconds=settings.INTEGRITY_CAPTURE_BOOST_SECONDS,
+    budget_fps=settings.INTEGRITY_NODE_FPS_BUDGET,
+)
+spot_checks = SpotChecker(
+    rate=settings.INTEGRITY_SPOT_CHECK_RATE,
+    tolerance=settings.INTEGRITY_SPOT_CHECK_TOLERANCE,
+    max_failures=settings.INTEGRITY_SPOT_CHECK_MAX_FAILURES,
+)
+evidence = EvidenceRecorder(
+    budget=settings.INTEGRITY_EVIDENCE_BUFFER_BYTES,
+    max_side=settings.INTEGRITY_EVIDENCE_MAX_SIDE,
+    quality=settings.INTEGRITY_EVIDENCE_QUALITY,
+    fmt=settings.INTEGRITY_EVIDENCE_FORMAT,
+    cooldown=settings.INTEGRITY_EVIDENCE_COOLDOWN,
+)
+
+_lock = threading.Lock()
+_frame_analyzer = None
+_audio_analyzer = None
+_sound_monitor = None
+_speech_recognizer = None
+_warm = threading.Event()
+_warming = False
+_state = {'loaded_in_s': None, 'warmed_in_s': None, 'error': None}
+
+
+def get_frame_analyzer():
+    global _frame_analyzer
+    if _frame_analyzer is None:
+        with _lock:
+            if _frame_analyzer is None:
+                start = time.perf_counter()
+                from .analyzers import FrameAnalyzer
+                from .monitoring import FaceMonitor
+                _frame_analyzer = FrameAnalyzer(
+                    MODEL_PATH, FaceMonitor(pool_size=settings.INTEGRITY_FACE_MESH_POOL_SIZE,
+                                            roi_padding=settings.INTEGRITY_FACE_ROI_PADDING,
+                                            roi_size=settings.INTEGRITY_FACE_ROI_SIZE,
+                                            roi_full_every=settings.INTEGRITY_FACE_ROI_FULL_EVERY),
+                    batch_size=settings.INTEGRITY_YOLO_BATCH_SIZE,
+                    batch_wait_ms=settings.INTEGRITY_YOLO_BATCH_WAIT_MS,
+                    workers=settings.INTEGRITY_ANALYZER_WORKERS,
+                    backend=settings.INTEGRITY_DETECTOR_BACKEND,
+                    int8=settings.INTEGRITY_DETECTOR_INT8,
+                    calibration_dir=settings.INTEGRITY_DETECTOR_CALIBRATION_DIR,
+                    detect_interval=settings.INTEGRITY_DETECT_INTERVAL,
+                    motion_threshold=settings.INTEGRITY_TRACK_MOTION_THRESHOLD,
+                    gate_threshold=settings.INTEGRITY_GATE_THRESHOLD,
+                    gate_max_age=settings.INTEGRITY_GATE_MAX_AGE,
+                    imgsz=settings.INTEGRITY_YOLO_IMGSZ,
+                    classes=settings.INTEGRITY_DETECTOR_CLASSES,
+                    conf=settings.INTEGRITY_DETECTOR_CONF,
+                )
+                metrics.register_memory(_frame_analyzer.model_memory)
+                _state['loaded_in_s'] = time.perf_counter() - start
+                logger.info("Frame analyzer loaded in %.2fs", _state['loaded_in_s'])
+    return _frame_analyzer
+
+
+def get_speech_recognizer():
+    """
+    The multi-language recognizer shared by AudioAnalyzer and SoundMonitor, so HTTP
+    uploads and live streams draw on one bounded pool of recognition threads.
+    """
+    global _speech_recognizer
+    if _speech_recognizer is None:
+        with _lock:
+            if _speech_recognizer is None:
+                from .recognition import MultiLanguageRecognizer
+                from .speech import load_backend
+                backend = load_backend(settings.INTEGRITY_SPEECH_BACKEND,
+                                       timeout=settings.INTEGRITY_SPEECH_TIMEOUT,
+                                       stub_latency=settings.INTEGRITY_SPEECH_STUB_LATENCY,
+                                       vosk_models=settings.INTEGRITY_SPEECH_VOSK_MODELS,
+                                       max_batch=settings.INTEGRITY_SPEECH_MAX_BATCH)
+                _speech_recognizer = MultiLanguageRecognizer(backend, workers=settings.INTEGRITY_SPEECH_WORKERS,
+                                                             timeout=settings.INTEGRITY_SPEECH_TIMEOUT,
+                                                             max_wait_ms=settings.INTEGRITY_SPEECH_BATCH_WAIT_MS)
+    return _speech_recognizer
+
+
+def get_audio_analyzer():
+    global _audio_analyzer
+    if _audio_analyzer is None:
+        recognizer = get_speech_recognizer()
+        with _lock:
+            if _audio_analyzer is None:
+                from .analyzers import AudioAnalyzer
+                _audio_analyzer = AudioAnalyzer(Path(settings.MEDIA_ROOT), ffmpeg=settings.INTEGRITY_FFMPEG,
+                                                archive=settings.INTEGRITY_AUDIO_ARCHIVE,
+                                                vad=settings.INTEGRITY_VAD_ENABLED, recognizer=recognizer)
+    return _audio_analyzer
+
+
+def get_sound_monitor():
+    global _sound_monitor
+    if _sound_monitor is None:
+        recognizer = get_speech_recognizer()
+        with _lock:
+            if _sound_monitor is None:
+                from .sound_monitor import SoundMonitor
+                _sound_monitor = SoundMonitor(ffmpeg=settings.INTEGRITY_FFMPEG, vad=settings.INTEGRITY_VAD_ENABLED,
+                                              recognizer=recognizer)
+    return _sound_monitor
+
+
+# The components as built so far, without building them: None until first use.
+# For reporting (detector_stats), which must not load models on its own.
+def peek_frame_analyzer():
+    return _frame_analyzer
+
+
+def peek_audio_analyzer():
+    return _audio_analyzer
+
+
+def peek_sound_monitor():
+    return _sound_monitor
+
+
+def peek_speech_recognizer():
+    return _speech_recognizer
+
+
+def session_key(user_pk, attempt_id) -> str:
+    # One monitoring session per attempt, scoped to the student so a client
+    # cannot write into another student's state.
+    return f"{user_pk}:{attempt_id}"
+
+
+def resolve_session_key(user_pk, attempt_id) -> str:
+    """
+    Session key for a student's frames and audio. Only an attempt that belongs to
+    the student gets a key of its own; a missing, malformed or foreign attempt id
+    falls back to the student's single per-user key, so a client cannot mint
+    sessions at will and push other students out of the registry. An attempt that
+    already has a live session was checked when the session was created.
+    """
+    try:
+        attempt_id = str(uuid.UUID(str(attempt_id)))
+    except ValueError:
+        return session_key(user_pk, '')
+    key = session_key(user_pk, attempt_id)
+    if sessions.peek(key) is not None:
+        return key
+    from student.models import Attempt
+    if Attempt.objects.filter(attempt_id=attempt_id, student_id=user_pk).exists():
+        return key
+    return session_key(user_pk, '')
+
+
+def analyze_frame(session, frame: np.ndarray) -> dict:
+    """
+    Runs the analyzer for one student frame. Headless by default: the client draws
+    overlays from the structured result. Annotated images are rendered only while a
+    proctor preview is open (or if INTEGRITY_RENDER_ANNOTATIONS is on), and are kept
+    on the session for the proctor rather than sent back to the student.
+    The frame also goes into the session's evidence buffer, which is saved in the
+    background when a face alert starts.
+    """
+    preview = session.preview_until > time.time()
+    render = settings.INTEGRITY_RENDER_ANNOTATIONS or preview
+    result = get_frame_analyzer().analyze(frame, session, render=render)
+    evidence.observe(session, frame, result)
+    if preview:
+        session.preview = {
+            'face_image': result['face_image'],
+            'object_image': result['object_image'],
+            'face_status': result['face_status'],
+            'detections': result['detections'],
+        }
+    if render and not settings.INTEGRITY_RENDER_ANNOTATIONS:
+        del result['face_image'], result['object_image']
+    return result
+
+
+def analyze_client(session, packet) -> dict:
+    """
+    Client-inference counterpart of analyze_frame, for a decoded LandmarkPacket.
+    Verifies spot-checked frames against the server face mesh, randomly asks for
+    the next one ('spot_check'), and answers 'client_inference': False when the
+    mode is disabled or the session has failed its spot checks, so the client
+    falls back to sending full frames.
+    """
+    if not settings.INTEGRITY_CLIENT_INFERENCE or not spot_checks.on_packet(session, packet):
+        return {'error': 'Client inference is not available', 'client_inference': False}
+    result = get_frame_analyzer().analyze_client(packet, session)
+    if packet.image_kind == FULL_FRAME:
+        deviation = spot_checks.verify(session, packet.landmarks, result.pop('server_landmarks'))
+        result['spot_check_deviation'] = deviation if deviation != float('inf') else None
+        if deviation > spot_checks.tolerance:
+            logger.warning("Spot check failed for %s (deviation %s)", session.key, deviation)
+            result['tampering_suspected'] = True
+            sampling.boost(session)
+        if not session.client_trusted:
+            result['client_inference'] = False
+            return result
+    if spot_checks.request(session):
+        result['spot_check'] = True
+    return result
+
+
+def handle_frame(session, read_frame, analyze=analyze_frame) -> dict:
+    """
+    Admission control around one frame: waits for the session's in-flight slot
+    (raising admission.Superseded if a newer frame replaces this one), reserves a
+    global analysis slot (raising admission.Overloaded when the node is full), and
+    only then reads the upload with read_frame() and passes it to analyze
+    (analyze_frame for images, analyze_client for landmark packets).
+    The result carries next_capture_ms, the session's adaptive capture interval.
+    """
+    if not admission.enter_session(session):
+        raise Superseded(admission.capture_interval_ms(len(sessions)))
+    try:
+        admission.acquire(len(sessions))
+        start = time.perf_counter()
+        try:
+            result = analyze(session, read_frame())
+        finally:
+            admission.release((time.perf_counter() - start) * 1000)
+    finally:
+        admission.leave_session(session)
+    result['next_capture_ms'] = sampling.next_interval(session, result, sessions)
+    return result
+
+
+def _dummy_frame(width=640, height=480, seed=0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def warmup(frames: int = 3) -> dict:
+    """
+    Builds the analyzers and runs dummy frames through every model: sequential
+    passes, then one concurrent round that fills a detector batch and lends out
+    every pooled FaceMesh graph. Returns timings in seconds.
+    """
+    from .sessions import MonitorSession
+
+    start = time.perf_counter()
+    analyzer = get_frame_analyzer()
+    get_audio_analyzer()
+    loaded = time.perf_counter() - start
+
+    # A fresh session per call, so the duplicate-frame gate never short-circuits.
+    passes = []
+    for i in range(frames):
+        t0 = time.perf_counter()
+        analyzer.analyze(_dummy_frame(seed=i), MonitorSession('warmup'))
+        passes.append(time.perf_counter() - t0)
+
+    concurrency = max(settings.INTEGRITY_YOLO_BATCH_SIZE, settings.INTEGRITY_FACE_MESH_POOL_SIZE)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda i: analyzer.analyze(_dummy_frame(seed=i), MonitorSession('warmup')),
+                      range(concurrency)))
+    concurrent_s = time.perf_counter() - t0
+
+    _state['warmed_in_s'] = time.perf_counter() - start
+    _warm.set()
+    return {'load_s': loaded, 'passes_s': passes, 'concurrent_batch_s': concurrent_s,
+            'total_s': _state['warmed_in_s']}
+
+
+def _warmup_in_background():
+    global _warming
+    try:
+        timings = warmup()
+        logger.info("Models warm: %s", timings)
+    except Exception as e:
+        logger.exception("Model warm-up failed")
+        _state['error'] = str(e)
+    finally:
+        with _lock:
+            _warming = False
+
+
+def ensure_warming():
+    """
+    Starts warm-up on a background thread unless it is done or already running.
+    """
+    global _warming
+    if _warm.is_set():
+        return
+    with _lock:
+        if _warming:
+            return
+        _warming = True
+        _state['error'] = None
+    threading.Thread(target=_warmup_in_background, name='model-warmup', daemon=True).start()
+
+
+def is_ready() -> bool:
+    return _warm.is_set()
+
+
+def status() -> dict:
+    return {'ready': _warm.is_set(), 'warming': _warming, **_state}
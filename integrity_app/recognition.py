@@ -0,0 +1,163 @@
+"""
+Concurrent multi-language speech recognition.
+
+Each chunk is recognized in every configured language. MultiLanguageRecognizer
+submits one call per language to a bounded thread pool shared by all callers, so a
+chunk costs the slowest round trip instead of the sum of them, and the number of
+recognition requests in flight on a worker stays capped. A language that has not
+answered within `timeout` seconds (queueing included) is reported as timed out
+instead of holding up the others. Every result carries its own latency.
+
+The engine is a speech.SpeechBackend. For backends that transcribe several chunks
+per call (max_batch > 1), chunks of the same language from concurrent callers are
+collected for up to max_wait_ms and sent as one batch, as BatchingDetector does for
+frames.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from .speech import BackendError, GoogleWebSpeechBackend
+
+logger = logging.getLogger(__name__)
+
+OK = 'ok'
+NO_SPEECH = 'no_speech'
+UNAVAILABLE = 'unavailable'
+TIMEOUT = 'timeout'
+FAILED = 'failed'
+
+
+class LanguageResult:
+    __slots__ = ('text', 'status', 'ms')
+
+    def __init__(self, text, status, ms):
+        self.text = text
+        self.status = status
+        # Submission to answer, so time spent queued for a pool thread is included.
+        self.ms = ms
+
+
+class MultiLanguageRecognizer:
+    """
+    recognize(pcm, languages) -> {name: LanguageResult} for 16 kHz mono int16 PCM
+    and a {name: code} mapping, transcribing every language concurrently on a pool
+    of `workers` threads with `backend` (the Google Web Speech API by default).
+    """
+    def __init__(self, backend=None, workers: int = 16, timeout: float = 10.0, max_wait_ms: float = 20.0):
+        self.backend = backend if backend is not None else GoogleWebSpeechBackend(timeout)
+        self.workers = workers
+        self.timeout = timeout
+        self.max_wait = max_wait_ms / 1000.0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='speech')
+        self._queues = {}
+        self._lock = threading.Lock()
+        self.chunks = 0
+        self.calls = 0
+        self.batches = 0
+        self.batched = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.total_ms = 0.0
+        self.chunk_ms = 0.0
+
+    def _run(self, batch: list, code: str):
+        # Futures cancelled by a caller that timed out while they were queued are dropped.
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        with self._lock:
+            self.in_flight += 1
+            self.batches += 1
+            self.batched += len(batch)
+        try:
+            texts = self.backend.transcribe_batch([pcm for pcm, _, _ in batch], code)
+            statuses = [OK if text.strip() else NO_SPEECH for text in texts]
+        except BackendError as e:
+            logger.error("Speech API error (%s): %s", code, e)
+            texts, statuses = [''] * len(batch), [UNAVAILABLE] * len(batch)
+        except Exception as e:
+            logger.error("Speech recognition failed (%s): %s", code, e)
+            texts, statuses = [''] * len(batch), [FAILED] * len(batch)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        end = time.perf_counter()
+        for (_, future, submitted), text, status in zip(batch, texts, statuses):
+            future.set_result(LanguageResult(text, status, (end - submitted) * 1000))
+
+    def _queue(self, code: str) -> queue.Queue:
+        with self._lock:
+            q = self._queues.get(code)
+            if q is None:
+                q = self._queues[code] = queue.Queue()
+                threading.Thread(target=self._collect, args=(q, code), name=f'speech-batcher-{code}',
+                                 daemon=True).start()
+        return q
+
+    def _collect(self, q: queue.Queue, code: str):
+        while True:
+            batch = [q.get()]
+            deadline = batch[0][2] + self.max_wait
+            while len(batch) < self.backend.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    # Past the deadline, still take whatever is already queued.
+                    batch.append(q.get(timeout=remaining) if remaining > 0 else q.get_nowait())
+                except queue.Empty:
+                    break
+            self._executor.submit(self._run, batch, code)
+
+    def _submit(self, pcm, code: str, submitted: float) -> Future:
+        future = Future()
+        if self.backend.max_batch > 1:
+            self._queue(code).put((pcm, future, submitted))
+        else:
+            self._executor.submit(self._run, [(pcm, future, submitted)], code)
+        return future
+
+    def recognize(self, pcm, languages: dict) -> dict:
+        submitted = time.perf_counter()
+        futures = {name: self._submit(pcm, code, submitted) for name, code in languages.items()}
+        done, _ = wait(futures.values(), timeout=self.timeout)
+        results = {}
+        for name, future in futures.items():
+            if future in done:
+                results[name] = future.result()
+            else:
+                # Not started yet: dropped from its batch. Already running: its answer is discarded.
+                future.cancel()
+                results[name] = LanguageResult('', TIMEOUT, self.timeout * 1000)
+        elapsed = (time.perf_counter() - submitted) * 1000
+        with self._lock:
+            self.chunks += 1
+            self.calls += len(results)
+            self.timeouts += sum(r.status == TIMEOUT for r in results.values())
+            self.errors += sum(r.status in (UNAVAILABLE, FAILED) for r in results.values())
+            self.total_ms += sum(r.ms for r in results.values())
+            self.chunk_ms += elapsed
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'backend': self.backend.name,
+                'workers': self.workers,
+                'in_flight': self.in_flight,
+                'chunks': self.chunks,
+                'calls': self.calls,
+                'backend_calls': self.batches,
+                'mean_batch_size': self.batched / self.batches if self.batches else 0.0,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+                'mean_call_ms': self.total_ms / self.calls if self.calls else 0.0,
+                'mean_chunk_ms': self.chunk_ms / self.chunks if self.chunks else 0.0,
+            }
+
+
+def timings(results: dict) -> dict:
+    """{name: latency ms} for a recognize() result, for responses."""
+    return {name: round(result.ms, 1) for name, result in results.items()}
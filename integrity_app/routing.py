@@ -1,6 +1,13 @@
 from django.urls import re_path
-from .consumers import AudioConsumer
+from .consumers import AudioConsumer, AudioStreamConsumer, FrameConsumer
 
+UUID = r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
+
+# Without an attempt in the path the consumers use the student's per-user session.
 websocket_urlpatterns = [
     re_path(r'^ws/process_audio/$', AudioConsumer.as_asgi(), name='process_audio'),
+    re_path(rf'^ws/frames/(?P<attempt_id>{UUID})/$', FrameConsumer.as_asgi(), name='frames'),
+    re_path(r'^ws/frames/$', FrameConsumer.as_asgi(), {'attempt_id': ''}, name='frames_no_attempt'),
+    re_path(rf'^ws/audio/(?P<attempt_id>{UUID})/$', AudioStreamConsumer.as_asgi(), name='audio'),
+    re_path(r'^ws/audio/$', AudioStreamConsumer.as_asgi(), {'attempt_id': ''}, name='audio_no_attempt'),
 ]
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Risk-based capture interval per student.
+
+A student whose frames stay clean is sampled less and less often: the interval
+doubles every `calm_step` seconds of clean frames, from `base_ms` up to `max_ms`.
+A suspicious or brief gaze/head status, a missing face or a second one, an object
+detection or an audio violation switches the session to `min_ms` for `boost_seconds`.
+
+All sessions share a node-wide frames/sec budget. Boosted students are served
+first; if the calm ones would exceed what is left, their intervals are stretched
+proportionally (and if even the boosted ones do not fit, everyone is).
+"""
+import threading
+import time
+
+CLEAN_STATUSES = ("Normal Behavior", "Fully Acceptable")
+
+
+def is_risky(result: dict) -> bool:
+    face = result.get('face') or {}
+    if result.get('detections') or face.get('alert') or face.get('multiple_faces'):
+        return True
+    if not face.get('face_detected'):
+        return True
+    return not str(face.get('status', '')).startswith(CLEAN_STATUSES)
+
+
+class SamplingPolicy:
+    def __init__(self, min_ms: int = 250, base_ms: int = 500, max_ms: int = 4000, calm_step: float = 10.0,
+                 boost_seconds: float = 15.0, budget_fps: float = 40.0, recompute_every: float = 1.0):
+        self.min_ms = min_ms
+        self.base_ms = base_ms
+        self.max_ms = max_ms
+        self.calm_step = calm_step
+        self.boost_seconds = boost_seconds
+        self.budget_fps = budget_fps
+        self.recompute_every = recompute_every
+        self._lock = threading.Lock()
+        self._computed_at = 0.0
+        self.calm_scale = 1.0
+        self.boost_scale = 1.0
+        self.demand_fps = 0.0
+        self.boosted = 0
+
+    def boost(self, session, now: float = None):
+        """Samples this session at min_ms for the next boost_seconds."""
+        now = time.time() if now is None else now
+        session.boost_until = now + self.boost_seconds
+        session.calm_since = None
+
+    def desired_ms(self, session, now: float) -> float:
+        if session.boost_until > now:
+            return self.min_ms
+        if session.calm_since is None:
+            return self.base_ms
+        doublings = int((now - session.calm_since) / self.calm_step)
+        return min(self.max_ms, self.base_ms * (2 ** min(doublings, 16)))
+
+    def next_interval(self, session, result: dict, sessions, now: float = None) -> int:
+        """
+        Updates the session's risk state from an analysis result and returns the
+        interval (ms) the client should wait before sending its next frame.
+        """
+        now = time.time() if now is None else now
+        if is_risky(result):
+            self.boost(session, now)
+        elif session.calm_since is None and session.boost_until <= now:
+            session.calm_since = now
+        if now - self._computed_at >= self.recompute_every:
+            self._recompute(sessions, now)
+        desired = self.desired_ms(session, now)
+        scale = self.boost_scale if session.boost_until > now else self.calm_scale
+        session.capture_ms = int(desired * scale)
+        return session.capture_ms
+
+    def _recompute(self, sessions, now: float):
+        """
+        Sums what every live session asks for and derives the stretch factors
+        that keep the node within budget_fps.
+        """
+        boost_fps = calm_fps = 0.0
+        boosted = 0
+        for session in sessions.snapshot():
+            rate = 1000.0 / self.desired_ms(session, now)
+            if session.boost_until > now:
+                boost_fps += rate
+                boosted += 1
+            else:
+                calm_fps += rate
+        if boost_fps >= self.budget_fps:
+            boost_scale = calm_scale = (boost_fps + calm_fps) / self.budget_fps
+        else:
+            boost_scale = 1.0
+            calm_scale = max(1.0, calm_fps / (self.budget_fps - boost_fps))
+        with self._lock:
+            self._computed_at = now
+            self.boost_scale, self.calm_scale = boost_scale, calm_scale
+            self.demand_fps = boost_fps + calm_fps
+            self.boosted = boosted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'budget_fps': self.budget_fps,
+                'demand_fps': self.demand_fps,
+                'boosted_sessions': self.boosted,
+                'boost_scale': self.boost_scale,
+                'calm_scale': self.calm_scale,
+                'interval_ms': {'min': self.min_ms, 'base': self.base_ms, 'max': self.max_ms},
+            }
@@ -0,0 +1,162 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class MonitorSession:
+    """
+    Per-student temporal state for the frame pipeline.
+    Uses __slots__ so each concurrent student costs a small, fixed amount of memory.
+    """
+    __slots__ = ('key', 'last_normal_time', 'suspicious_active', 'current_status', 'last_seen',
+                 'preview_until', 'preview', 'objects', 'face_roi', 'face_roi_frames', 'face_count', 'gate',
+                 'in_flight', 'waiting',
+                 'boost_until', 'calm_since', 'capture_ms',
+                 'client_trusted', 'spot_check_due', 'spot_check_failures',
+                 'evidence', 'evidence_active', 'evidence_at')
+
+    def __init__(self, key: str):
+        now = time.time()
+        self.key = key
+        self.last_normal_time = now
+        self.suspicious_active = False
+        self.current_status = "Normal Behavior"
+        self.last_seen = now
+        # Server-side annotated images are rendered only while a proctor is watching.
+        self.preview_until = 0.0
+        self.preview = None
+        # Detect-then-track state for the object detector (tracking.TrackState).
+        self.objects = None
+        # Padded square pixel box around the last face found, frames tracked in it since
+        # the last full-frame search, and faces counted (face_roi.FaceRoiTracker).
+        self.face_roi = None
+        self.face_roi_frames = 0
+        self.face_count = 0
+        # Duplicate-frame gate state (gating.GateState).
+        self.gate = None
+        # Backpressure: one frame in analysis plus one waiting (admission.AdmissionController).
+        self.in_flight = False
+        self.waiting = None
+        # Adaptive capture interval (sampling.SamplingPolicy).
+        self.boost_until = 0.0
+        self.calm_since = None
+        self.capture_ms = 0
+        # Client-side landmarks and their spot checks (client_inference.SpotChecker).
+        self.client_trusted = True
+        self.spot_check_due = 0
+        self.spot_check_failures = 0
+        # Recent compressed frames and the alert episode state (evidence.EvidenceRecorder).
+        self.evidence = None
+        self.evidence_active = False
+        self.evidence_at = 0.0
+
+
+class FaceMeshPool:
+    """
+    Bounded pool of MediaPipe FaceMesh graphs.
+    A graph is lent to exactly one request at a time; at most `size` graphs are
+    ever created and callers block while all of them are in use.
+    """
+    def __init__(self, factory, size: int = 2):
+        self._factory = factory
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._available = threading.BoundedSemaphore(size)
+        self.created = 0
+        self.in_use = 0
+
+    @contextmanager
+    def borrow(self):
+        self._available.acquire()
+        try:
+            with self._lock:
+                graph = self._idle.pop() if self._idle else None
+            if graph is None:
+                graph = self._factory()
+                with self._lock:
+                    self.created += 1
+            with self._lock:
+                self.in_use += 1
+            try:
+                yield graph
+            finally:
+                with self._lock:
+                    self._idle.append(graph)
+                    self.in_use -= 1
+        finally:
+            self._available.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'size': self.size, 'created': self.created, 'in_use': self.in_use}
+
+
+class SessionRegistry:
+    """
+    Keeps one MonitorSession per attempt (or user).
+    Sessions idle for longer than `ttl` seconds are dropped, and the least recently
+    used session is evicted once `max_sessions` is reached.
+    """
+    def __init__(self, ttl: float = 300.0, max_sessions: int = 1000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def get(self, key: str) -> MonitorSession:
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = MonitorSession(key)
+                self._sessions[key] = session
+            else:
+                self._sessions.move_to_end(key)
+            session.last_seen = now
+            self._evict(now)
+            return session
+
+    def peek(self, key: str):
+        # Looks a session up without creating it or refreshing its LRU position.
+        with self._lock:
+            return self._sessions.get(key)
+
+    def snapshot(self) -> list:
+        # The live sessions, copied so callers can iterate without holding the lock.
+        with self._lock:
+            return list(self._sessions.values())
+
+    def discard(self, key: str):
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def _evict(self, now: float):
+        # Entries are kept in last-seen order, so expired ones are at the front.
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) <= self.max_sessions and now - oldest.last_seen <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = len(self._sessions)
+            session_bytes = sum(
+                sys.getsizeof(s) + sys.getsizeof(s.key) + sys.getsizeof(s.current_status)
+                for s in self._sessions.values()
+            )
+            return {
+                'sessions': count,
+                'evicted': self.evicted,
+                'ttl': self.ttl,
+                'max_sessions': self.max_sessions,
+                'bytes_per_session': session_bytes / count if count else 0.0,
+            }
@@ -1,15 +1,24 @@
-import speech_recognition as sr
-import subprocess
-from io import BytesIO
+from .audio import decode_pcm
+from .audio_stream import StreamDecoder
+from .recognition import NO_SPEECH, OK, MultiLanguageRecognizer, timings
+from .vad import VoiceActivityDetector
 
 
 class SoundMonitor:
-    def __init__(self, languages=None):
+    def __init__(self, languages=None, ffmpeg="ffmpeg", vad=True, recognizer=None):
         """
         :param languages: معجم اللغات المطلوب التعرف عليها مع رموزها؛
                          الافتراضي: {"English": "en", "Arabic": "ar"}
+        :param ffmpeg: مسار ffmpeg المستخدم لفك ترميز الصوت.
+        :param vad: عند التفعيل تُرسل مقاطع الكلام فقط إلى التعرف على الكلام،
+                    ولا تُرسل الأجزاء الصامتة إطلاقاً.
+        :param recognizer: كائن MultiLanguageRecognizer يتعرف على كل اللغات بالتوازي
+                           (مجمع خيوط مشترك مع مهلة لكل استدعاء) بمحرك speech.SpeechBackend
+                           المختار؛ يُنشأ واحد افتراضياً (Google Web Speech).
         """
-        self.recognizer = sr.Recognizer()
+        self.recognizer = recognizer if recognizer is not None else MultiLanguageRecognizer()
+        self.ffmpeg = ffmpeg
+        self.vad = VoiceActivityDetector() if vad else None
         self.languages = languages if languages is not None else {"English": "en", "Arabic": "ar"}
         # قائمة للكلمات أو العبارات المشتبه بها
         self.suspicious_words = [
@@ -18,28 +27,16 @@ class SoundMonitor:
             "answer", "حلها", "سؤال", "السؤال", "شابتر", "الشابتر", "chapter"
         ]
 
-    def convert_webm_to_wav(self, audio_bytes):
+    def open_stream(self):
         """
-        يقوم بتحويل بيانات الصوت من صيغة WebM إلى WAV باستخدام ffmpeg عبر subprocess.
+        يفتح مفكك ترميز دائم (عملية ffmpeg واحدة) لتدفق صوتي متصل واحد من MediaRecorder.
+        يجب إغلاقه بـ close() عند انتهاء التدفق.
 
-        :param audio_bytes: البيانات الخام للصوت بصيغة WebM.
-        :return: بيانات الصوت المحولة إلى WAV كـ bytes أو None في حالة الفشل.
+        :return: كائن StreamDecoder.
         """
-        try:
-            # استدعاء ffmpeg لتحويل من pipe:0 إلى WAV في pipe:1
-            result = subprocess.run(
-                ["ffmpeg", "-y", "-i", "pipe:0", "-f", "wav", "pipe:1"],
-                input=audio_bytes,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True
-            )
-            return result.stdout
-        except Exception as e:
-            print(f"Error converting webm to WAV via subprocess: {e}")
-            return None
+        return StreamDecoder(self.ffmpeg)
 
-    def process_audio_chunk(self, audio_bytes, sample_rate=16000, sample_width=2):
+    def process_audio_chunk(self, audio_bytes, sample_rate=16000, sample_width=2, decoder=None):
         """
         يقوم بتحويل بيانات الصوت من WebM إلى WAV باستخدام ffmpeg،
         ثم يستخدم مكتبة SpeechRecognition للتعرف على الكلام بعدة لغات.
@@ -47,35 +44,77 @@ class SoundMonitor:
         :param audio_bytes: البيانات الخام للصوت (WebM) بالبايت.
         :param sample_rate: معدل العينة (افتراضي 16000).
         :param sample_width: بايت لكل عينة (افتراضي 2 لعينة 16-بت).
+        :param decoder: مفكك ترميز من open_stream()؛ عند تمريره تُعتبر audio_bytes
+                        الجزء التالي من نفس التدفق ولا تُنشأ عملية ffmpeg جديدة.
         :return: قاموس يحتوي على:
                  {
                      "recognized_texts": { "English": "...", "Arabic": "..." },
-                     "violation_found": bool
+                     "violation_found": bool,
+                     "speech_detected": bool,
+                     "recognition_ms": { "English": 0.0, "Arabic": 0.0 }
                  }
         """
-        wav_bytes = self.convert_webm_to_wav(audio_bytes)
-        if wav_bytes is None:
-            # استخدام البيانات الأصلية كخيار احتياطي (قد لا يكون صالحاً)
-            wav_bytes = audio_bytes
-
-        recognized_texts = {}
-        violation_found = False
+        if decoder is not None:
+            try:
+                pcm = decoder.feed(audio_bytes)
+            except ValueError as e:
+                print(f"Error decoding audio stream: {e}")
+                return {
+                    "recognized_texts": {"English": "[Error]", "Arabic": "[Error]"},
+                    "violation_found": False,
+                    "speech_detected": False
+                }
+            return self.process_pcm(pcm)
 
         try:
-            audio_data = sr.AudioData(wav_bytes, sample_rate, sample_width)
-        except Exception as e:
-            print(f"Error creating AudioData: {e}")
+            # فك الترميز مباشرة إلى PCM بتردد 16 كيلوهرتز أحادي حتى يعمل كاشف الكلام عليه
+            pcm = decode_pcm(audio_bytes, ffmpeg=self.ffmpeg)
+        except ValueError as e:
+            print(f"Error decoding audio chunk: {e}")
             return {
                 "recognized_texts": {"English": "[Error]", "Arabic": "[Error]"},
-                "violation_found": False
+                "violation_found": False,
+                "speech_detected": False
             }
+        return self.process_pcm(pcm)
 
-        for lang, code in self.languages.items():
-            try:
-                text = self.recognizer.recognize_google(audio_data, language=code)
-            except sr.UnknownValueError:
-                text = ""
-            except sr.RequestError:
+    def process_pcm(self, pcm):
+        """
+        يتعرف على الكلام في عينات PCM مفكوكة مسبقاً (16 كيلوهرتز، أحادي، 16-بت).
+
+        :param pcm: مصفوفة numpy من نوع int16.
+        :return: نفس قاموس process_audio_chunk، مع "speech_ratio" (نسبة الإطارات التي فيها كلام).
+        """
+        speech_ratio = None
+        if self.vad is not None:
+            vad = self.vad.detect(pcm)
+            pcm, speech_ratio = vad.speech, vad.speech_ratio
+        if not len(pcm):
+            return {"recognized_texts": {lang: "" for lang in self.languages}, "violation_found": False,
+                    "speech_detected": False, "speech_ratio": speech_ratio}
+        result = self.recognize(pcm)
+        result["speech_ratio"] = speech_ratio
+        return result
+
+    def stats(self):
+        return {"vad": self.vad.stats() if self.vad is not None else None}
+
+    def recognize(self, pcm):
+        """
+        يشغّل التعرف على الكلام لكل اللغات على عينات PCM (16 كيلوهرتز، أحادي، 16-بت)
+        ويبحث عن الكلمات المشتبه بها.
+        """
+        recognized_texts = {}
+        violation_found = False
+        speech_detected = False
+
+        # كل اللغات تُرسل معاً، فزمن الاستجابة هو زمن أبطأ لغة وليس مجموع الأزمنة
+        results = self.recognizer.recognize(pcm, self.languages)
+        for lang, result in results.items():
+            text = result.text
+            if result.status == OK:
+                speech_detected = speech_detected or bool(text.strip())
+            elif result.status != NO_SPEECH:
                 text = "[ERROR: Recognition service unavailable]"
 
             if not text.strip():
@@ -91,5 +130,7 @@ class SoundMonitor:
 
         return {
             "recognized_texts": recognized_texts,
-            "violation_found": violation_found
+            "violation_found": violation_found,
+            "speech_detected": speech_detected,
+            "recognition_ms": timings(results)
         }
\ No newline at end of file
@@ -0,0 +1,187 @@
+"""
+Speech-recognition backends.
+
+Every engine sits behind SpeechBackend: transcribe_batch() takes a list of 16 kHz
+mono int16 PCM chunks and one language code and returns one transcript per chunk
+('' when nothing was recognized), raising BackendError when the engine cannot
+answer. recognition.MultiLanguageRecognizer runs the languages of a chunk
+concurrently on top of it and, for backends with max_batch > 1, groups chunks from
+concurrent callers into one transcribe_batch() call.
+
+    google  Google Web Speech API through SpeechRecognition (network, one chunk per call)
+    gcp     Google Cloud Speech-to-Text, one SpeechClient reused for every call (network)
+    vosk    Vosk / Kaldi on the local CPU, one model per language (offline)
+    stub    deterministic offline stand-in for tests and benchmarks
+
+google-cloud-speech and vosk are only needed for the backends that use them.
+"""
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+
+from .audio import SAMPLE_RATE, SAMPLE_WIDTH
+
+
+class BackendError(Exception):
+    """The engine could not answer (network error, timeout, missing model)."""
+
+
+class SpeechBackend(ABC):
+    name = ''
+    # Chunks one transcribe_batch() call handles well; 1 for engines without batching.
+    max_batch = 1
+
+    @abstractmethod
+    def transcribe(self, pcm: np.ndarray, language: str) -> str:
+        ...
+
+    def transcribe_batch(self, chunks: list, language: str) -> list:
+        return [self.transcribe(pcm, language) for pcm in chunks]
+
+
+class GoogleWebSpeechBackend(SpeechBackend):
+    """sr.Recognizer().recognize_google, with each HTTP call bounded by `timeout`."""
+    name = 'google'
+
+    def __init__(self, timeout: float = 10.0):
+        import speech_recognition as sr
+        self._sr = sr
+        self.recognizer = sr.Recognizer()
+        self.recognizer.operation_timeout = timeout
+
+    def transcribe(self, pcm, language):
+        sr = self._sr
+        try:
+            return self.recognizer.recognize_google(sr.AudioData(pcm.tobytes(), SAMPLE_RATE, SAMPLE_WIDTH),
+                                                    language=language)
+        except sr.UnknownValueError:
+            return ''
+        except sr.RequestError as e:
+            raise BackendError(str(e)) from e
+
+
+class GoogleCloudBackend(SpeechBackend):
+    """
+    Cloud Speech-to-Text synchronous recognition. The client (and its gRPC channel)
+    is created once instead of per call; short codes are mapped to the BCP-47 locales
+    the API expects through `locales`. transcribe() also takes the PCM's sample rate,
+    for callers of gcp_speech_to_text with audio at other rates.
+    """
+    name = 'gcp'
+
+    def __init__(self, timeout: float = 10.0, locales=None):
+        from google.cloud import speech
+        self._speech = speech
+        self.client = speech.SpeechClient()
+        self.timeout = timeout
+        self.locales = locales if locales is not None else {'en': 'en-US', 'ar': 'ar-SA'}
+
+    def transcribe(self, pcm, language, sample_rate: int = SAMPLE_RATE):
+        speech = self._speech
+        config = speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=sample_rate,
+            language_code=self.locales.get(language, language),
+            enable_automatic_punctuation=True,
+        )
+        try:
+            response = self.client.recognize(config=config, audio=speech.RecognitionAudio(content=pcm.tobytes()),
+                                             timeout=self.timeout)
+        except Exception as e:
+            raise BackendError(str(e)) from e
+        return " ".join(result.alternatives[0].transcript for result in response.results).strip()
+
+
+class VoskBackend(SpeechBackend):
+    """
+    Offline recognition with Vosk. `models` maps language codes to unpacked model
+    directories (e.g. vosk-model-small-en-us-0.15); each model is loaded once, on
+    first use, and shared by all threads. A batch is decoded by one recognizer that
+    is reset between chunks, instead of building a recognizer per chunk.
+    """
+    name = 'vosk'
+
+    def __init__(self, models: dict, max_batch: int = 8):
+        import vosk
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.paths = {code: Path(path) for code, path in models.items()}
+        self.max_batch = max_batch
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _model(self, language):
+        model = self._models.get(language)
+        if model is None:
+            with self._lock:
+                model = self._models.get(language)
+                if model is None:
+                    path = self.paths.get(language)
+                    if path is None or not path.is_dir():
+                        raise BackendError(f"No Vosk model for '{language}' (INTEGRITY_SPEECH_VOSK_MODELS)")
+                    model = self._models[language] = self._vosk.Model(str(path))
+        return model
+
+    def transcribe(self, pcm, language):
+        return self.transcribe_batch([pcm], language)[0]
+
+    def transcribe_batch(self, chunks, language):
+        recognizer = self._vosk.KaldiRecognizer(self._model(language), SAMPLE_RATE)
+        texts = []
+        for pcm in chunks:
+            recognizer.AcceptWaveform(pcm.tobytes())
+            texts.append(json.loads(recognizer.FinalResult()).get('text', ''))
+            recognizer.Reset()
+        return texts
+
+
+class StubBackend(SpeechBackend):
+    """
+    Deterministic offline backend: each call sleeps for `latency` seconds, however
+    many chunks it carries, and returns transcripts[language] or a placeholder with
+    the language and chunk length; chunks shorter than 0.1 s give ''. A call whose
+    delay exceeds `timeout` is cut off with BackendError, as a network call would be.
+    """
+    name = 'stub'
+
+    def __init__(self, latency: float = 0.3, timeout: float = None, transcripts=None, max_batch: int = 8):
+        self.latency = latency
+        self.timeout = timeout
+        self.transcripts = transcripts or {}
+        self.max_batch = max_batch
+
+    def delay(self, language: str) -> float:
+        return self.latency
+
+    def transcribe(self, pcm, language):
+        return self.transcribe_batch([pcm], language)[0]
+
+    def transcribe_batch(self, chunks, language):
+        delay = self.delay(language)
+        if self.timeout is not None and delay > self.timeout:
+            time.sleep(self.timeout)
+            raise BackendError("recognition connection failed: timed out")
+        time.sleep(delay)
+        texts = []
+        for pcm in chunks:
+            seconds = len(pcm) / SAMPLE_RATE
+            texts.append('' if seconds < 0.1 else
+                         self.transcripts.get(language, f"[{language}] {seconds:.1f} s of speech"))
+        return texts
+
+
+def load_backend(name: str = 'google', timeout: float = 10.0, stub_latency: float = 0.3, vosk_models=None,
+                 max_batch: int = 8) -> SpeechBackend:
+    if name == 'google':
+        return GoogleWebSpeechBackend(timeout)
+    if name == 'gcp':
+        return GoogleCloudBackend(timeout)
+    if name == 'vosk':
+        return VoskBackend(vosk_models or {}, max_batch=max_batch)
+    if name == 'stub':
+        return StubBackend(stub_latency, timeout, max_batch=max_batch)
+    raise ValueError(f"Unknown speech backend '{name}'")
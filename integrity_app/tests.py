@@ -1,3 +1,1763 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from proctor.models import Exam
+from student.models import Attempt
+
+from . import landmarks, pipeline
+from .audio import SAMPLE_RATE
+from .recognition import FAILED, OK, UNAVAILABLE, MultiLanguageRecognizer
+from .speech import BackendError, StubBackend, load_backend
+
+try:
+    import mediapipe
+except ImportError:
+    mediapipe = None
+try:
+    import vosk
+except ImportError:
+    vosk = None
+try:
+    import torch
+    import ultralytics
+except ImportError:
+    torch = ultralytics = None
+
+User = get_user_model()
+
+
+class MonitoringFixture(TestCase):
+    """
+    A proctor, an exam, and two students each with an attempt.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.proctor = User.objects.create_user(username='proctor', password='secret', user_type='proctor')
+        cls.student = User.objects.create_user(username='student', password='secret', user_type='student')
+        cls.other = User.objects.create_user(username='other', password='secret', user_type='student')
+        now = timezone.now()
+        cls.exam = Exam.objects.create(title='Exam', start_time=now - timedelta(hours=1),
+                                       end_time=now + timedelta(hours=1), proctor=cls.proctor)
+        cls.exam.student_list.add(cls.student, cls.other)
+        cls.attempt = Attempt.objects.create(exam=cls.exam, student=cls.student)
+        cls.other_attempt = Attempt.objects.create(exam=cls.exam, student=cls.other)
+
+    def tearDown(self):
+        for session in pipeline.sessions.snapshot():
+            pipeline.sessions.discard(session.key)
+
+
+class SessionKeyTests(MonitoringFixture):
+    def test_own_attempt_gets_its_own_key(self):
+        attempt_id = str(self.attempt.attempt_id)
+        self.assertEqual(pipeline.resolve_session_key(self.student.pk, attempt_id),
+                         pipeline.session_key(self.student.pk, attempt_id))
+        # Case and format are normalised, so the proctor's lookup finds the same session.
+        self.assertEqual(pipeline.resolve_session_key(self.student.pk, attempt_id.upper()),
+                         pipeline.session_key(self.student.pk, attempt_id))
+
+    def test_foreign_missing_and_malformed_attempts_share_the_per_user_key(self):
+        fallback = pipeline.session_key(self.student.pk, '')
+        for attempt_id in (str(self.other_attempt.attempt_id), str(uuid.uuid4()), '', 'not-a-uuid', '----'):
+            self.assertEqual(pipeline.resolve_session_key(self.student.pk, attempt_id), fallback)
+
+
+class DashboardTests(MonitoringFixture):
+    def test_both_dashboard_routes_render_the_monitoring_settings(self):
+        self.client.force_login(self.student)
+        for url in ('/', '/accounts/student-dashboard'):
+            page = self.client.get(url).content.decode()
+            self.assertRegex(page, r'thumbnailIntervalMs: \d+,', url)
+            self.assertRegex(page, r'enabled: (true|false),', url)
+
+    def test_dashboard_renders_the_students_attempt(self):
+        self.client.force_login(self.student)
+        own, other = str(self.attempt.attempt_id), str(self.other_attempt.attempt_id)
+        for query in ('', f'?attempt={own}', f'?attempt={other}', '?attempt=junk'):
+            response = self.client.get('/accounts/student-dashboard' + query)
+            self.assertEqual(response.context['attempt_id'], own, query)
+
+        self.attempt.status = 'completed'
+        self.attempt.save()
+        response = self.client.get('/')
+        self.assertEqual(response.context['attempt_id'], '')
+        self.assertIn("const attemptId = '';", response.content.decode())
+
+    def test_socket_routes_require_a_full_attempt_id(self):
+        from .routing import websocket_urlpatterns
+
+        def match(path):
+            for pattern in websocket_urlpatterns:
+                found = pattern.resolve(path)
+                if found:
+                    return found.kwargs
+            return None
+        attempt_id = str(self.attempt.attempt_id)
+        self.assertEqual(match(f'ws/frames/{attempt_id}/'), {'attempt_id': attempt_id})
+        self.assertEqual(match('ws/audio/'), {'attempt_id': ''})
+        for path in ('ws/frames//', 'ws/frames/----/', 'ws/audio/1234/'):
+            self.assertIsNone(match(path), path)
+
+    def test_template_falls_back_without_context(self):
+        from django.template.loader import render_to_string
+        page = render_to_string('integrity_app/student_dashboard.html', {})
+        self.assertIn('thumbnailIntervalMs: 5000,', page)
+        self.assertIn('enabled: false,', page)
+
+
+class FakeAnalyzer:
+    """Stands in for FrameAnalyzer: images only when asked to render."""
+    def analyze(self, frame, session, render=False):
+        return {'face_image': 'data:face' if render else None, 'object_image': 'data:objects' if render else None,
+                'face_status': 'Normal Behavior', 'face': {'alert': False}, 'detections': []}
+
+
+class MetricsAccessTests(MonitoringFixture):
+    def test_metrics_fail_closed_without_a_token(self):
+        with self.settings(INTEGRITY_METRICS_TOKEN=None):
+            self.assertEqual(self.client.get('/metrics/').status_code, 403)
+            self.client.force_login(self.student)
+            self.assertEqual(self.client.get('/metrics/').status_code, 403)
+            staff = User.objects.create_user(username='ops', password='secret', is_staff=True)
+            self.client.force_login(staff)
+            self.assertEqual(self.client.get('/metrics/').status_code, 200)
+
+    def test_metrics_token(self):
+        with self.settings(INTEGRITY_METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get('/metrics/').status_code, 401)
+            self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+            self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+
+class PreviewTests(MonitoringFixture):
+    def test_proctor_preview_round_trip(self):
+        url = f'/preview/{self.attempt.attempt_id}/'
+        self.client.force_login(self.proctor)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        # The student's monitoring session, keyed as the dashboard's requests key it.
+        session = pipeline.sessions.get(pipeline.resolve_session_key(self.student.pk, self.attempt.attempt_id))
+        frame = np.zeros((48, 64, 3), np.uint8)
+        with mock.patch.object(pipeline, 'get_frame_analyzer', return_value=FakeAnalyzer()):
+            # Headless until the proctor asks for a preview.
+            self.assertIsNone(pipeline.analyze_frame(session, frame)['face_image'])
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(response.json()['preview'])
+
+            result = pipeline.analyze_frame(session, frame)
+            self.assertNotIn('face_image', result)
+            preview = self.client.get(url).json()['preview']
+        self.assertEqual(preview['face_image'], 'data:face')
+        self.assertEqual(preview['object_image'], 'data:objects')
+        self.assertEqual(preview['face_status'], 'Normal Behavior')
+
+    def test_preview_is_limited_to_the_exams_proctor(self):
+        stranger = User.objects.create_user(username='stranger', password='secret', user_type='proctor')
+        pipeline.sessions.get(pipeline.resolve_session_key(self.student.pk, self.attempt.attempt_id))
+        self.client.force_login(stranger)
+        self.assertEqual(self.client.get(f'/preview/{self.attempt.attempt_id}/').status_code, 404)
+
+    def test_monitor_page_polls_each_attempt_in_progress(self):
+        self.client.force_login(self.proctor)
+        page = self.client.get(f'/proctor/monitor/{self.exam.exam_id}/').content.decode()
+        self.assertIn(f'data-url="/preview/{self.attempt.attempt_id}/"', page)
+        self.assertIn(f'data-url="/preview/{self.other_attempt.attempt_id}/"', page)
+
+
+class EvidenceOwnershipTests(MonitoringFixture):
+    def test_evidence_is_linked_only_to_the_callers_attempt(self):
+        from alert.models import Alert
+        from .evidence import link_evidence
+
+        store = lambda attempt: f"/media/evidence/{attempt.attempt_id}.jpg"
+        self.assertIsNone(link_evidence(self.student.pk, self.other_attempt.attempt_id, store, 'Suspicious'))
+        self.assertFalse(Alert.objects.exists())
+        self.other_attempt.refresh_from_db()
+        self.assertEqual(self.other_attempt.violation_count, 0)
+
+        url = link_evidence(self.student.pk, self.attempt.attempt_id, store, 'Suspicious')
+        self.assertEqual(url, store(self.attempt))
+        self.assertEqual(Alert.objects.get().evidence_link, url)
+
+    def test_recorder_passes_the_session_owner_and_skips_per_user_keys(self):
+        from .evidence import EvidenceRecorder
+
+        linked = []
+        recorder = EvidenceRecorder(link=lambda *args: linked.append(args[:2]) or 'url')
+        key = pipeline.session_key(self.student.pk, self.attempt.attempt_id)
+        self.assertFalse(recorder.submit(pipeline.session_key(self.student.pk, ''), [(0.0, b'jpeg')], 'x', 0.0))
+        self.assertTrue(recorder.submit(key, [(0.0, b'jpeg')], 'x', 0.0))
+        recorder._executor.shutdown(wait=True)
+        self.assertEqual(linked, [(str(self.student.pk), str(self.attempt.attempt_id))])
+
+
+class LandmarkEngineTests(SimpleTestCase):
+    """
+    The vectorized rules against the previous per-point loops (kept in
+    benchmarks.landmark_engine). testdata/landmarks.npy holds Face Mesh landmarks
+    (refine_landmarks=True) recorded from accounts/static/accounts/img.png, shifted,
+    scaled, rotated and mirrored so the head rules take every branch; the synthetic
+    set adds averted gaze.
+    """
+    def fixtures(self):
+        from benchmarks.landmark_engine import synthetic_fixtures
+        recorded = np.load(Path(__file__).parent / 'testdata' / 'landmarks.npy')
+        self.assertEqual(recorded.shape[1:], (landmarks.NUM_REFINED_LANDMARKS, 3))
+        return (('recorded', recorded), ('synthetic', synthetic_fixtures(50)))
+
+    def test_rules_match_the_legacy_loops(self):
+        from benchmarks.landmark_engine import _Point, legacy_eye_gaze_ratio, legacy_head_movement
+
+        for name, faces in self.fixtures():
+            statuses = set()
+            for i, face in enumerate(faces):
+                points = [_Point(*p) for p in face]
+                # The refined mesh and the 468-point fallback.
+                for n in (478, 468):
+                    with self.subTest(name, face=i, points=n):
+                        expected = legacy_eye_gaze_ratio(points[:n], 0.10)
+                        self.assertEqual(landmarks.check_eye_gaze_ratio(face[:n], 0.10), expected)
+                        statuses.add(expected[1])
+                        self.assertEqual(landmarks.check_head_movement(face[:n], 0.10),
+                                         legacy_head_movement(points[:n], 0.10))
+                statuses.add(legacy_head_movement(points, 0.10)[1])
+            self.assertGreater(len(statuses), 3, name)
+
+    def test_batched_flags_match_the_per_frame_rule(self):
+        for name, faces in self.fixtures():
+            flags = landmarks.gaze_flags(faces)
+            self.assertEqual(flags.shape[0], len(faces))
+            for face_flags, face in zip(flags, faces):
+                self.assertEqual(bool(face_flags.any()), not landmarks.check_eye_gaze_ratio(face, 0.10)[0], name)
+
+
+@unittest.skipUnless(mediapipe, 'mediapipe is not installed')
+class LegacyFaceMonitorTests(SimpleTestCase):
+    def test_every_face_is_classified_once_on_the_clean_frame(self):
+        from mediapipe.framework.formats import landmark_pb2
+        from .face_monitor import FaceMonitor
+
+        faces = []
+        for face in np.load(Path(__file__).parent / 'testdata' / 'landmarks.npy')[[2, 3]]:
+            message = landmark_pb2.NormalizedLandmarkList()
+            for x, y, z in face.tolist():
+                message.landmark.add(x=x, y=y, z=z)
+            faces.append(message)
+        monitor = FaceMonitor(eye_occlusion_classifier=True)
+        monitor.face_mesh = SimpleNamespace(process=lambda rgb: SimpleNamespace(multi_face_landmarks=faces))
+        frame = np.full((240, 320, 3), 128, np.uint8)
+        clean = frame.copy()
+        classified = []
+
+        def classify(image, landmarks):
+            classified.append(np.array_equal(image, clean))
+            return 80.0 if len(classified) == 1 else 10.0
+        monitor.classify_sunglasses = classify
+        with mock.patch.object(monitor, 'detect_violation', wraps=monitor.detect_violation) as detect:
+            monitor.analyze_face(frame)
+
+        self.assertEqual(classified, [True, True])
+        self.assertFalse(np.array_equal(frame, clean))
+        self.assertEqual([call.args[2] for call in detect.call_args_list], [80.0, 10.0])
+        self.assertEqual(monitor.sunglasses_detection, {'detected': False, 'confidence': 10.0})
+
+    def test_eye_crop_classifier_is_off_by_default(self):
+        from .face_monitor import FaceMonitor
+
+        monitor = FaceMonitor()
+        self.assertIsNone(monitor.sunglasses_classifier)
+        frame = np.zeros((240, 320, 3), np.uint8)
+        face = np.load(Path(__file__).parent / 'testdata' / 'landmarks.npy')[0]
+        self.assertEqual(monitor.classify_sunglasses(frame, face), 0.0)
+        with self.settings(INTEGRITY_EYE_OCCLUSION_CLASSIFIER=True):
+            self.assertIsNotNone(FaceMonitor().sunglasses_classifier)
+
+
+def speech(seconds: float = 1.0) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), np.int16)
+
+
+class CountingBackend(StubBackend):
+    """StubBackend that records the most calls it had running at once and fails on request."""
+    def __init__(self, latency, failures=None):
+        super().__init__(latency, max_batch=1)
+        self.failures = failures or {}
+        self.running = self.peak = 0
+        self._lock = threading.Lock()
+
+    def transcribe_batch(self, chunks, language):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            if language in self.failures:
+                time.sleep(self.latency)
+                raise self.failures[language]
+            return super().transcribe_batch(chunks, language)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+class MultiLanguageRecognizerTests(SimpleTestCase):
+    LANGUAGES = {'English': 'en', 'Arabic': 'ar', 'French': 'fr'}
+
+    def test_pool_bounds_the_calls_in_flight(self):
+        for workers, rounds in ((1, 3), (3, 1)):
+            backend = CountingBackend(latency=0.05)
+            recognizer = MultiLanguageRecognizer(backend, workers=workers, timeout=5.0)
+            start = time.perf_counter()
+            results = recognizer.recognize(speech(), self.LANGUAGES)
+            elapsed = time.perf_counter() - start
+            self.assertEqual(backend.peak, workers)
+            # One worker runs the languages in turn; three can run them side by side.
+            self.assertGreaterEqual(elapsed, rounds * 0.05)
+            self.assertTrue(all(r.status == OK for r in results.values()))
+            self.assertEqual(recognizer.stats()['in_flight'], 0)
+
+    def test_results_follow_the_language_order(self):
+        backend = StubBackend(latency=0.0, transcripts={'en': 'hello', 'ar': 'marhaba'}, max_batch=1)
+        recognizer = MultiLanguageRecognizer(backend, workers=2, timeout=5.0)
+        for languages in (self.LANGUAGES, dict(reversed(self.LANGUAGES.items()))):
+            results = recognizer.recognize(speech(), languages)
+            self.assertEqual(list(results), list(languages))
+        self.assertEqual(results['English'].text, 'hello')
+        self.assertEqual(results['Arabic'].text, 'marhaba')
+        self.assertEqual(results['French'].text, '[fr] 1.0 s of speech')
+
+    def test_a_failing_language_does_not_drop_the_others(self):
+        backend = CountingBackend(latency=0.01, failures={'ar': BackendError('offline'), 'fr': RuntimeError('bug')})
+        recognizer = MultiLanguageRecognizer(backend, workers=3, timeout=5.0)
+        with self.assertLogs('integrity_app.recognition', 'ERROR'):
+            results = recognizer.recognize(speech(), self.LANGUAGES)
+        self.assertEqual(list(results), list(self.LANGUAGES))
+        self.assertEqual((results['English'].status, results['English'].text), (OK, '[en] 1.0 s of speech'))
+        self.assertEqual((results['Arabic'].status, results['Arabic'].text), (UNAVAILABLE, ''))
+        self.assertEqual((results['French'].status, results['French'].text), (FAILED, ''))
+        self.assertEqual(recognizer.stats()['errors'], 2)
+
+
+class SoundMonitorTests(SimpleTestCase):
+    def test_silence_reports_every_language(self):
+        from .sound_monitor import SoundMonitor
+
+        recognizer = mock.Mock()
+        monitor = SoundMonitor(languages={'English': 'en', 'Arabic': 'ar', 'French': 'fr'}, recognizer=recognizer)
+        result = monitor.process_pcm(speech(2.0))
+        self.assertEqual(result['recognized_texts'], {'English': '', 'Arabic': '', 'French': ''})
+        self.assertFalse(result['speech_detected'])
+        # The voice-activity gate kept the silence away from the recognizer.
+        recognizer.recognize.assert_not_called()
+
+class SpeechBackendTests(SimpleTestCase):
+    def test_stub_backend_is_deterministic(self):
+        backend = load_backend('stub', stub_latency=0.0)
+        self.assertIsInstance(backend, StubBackend)
+        self.assertEqual(backend.transcribe(speech(2.0), 'en'), '[en] 2.0 s of speech')
+        self.assertEqual(backend.transcribe_batch([speech(2.0), speech(0.05)], 'en'), ['[en] 2.0 s of speech', ''])
+
+    def test_backend_without_transcribe_fails_when_constructed(self):
+        from .speech import SpeechBackend
+
+        class Incomplete(SpeechBackend):
+            name = 'incomplete'
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            load_backend('nope')
+
+    @unittest.skipUnless(vosk, 'vosk is not installed')
+    def test_vosk_without_a_model_raises_backend_error(self):
+        backend = load_backend('vosk', vosk_models={'en': '/nonexistent/vosk-en'})
+        for language in ('en', 'ar'):
+            with self.assertRaises(BackendError):
+                backend.transcribe(speech(), language)
+
+
+class FakeDecoder:
+    """A StreamDecoder that turns every byte into one sample and holds back `tail` samples."""
+    def __init__(self, tail=160):
+        self.tail = tail
+
+    def feed(self, data):
+        return np.zeros(len(data), np.int16)
+
+    def close(self):
+        return np.zeros(self.tail, np.int16)
+
+
+class FakeSoundMonitor:
+    def open_stream(self):
+        return FakeDecoder()
+
+    def process_pcm(self, pcm):
+        return {'recognized_texts': {'English': f'{len(pcm)} samples'}, 'speech_detected': False}
+
+
+class AudioStreamConsumerTests(MonitoringFixture):
+    def communicate(self, monitor, session):
+        from asgiref.sync import async_to_sync
+        from channels.routing import URLRouter
+        from channels.testing import WebsocketCommunicator
+        from .routing import websocket_urlpatterns
+
+        async def run():
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns),
+                                                 f'/ws/audio/{self.attempt.attempt_id}/')
+            communicator.scope['user'] = self.student
+            # A monitor, or a function building one.
+            factory = monitor if callable(monitor) else lambda: monitor
+            with mock.patch.object(pipeline, 'get_sound_monitor', side_effect=factory):
+                connected = await communicator.connect()
+                result = await session(communicator) if connected[0] and session else None
+            await communicator.disconnect()
+            return connected, result
+        return async_to_sync(run)()
+
+    def connect(self, monitor):
+        return self.communicate(monitor, None)[0]
+
+    def test_end_of_stream_flushes_the_decoder_before_closing(self):
+        async def session(communicator):
+            await communicator.send_to(bytes_data=b'x' * 320)
+            messages = [await communicator.receive_json_from()]
+            await communicator.send_to(bytes_data=b'x' * 640)
+            await communicator.send_json_to({'type': 'end'})
+            while not messages[-1].get('final'):
+                messages.append(await communicator.receive_json_from())
+            closed = await communicator.receive_output()
+            return messages, closed
+
+        connected, (messages, closed) = self.communicate(FakeSoundMonitor(), session)
+        self.assertTrue(connected[0])
+        self.assertEqual(messages[0]['recognized_texts'], {'English': '320 samples'})
+        # The last chunk and the decoder's buffered tail are recognized before the final message.
+        samples = [int(m['recognized_texts']['English'].split()[0]) for m in messages[1:] if 'recognized_texts' in m]
+        self.assertEqual(sum(samples), 640 + 160)
+        self.assertTrue(messages[-1]['final'])
+        self.assertFalse(any(m.get('final') for m in messages[:-1]))
+        self.assertEqual(closed['type'], 'websocket.close')
+
+    def test_sound_monitor_is_built_off_the_event_loop(self):
+        import asyncio
+        on_loop = []
+
+        def build():
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return FakeSoundMonitor()
+        self.assertTrue(self.connect(build)[0])
+        self.assertEqual(on_loop, [False])
+
+    def test_decoder_failure_closes_with_an_error_code(self):
+        class NoFfmpeg(FakeSoundMonitor):
+            def open_stream(self):
+                raise FileNotFoundError(2, 'No such file', 'ffmpeg')
+        with self.assertLogs('integrity_app.consumers', 'ERROR'):
+            self.assertEqual(self.connect(NoFfmpeg()), (False, 1011))
+
+
+class QueuedWaiter:
+    """Wraps admission._Waiter creation so a test knows when a frame is waiting in its slot."""
+    def __init__(self):
+        from .admission import _Waiter
+        self.queued = threading.Semaphore(0)
+        self._waiter = _Waiter
+
+    def __call__(self):
+        waiter = self._waiter()
+        self.queued.release()
+        return waiter
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    def setUp(self):
+        from .admission import AdmissionController
+        from .sessions import MonitorSession
+        self.admission = AdmissionController(max_concurrent=1, wait_timeout=10.0)
+        self.session = MonitorSession('1:')
+        self.waiters = QueuedWaiter()
+        patcher = mock.patch('integrity_app.admission._Waiter', self.waiters)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def enter_in_thread(self):
+        """Starts enter_session on a thread; returns (done Event, result list, thread)."""
+        done, result = threading.Event(), []
+
+        def run():
+            result.append(self.admission.enter_session(self.session))
+            done.set()
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.assertTrue(self.waiters.queued.acquire(timeout=5))
+        return done, result, thread
+
+    def test_newer_frame_supersedes_the_waiting_one(self):
+        self.assertTrue(self.admission.enter_session(self.session))
+        first_done, first, _ = self.enter_in_thread()
+        second_done, second, _ = self.enter_in_thread()
+        # The older waiting frame returns at once; the newer one keeps waiting.
+        self.assertTrue(first_done.wait(5))
+        self.assertEqual(first, [False])
+        self.assertFalse(second_done.is_set())
+
+        # Finishing the frame in flight hands the slot straight to the newest frame.
+        self.admission.leave_session(self.session)
+        self.assertTrue(second_done.wait(5))
+        self.assertEqual(second, [True])
+        self.assertTrue(self.session.in_flight)
+        self.admission.leave_session(self.session)
+        self.assertFalse(self.session.in_flight)
+        self.assertEqual(self.admission.stats()['superseded'], 1)
+
+    def test_timed_out_waiter_frees_its_place(self):
+        self.admission.wait_timeout = 0.01
+        self.assertTrue(self.admission.enter_session(self.session))
+        done, result, thread = self.enter_in_thread()
+        thread.join(5)
+        self.assertEqual(result, [False])
+        self.assertIsNone(self.session.waiting)
+        # Nothing is waiting any more, so finishing releases the slot for the next frame.
+        self.admission.leave_session(self.session)
+        self.assertFalse(self.session.in_flight)
+        self.assertTrue(self.admission.enter_session(self.session))
+
+    def test_global_limit_rejects_with_retry_after(self):
+        from .admission import Overloaded
+
+        self.admission.acquire(online_sessions=10)
+        with self.assertRaises(Overloaded) as raised:
+            self.admission.acquire(online_sessions=10)
+        self.assertGreaterEqual(raised.exception.retry_after_ms, 100)
+        self.assertGreaterEqual(raised.exception.next_capture_ms, self.admission.base_interval_ms)
+        self.admission.release(40.0)
+        self.admission.acquire(online_sessions=10)
+        self.assertEqual(self.admission.stats()['rejected'], 1)
+
+    def test_leave_session_always_releases_the_slot(self):
+        from .admission import Overloaded
+
+        def fail(session, frame):
+            raise RuntimeError('analysis failed')
+        with mock.patch.object(pipeline, 'admission', self.admission):
+            with self.assertRaises(RuntimeError):
+                pipeline.handle_frame(self.session, lambda: None, fail)
+            self.assertFalse(self.session.in_flight)
+            self.assertEqual(self.admission.active, 0)
+
+            self.admission.max_concurrent = 0
+            with self.assertRaises(Overloaded):
+                pipeline.handle_frame(self.session, lambda: None, fail)
+            self.assertFalse(self.session.in_flight)
+            self.assertEqual(self.admission.active, 0)
+
+
+class OverloadedResponseTests(MonitoringFixture):
+    def test_full_node_answers_503_with_retry_after(self):
+        from .admission import AdmissionController
+
+        self.client.force_login(self.student)
+        with mock.patch.object(pipeline, 'admission', AdmissionController(max_concurrent=0)):
+            response = self.client.post('/process-frame/', b'jpeg', content_type='image/jpeg')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertIn('next_capture_ms', response.json())
+
+
+class FrameBufferPoolTests(SimpleTestCase):
+    def test_distinct_shapes_stay_within_the_byte_budget(self):
+        from .frames import FrameBufferPool
+
+        frame_bytes = 100 * 120 * 3
+        pool = FrameBufferPool(per_shape=8, max_bytes=10 * frame_bytes, max_buffers=16)
+        for i in range(500):
+            with pool.borrow((100, 120 + i, 3)) as buf:
+                buf[:] = 0
+            self.assertLessEqual(pool.pooled_bytes, pool.max_bytes)
+            self.assertLessEqual(pool.allocated, pool.max_buffers)
+        stats = pool.stats()
+        self.assertLessEqual(len(stats['free']), 10)
+        self.assertGreater(stats['evicted'], 400)
+        # The most recently used shapes are the ones kept.
+        self.assertIn('100x619x3', stats['free'])
+
+    def test_buffers_are_reused_and_lending_is_capped(self):
+        from contextlib import ExitStack
+        from .frames import FrameBufferPool
+
+        pool = FrameBufferPool(per_shape=2, max_bytes=1 << 20, max_buffers=3)
+        with pool.borrow((4, 4, 3)) as first:
+            pass
+        with pool.borrow((4, 4, 3)) as again:
+            self.assertIs(again, first)
+        with ExitStack() as stack:
+            lent = [stack.enter_context(pool.borrow((4, 4, 3))) for _ in range(5)]
+            self.assertEqual(len({id(buf) for buf in lent}), 5)
+            self.assertEqual(pool.allocated, 3)
+            self.assertEqual(pool.stats()['overflow'], 2)
+        # One-off buffers are dropped and per_shape caps what is kept.
+        self.assertEqual(pool.stats()['free'], {'4x4x3': 2})
+        self.assertEqual(pool.allocated, 2)
+
+
+class GcpSpeechTests(SimpleTestCase):
+    def setUp(self):
+        from . import gcp_speech
+        self.backend = mock.Mock()
+        self.backend.transcribe.return_value = 'hello'
+        patcher = mock.patch.object(gcp_speech, '_backend', self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sample_rate_is_forwarded(self):
+        from .gcp_speech import gcp_speech_to_text
+
+        self.assertEqual(gcp_speech_to_text(b'\x00\x01' * 800, sample_rate=8000, language_code='ar-SA'), 'hello')
+        pcm, language = self.backend.transcribe.call_args.args
+        self.assertEqual((len(pcm), language), (800, 'ar-SA'))
+        self.assertEqual(self.backend.transcribe.call_args.kwargs, {'sample_rate': 8000})
+
+    def test_odd_length_audio_is_an_error(self):
+        from .gcp_speech import gcp_speech_to_text
+
+        self.assertTrue(gcp_speech_to_text(b'\x00' * 801).startswith('Transcription Error'))
+        self.backend.transcribe.assert_not_called()
+
+    def test_backend_config_uses_the_sample_rate(self):
+        from .speech import GoogleCloudBackend
+
+        backend = GoogleCloudBackend.__new__(GoogleCloudBackend)
+        backend._speech, backend.client, backend.timeout = mock.Mock(), mock.Mock(), 5.0
+        backend.locales = {'en': 'en-US'}
+        backend.client.recognize.return_value = SimpleNamespace(results=[])
+        backend.transcribe(speech(), 'en', sample_rate=8000)
+        kwargs = backend._speech.RecognitionConfig.call_args.kwargs
+        self.assertEqual((kwargs['sample_rate_hertz'], kwargs['language_code']), (8000, 'en-US'))
+
+
+def textured_frame(x=200, y=160, size=160, width=640, height=480):
+    """A flat grey frame with a smooth noise patch whose top-left corner is at (x, y)."""
+    import cv2
+
+    rng = np.random.default_rng(7)
+    patch = cv2.GaussianBlur(rng.integers(0, 256, (size, size), dtype=np.uint8), (9, 9), 0)
+    frame = np.full((height, width, 3), 128, np.uint8)
+    frame[y:y + size, x:x + size] = patch[..., None]
+    return frame
+
+
+class ObjectTrackerTests(SimpleTestCase):
+    def setUp(self):
+        from .sessions import MonitorSession
+        from .tracking import ObjectTracker
+
+        self.session = MonitorSession('tracker')
+        self.tracker = ObjectTracker(interval=4, motion_threshold=20.0)
+        self.detect = mock.Mock(return_value=[{'box': [200, 160, 360, 320], 'class_name': 'cell phone'}])
+
+    def test_first_frame_runs_the_detector(self):
+        from .tracking import motion_score, small_grey
+
+        self.assertEqual(motion_score(None, small_grey(textured_frame())), float('inf'))
+        detections, source = self.tracker.update(textured_frame(), self.session, self.detect)
+        self.assertEqual(source, 'fresh')
+        self.assertEqual(detections, self.detect.return_value)
+
+    def test_shifted_rectangle_is_tracked(self):
+        self.tracker.update(textured_frame(), self.session, self.detect)
+        detections, source = self.tracker.update(textured_frame(x=216, y=168), self.session, self.detect)
+        self.assertEqual(source, 'tracked')
+        self.assertEqual(self.detect.call_count, 1)
+        x1, y1, x2, y2 = detections[0]['box']
+        # Flow is measured on a 160 px wide copy, so allow one small-frame pixel (4 px).
+        self.assertAlmostEqual(x1, 216, delta=4)
+        self.assertAlmostEqual(y1, 168, delta=4)
+        self.assertEqual((x2 - x1, y2 - y1), (160, 160))
+        self.assertEqual(detections[0]['class_name'], 'cell phone')
+
+    def test_detector_runs_again_after_the_interval(self):
+        sources = [self.tracker.update(textured_frame(x=200 + 4 * i), self.session, self.detect)[1]
+                   for i in range(5)]
+        self.assertEqual(sources, ['fresh', 'tracked', 'tracked', 'tracked', 'fresh'])
+        self.assertEqual(self.tracker.stats()['tracked'], 3)
+
+    def test_lost_points_force_a_detection(self):
+        self.tracker.update(textured_frame(), self.session, self.detect)
+        # The patch is gone: the change stays under the motion threshold but the
+        # feature points no longer track back, so the detector has to run.
+        blank = np.full((480, 640, 3), 128, np.uint8)
+        self.assertEqual(self.tracker.update(blank, self.session, self.detect)[1], 'fresh')
+
+    def test_large_change_forces_a_detection(self):
+        self.tracker.update(textured_frame(), self.session, self.detect)
+        self.assertEqual(self.tracker.update(np.zeros((480, 640, 3), np.uint8), self.session, self.detect)[1], 'fresh')
+
+    def test_interval_one_disables_tracking(self):
+        from .tracking import ObjectTracker
+
+        tracker = ObjectTracker(interval=1)
+        for _ in range(3):
+            self.assertEqual(tracker.update(textured_frame(), self.session, self.detect)[1], 'fresh')
+
+
+class FrameGateTests(SimpleTestCase):
+    def setUp(self):
+        from .gating import FrameGate
+        from .sessions import MonitorSession
+        from .tracking import small_grey
+
+        self.session = MonitorSession('gate')
+        self.gate = FrameGate(threshold=2.0, max_age=3.0)
+        self.thumb = self.gate.thumbnail(small_grey(textured_frame()))
+        self.result = {'face': {'status': 'Normal'}, 'detections': []}
+
+    def test_first_frame_is_not_gated(self):
+        self.assertIsNone(self.gate.check(self.thumb, self.session, render=False))
+
+    def test_identical_frame_gets_the_cached_result(self):
+        self.assertIsNone(self.gate.check(self.thumb, self.session, render=False))
+        self.gate.store(self.thumb, self.session, self.result, render=False)
+        self.assertIs(self.gate.check(self.thumb.copy(), self.session, render=False), self.result)
+        self.assertEqual(self.gate.stats()['skipped'], 1)
+        self.assertEqual(self.session.gate.skipped, 1)
+
+    def test_changed_frame_is_not_gated(self):
+        from .tracking import small_grey
+
+        self.gate.check(self.thumb, self.session, render=False)
+        self.gate.store(self.thumb, self.session, self.result, render=False)
+        # Something dark (a hand, a phone) enters the frame.
+        frame = textured_frame()
+        frame[300:460, 420:600] = 20
+        changed = self.gate.thumbnail(small_grey(frame))
+        self.assertIsNone(self.gate.check(changed, self.session, render=False))
+
+    def test_render_needs_a_rendered_result(self):
+        self.gate.check(self.thumb, self.session, render=False)
+        self.gate.store(self.thumb, self.session, self.result, render=False)
+        self.assertIsNone(self.gate.check(self.thumb, self.session, render=True))
+
+    def test_stale_result_is_not_reused(self):
+        self.gate.check(self.thumb, self.session, render=False)
+        self.gate.store(self.thumb, self.session, self.result, render=False)
+        self.session.gate.analysed_at -= 4.0
+        self.assertIsNone(self.gate.check(self.thumb, self.session, render=False))
+
+    def test_zero_threshold_disables_gating(self):
+        from .gating import FrameGate
+
+        gate = FrameGate(threshold=0)
+        gate.store(self.thumb, self.session, self.result, render=False)
+        self.assertIsNone(gate.check(self.thumb, self.session, render=False))
+        self.assertIsNone(self.session.gate)
+
+
+def encoded_frame(width=640, height=480, ext='.jpg'):
+    import cv2
+
+    frame = np.random.default_rng(3).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return cv2.imencode(ext, frame)[1].tobytes()
+
+
+class FrameIngestTests(SimpleTestCase):
+    def setUp(self):
+        from django.test import RequestFactory
+
+        self.factory = RequestFactory()
+        self.jpeg = encoded_frame()
+
+    def test_raw_body(self):
+        from .frames import read_frame
+
+        request = self.factory.post('/', self.jpeg, content_type='image/jpeg')
+        self.assertEqual(read_frame(request).shape, (480, 640, 3))
+        self.assertEqual(read_frame(request, max_side=320).shape, (240, 320, 3))
+
+    def test_multipart_upload(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        from .frames import read_frame
+
+        upload = SimpleUploadedFile('frame.jpg', self.jpeg, content_type='image/jpeg')
+        request = self.factory.post('/', {'image': upload})
+        self.assertEqual(read_frame(request).shape, (480, 640, 3))
+
+    def test_base64_form(self):
+        import base64
+        from urllib.parse import urlencode
+
+        from .frames import read_frame
+
+        data_url = 'data:image/jpeg;base64,' + base64.b64encode(self.jpeg).decode()
+        request = self.factory.post('/', urlencode({'image': data_url}),
+                                    content_type='application/x-www-form-urlencoded')
+        self.assertEqual(read_frame(request).shape, (480, 640, 3))
+
+    def test_missing_image(self):
+        from .frames import read_frame
+
+        with self.assertRaisesMessage(ValueError, 'No image data'):
+            read_frame(self.factory.post('/', {}))
+
+    def test_webp_upload(self):
+        from .frames import jpeg_size, read_frame
+
+        webp = encoded_frame(ext='.webp')
+        self.assertIsNone(jpeg_size(webp))
+        request = self.factory.post('/', webp, content_type='image/webp')
+        self.assertEqual(read_frame(request, max_side=320).shape, (240, 320, 3))
+
+    def test_jpeg_size_reads_the_header(self):
+        from .frames import jpeg_size
+
+        self.assertEqual(jpeg_size(self.jpeg), (640, 480))
+        self.assertEqual(jpeg_size(encoded_frame(100, 300)), (100, 300))
+
+    def test_truncated_or_foreign_data(self):
+        from .frames import decode_data_url, decode_frame_bytes, jpeg_size
+
+        for data in (self.jpeg[:20], b'', b'%PDF-1.4' + bytes(64), b'\xff\xd8' + bytes(64)):
+            with self.subTest(data=data[:8]):
+                self.assertIsNone(jpeg_size(data))
+                with self.assertRaises(ValueError):
+                    decode_frame_bytes(data, max_side=320)
+        with self.assertRaises(ValueError):
+            decode_frame_bytes(self.jpeg[:300])
+        with self.assertRaises(ValueError):
+            decode_data_url('not a data url')
+        with self.assertRaises(ValueError):
+            decode_data_url('data:image/jpeg;base64,@@@')
+
+    def test_missing_start_of_frame(self):
+        from .frames import decode_frame_bytes, jpeg_size
+
+        start = self.jpeg.find(b'\xff\xc0')
+        length = int.from_bytes(self.jpeg[start + 2:start + 4], 'big')
+        stripped = self.jpeg[:start] + self.jpeg[start + 2 + length:]
+        self.assertIsNone(jpeg_size(stripped))
+        with self.assertRaises(ValueError):
+            decode_frame_bytes(stripped, max_side=320)
+
+
+class ReducedDecodeTests(SimpleTestCase):
+    def test_flag_keeps_the_longest_side_at_least_max_side(self):
+        import cv2
+
+        from .frames import decode_frame_bytes, jpeg_size, reduced_decode_flag
+
+        for width, height, max_side in ((2560, 1440, 640), (1279, 720, 640), (1280, 720, 640),
+                                        (720, 1281, 320), (641, 480, 640), (5121, 100, 640)):
+            with self.subTest(size=(width, height), max_side=max_side):
+                data = encoded_frame(width, height)
+                flag = reduced_decode_flag(jpeg_size(data), max_side)
+                reduced = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+                self.assertGreaterEqual(max(reduced.shape[:2]), max_side)
+                self.assertEqual(max(decode_frame_bytes(data, max_side).shape[:2]), max_side)
+
+    def test_cheapest_flag_is_chosen(self):
+        import cv2
+
+        from .frames import reduced_decode_flag
+
+        self.assertEqual(reduced_decode_flag((2560, 1440), 640), cv2.IMREAD_REDUCED_COLOR_4)
+        self.assertEqual(reduced_decode_flag((1280, 720), 640), cv2.IMREAD_REDUCED_COLOR_2)
+        self.assertEqual(reduced_decode_flag((1279, 720), 640), cv2.IMREAD_COLOR)
+        self.assertEqual(reduced_decode_flag((5120, 2880), 640), cv2.IMREAD_REDUCED_COLOR_8)
+        self.assertEqual(reduced_decode_flag(None, 640), cv2.IMREAD_COLOR)
+        self.assertEqual(reduced_decode_flag((5120, 2880), 0), cv2.IMREAD_COLOR)
+
+    def test_downscale(self):
+        from .frames import downscale
+
+        frame = np.zeros((480, 640, 3), np.uint8)
+        self.assertIs(downscale(frame, 640), frame)
+        self.assertIs(downscale(frame, 0), frame)
+        self.assertEqual(downscale(frame, 320).shape, (240, 320, 3))
+        self.assertEqual(downscale(np.zeros((1000, 3, 3), np.uint8), 100).shape, (100, 1, 3))
+
+
+def face_points(count=478):
+    return np.random.default_rng(5).uniform(0.2, 0.8, (count, 3)).astype(np.float32)
+
+
+class LandmarkPacketTests(SimpleTestCase):
+    def test_round_trip(self):
+        from .client_inference import FULL_FRAME, NO_IMAGE, decode_packet, encode_packet
+
+        points = face_points()
+        packet = decode_packet(encode_packet(points, value_type=2))
+        np.testing.assert_array_equal(packet.landmarks, points)
+        self.assertEqual((packet.image, packet.image_kind), (None, NO_IMAGE))
+        half = decode_packet(encode_packet(points, b'jpeg', FULL_FRAME))
+        np.testing.assert_allclose(half.landmarks, points, atol=1e-3)
+        self.assertEqual((bytes(half.image), half.image_kind), (b'jpeg', FULL_FRAME))
+        self.assertIsNone(decode_packet(encode_packet(None)).landmarks)
+
+    def test_malformed_packets(self):
+        from .client_inference import HEADER, MAGIC, THUMBNAIL, decode_packet, encode_packet
+
+        packet = encode_packet(face_points())
+        cases = {
+            'short': packet[:6],
+            'magic': b'XXXX' + packet[4:],
+            'value type': packet[:4] + b'\x03' + packet[5:],
+            'image kind': packet[:5] + b'\x07' + packet[6:],
+            'point count': HEADER.pack(MAGIC, 1, 0, 100) + bytes(600),
+            'truncated': packet[:-1],
+            'trailing data': packet + b'jpeg',
+            'missing image': encode_packet(face_points(), b'', THUMBNAIL),
+        }
+        for name, data in cases.items():
+            with self.subTest(name), self.assertRaises(ValueError):
+                decode_packet(data)
+
+    def test_oversized_image(self):
+        from .client_inference import MAX_IMAGE_BYTES, THUMBNAIL, decode_packet, encode_packet
+
+        decode_packet(encode_packet(face_points(), bytes(MAX_IMAGE_BYTES), THUMBNAIL))
+        with self.assertRaisesMessage(ValueError, 'too large'):
+            decode_packet(encode_packet(face_points(), bytes(MAX_IMAGE_BYTES + 1), THUMBNAIL))
+
+    def test_nan_or_out_of_range_landmarks(self):
+        from .client_inference import decode_packet, encode_packet
+
+        for value in (np.nan, np.inf, 50.0, -3.0):
+            points = face_points()
+            points[10, 1] = value
+            for value_type in (1, 2):
+                with self.subTest(value=value, value_type=value_type), self.assertRaises(ValueError):
+                    decode_packet(encode_packet(points, value_type=value_type))
+        # Slightly outside the frame, as when the face is cut off by its edge.
+        points = face_points()
+        points[0, :2] = (-0.1, 1.1)
+        decode_packet(encode_packet(points))
+
+
+class SpotCheckerTests(SimpleTestCase):
+    def setUp(self):
+        import random
+
+        from .client_inference import SpotChecker
+        from .sessions import MonitorSession
+
+        self.session = MonitorSession('spot')
+        self.checker = SpotChecker(rate=0.1, tolerance=0.03, max_failures=2, grace_packets=3,
+                                   rng=random.Random(11))
+
+    def packet(self, kind=None):
+        from .client_inference import NO_IMAGE, LandmarkPacket
+
+        return LandmarkPacket(face_points(), b'jpeg' if kind else None, kind or NO_IMAGE)
+
+    def test_sampling_rate(self):
+        requests = 0
+        for _ in range(5000):
+            if self.checker.request(self.session):
+                requests += 1
+                self.session.spot_check_due = 0
+        self.assertAlmostEqual(requests / 5000, 0.1, delta=0.02)
+
+    def test_one_request_outstanding(self):
+        from .client_inference import SpotChecker
+
+        checker = SpotChecker(rate=1.0)
+        self.assertTrue(checker.request(self.session))
+        self.assertFalse(checker.request(self.session))
+
+    def test_matching_frame_passes(self):
+        points = face_points()
+        self.session.spot_check_due = 3
+        deviation = self.checker.verify(self.session, points, points + 0.01)
+        self.assertLess(deviation, 0.03)
+        self.assertEqual((self.session.spot_check_due, self.session.spot_check_failures), (0, 0))
+        self.assertTrue(self.session.client_trusted)
+
+    def test_mismatches_revoke_trust(self):
+        points = face_points()
+        self.checker.verify(self.session, points, points + 0.1)
+        self.assertTrue(self.session.client_trusted)
+        # A face the server cannot find counts as a mismatch too.
+        self.assertEqual(self.checker.verify(self.session, points, None), float('inf'))
+        self.assertFalse(self.session.client_trusted)
+        self.assertEqual(self.checker.stats()['revoked_sessions'], 1)
+
+    def test_ignored_request_counts_as_a_failure(self):
+        from .client_inference import FULL_FRAME
+
+        self.session.spot_check_due = 3
+        for _ in range(2):
+            self.assertTrue(self.checker.on_packet(self.session, self.packet()))
+        self.checker.on_packet(self.session, self.packet(FULL_FRAME))
+        self.assertEqual(self.session.spot_check_due, 1)
+        self.checker.on_packet(self.session, self.packet())
+        self.assertEqual((self.session.spot_check_due, self.session.spot_check_failures), (0, 1))
+
+
+def marker_mesh(image, channel=None):
+    """
+    Stands in for the face mesh: the centres of the white squares in `image` (or of
+    the squares lit in one colour channel), normalised to that image (x right,
+    y down, z 0), or None without any.
+    """
+    import cv2
+
+    grey = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if channel is None else image[..., channel]
+    count, _, _, centroids = cv2.connectedComponentsWithStats((grey > 127).astype(np.uint8))
+    if count < 2:
+        return None
+    height, width = grey.shape
+    # Pixel centres sit half a pixel in from their top-left edge.
+    points = (centroids[1:] + 0.5) / (width, height)
+    points = points[np.lexsort((points[:, 0], points[:, 1]))]
+    return np.column_stack([points, np.zeros(len(points))]).astype(np.float32)
+
+
+def marker_frame(centres, width=640, height=480, half=4, colour=255, frame=None):
+    frame = np.zeros((height, width, 3), np.uint8) if frame is None else frame
+    for x, y in centres:
+        frame[y - half:y + half, x - half:x + half] = colour
+    return frame
+
+
+def channel_mesh(image):
+    # One face per colour channel: red squares first, then blue ones.
+    faces = (marker_mesh(image, channel) for channel in (2, 0))
+    return [face for face in faces if face is not None]
+
+
+class FaceRoiTrackerTests(SimpleTestCase):
+    def setUp(self):
+        from .face_roi import FaceRoiTracker
+        from .sessions import MonitorSession
+
+        self.session = MonitorSession('roi')
+        self.tracker = FaceRoiTracker(padding=0.25, size=128)
+        self.calls = []
+
+    def mesh(self, image):
+        self.calls.append(image.shape[:2])
+        points = marker_mesh(image)
+        return [] if points is None else [points]
+
+    def assert_maps_back(self, centres, width=640, height=480):
+        frame = marker_frame(centres, width, height)
+        truth = marker_mesh(frame)
+        self.tracker.locate(frame, self.session, self.mesh)
+        self.assertIsNotNone(self.session.face_roi)
+        self.calls.clear()
+        points = self.tracker.locate(frame, self.session, self.mesh)
+        # The second call found the face in the size x size crop alone.
+        self.assertEqual(self.calls, [(128, 128)])
+        np.testing.assert_allclose(points[:, 0] * width, truth[:, 0] * width, atol=1.0)
+        np.testing.assert_allclose(points[:, 1] * height, truth[:, 1] * height, atol=1.0)
+        return self.session.face_roi
+
+    def test_box_is_padded_and_square(self):
+        box = self.assert_maps_back([(300, 200), (380, 200), (340, 260)])
+        x0, y0, x1, y1 = box
+        # 80 px between the outermost landmarks, padded by 25% on each side.
+        self.assertEqual(x1 - x0, y1 - y0)
+        self.assertAlmostEqual(x1 - x0, 120, delta=1)
+        self.assertAlmostEqual((x0 + x1) / 2, 340, delta=1)
+
+    def test_box_is_shifted_inside_the_frame(self):
+        x0, y0, x1, y1 = self.assert_maps_back([(560, 400), (630, 400), (600, 470)])
+        self.assertEqual((x1, y1), (640, 480))
+
+    def test_box_is_clamped_to_the_frame(self):
+        # Padded, the face would be taller than the frame: the side stops at its height.
+        x0, y0, x1, y1 = self.assert_maps_back([(310, 20), (330, 300), (320, 160)], width=640, height=320)
+        self.assertEqual((y0, y1, x1 - x0), (0, 320, 320))
+        self.assertAlmostEqual((x0 + x1) / 2, 320, delta=1)
+
+    def test_z_is_scaled_by_the_crop_width(self):
+        from .face_roi import FaceRoiTracker
+
+        points = np.array([[0.5, 0.5, -0.1]], np.float32)
+        mapped = FaceRoiTracker.to_frame(points, (100, 50, 300, 250), 800, 400)
+        np.testing.assert_allclose(mapped, [[(100 + 100) / 800, (50 + 100) / 400, -0.1 * 200 / 800]])
+
+    def test_lost_face_falls_back_to_the_full_frame(self):
+        frame = marker_frame([(300, 200), (380, 200), (340, 260)])
+        self.tracker.locate(frame, self.session, self.mesh)
+        self.calls.clear()
+        # The face moved out of the previous box.
+        moved = marker_frame([(60, 60), (140, 60), (100, 120)])
+        points = self.tracker.locate(moved, self.session, self.mesh)
+        self.assertEqual(self.calls, [(128, 128), (480, 640)])
+        np.testing.assert_allclose(points, marker_mesh(moved))
+        self.assertLess(self.session.face_roi[0], 60)
+        self.assertEqual(self.tracker.stats()['lost'], 1)
+
+        self.assertIsNone(self.tracker.locate(np.zeros_like(frame), self.session, self.mesh))
+        self.assertIsNone(self.session.face_roi)
+
+    def test_second_face_is_counted_on_full_frame_searches(self):
+        from .face_roi import FaceRoiTracker
+
+        tracker = FaceRoiTracker(padding=0.25, size=128, full_every=3)
+        student = [(300, 200), (380, 200), (340, 260)]
+        alone = marker_frame(student, colour=(255, 0, 0))
+        # Someone else appears at the left edge, outside the student's crop.
+        joined = marker_frame([(40, 200), (100, 200), (70, 250)], colour=(0, 0, 255), frame=alone.copy())
+        shapes, counts = [], []
+
+        def mesh(image):
+            self.calls.append(image.shape[:2])
+            return channel_mesh(image)
+
+        for frame in [alone] * 2 + [joined] * 4 + [alone] * 4:
+            self.calls.clear()
+            points = tracker.locate(frame, self.session, mesh)
+            shapes.append(self.calls[0])
+            counts.append(self.session.face_count)
+            # The student (blue) stays the tracked face though the mesh lists red first.
+            np.testing.assert_allclose(points[:, :2], marker_mesh(alone, 0)[:, :2], atol=2 / 480)
+        full, crop = (480, 640), (128, 128)
+        self.assertEqual(shapes, [full, crop, crop, crop, full, crop, crop, crop, full, crop])
+        self.assertEqual(counts, [1, 1, 1, 1, 2, 2, 2, 2, 1, 1])
+        self.assertEqual(tracker.stats()['rechecks'], 2)
+
+    def test_size_zero_searches_the_full_frame(self):
+        from .face_roi import FaceRoiTracker
+
+        tracker = FaceRoiTracker(size=0)
+        frame = marker_frame([(300, 200), (380, 200), (340, 260)])
+        for _ in range(2):
+            tracker.locate(frame, self.session, self.mesh)
+        self.assertEqual(self.calls, [(480, 640)] * 2)
+        self.assertIsNone(self.session.face_roi)
+
+
+MODEL_NAMES = {0: 'person', 1: 'Cell Phone', 2: 'book', 3: 'Sunglasses'}
+
+
+@unittest.skipUnless(ultralytics, "ultralytics is not installed")
+class ResolveClassesTests(SimpleTestCase):
+    def test_names_match_case_insensitively(self):
+        from .detectors import resolve_classes
+
+        self.assertEqual(resolve_classes(MODEL_NAMES, ['cell phone', 'SUNGLASSES', 'Book']), [1, 2, 3])
+
+    def test_unknown_names_are_skipped(self):
+        from .detectors import resolve_classes
+
+        with self.assertLogs('integrity_app.detectors', 'INFO') as logs:
+            self.assertEqual(resolve_classes(MODEL_NAMES, ['book', 'laptop', 'book']), [2])
+        self.assertIn('laptop', logs.output[0])
+
+    def test_no_match_detects_all_classes(self):
+        from .detectors import resolve_classes
+
+        self.assertIsNone(resolve_classes(MODEL_NAMES, None))
+        self.assertIsNone(resolve_classes(MODEL_NAMES, []))
+        with self.assertLogs('integrity_app.detectors', 'WARNING'):
+            self.assertIsNone(resolve_classes(MODEL_NAMES, ['laptop', 'earbuds']))
+
+
+class FakeTensor:
+    """The part of a torch tensor _parse_detections uses; counts device transfers."""
+    def __init__(self, rows):
+        self.array = np.asarray(rows, np.float32).reshape(-1, 6)
+        self.transfers = 0
+
+    def __len__(self):
+        return len(self.array)
+
+    def cpu(self):
+        self.transfers += 1
+        return SimpleNamespace(numpy=lambda: self.array)
+
+
+@unittest.skipUnless(torch and ultralytics, "torch and ultralytics are not installed")
+class ParseDetectionsTests(SimpleTestCase):
+    def setUp(self):
+        from .analyzers import FrameAnalyzer
+
+        self.analyzer = FrameAnalyzer.__new__(FrameAnalyzer)
+        self.analyzer.names = MODEL_NAMES
+
+    def parse(self, data):
+        return self.analyzer._parse_detections(SimpleNamespace(boxes=SimpleNamespace(data=data)))
+
+    def test_boxes_are_parsed_in_one_transfer(self):
+        data = FakeTensor([[10.7, 20.2, 110.9, 220.5, 0.91, 1], [0, 5, 50, 60, 0.4, 3]])
+        detections = self.parse(data)
+        self.assertEqual(data.transfers, 1)
+        self.assertEqual(detections, [
+            {'box': [10, 20, 110, 220], 'class_id': 1, 'class_name': 'Cell Phone',
+             'confidence': mock.ANY},
+            {'box': [0, 5, 50, 60], 'class_id': 3, 'class_name': 'Sunglasses', 'confidence': mock.ANY},
+        ])
+        self.assertAlmostEqual(detections[0]['confidence'], 0.91, places=5)
+        # Plain Python values, ready for JsonResponse.
+        self.assertIs(type(detections[0]['box'][0]), int)
+        self.assertIs(type(detections[0]['class_id']), int)
+        self.assertIs(type(detections[0]['confidence']), float)
+
+    def test_no_boxes(self):
+        data = FakeTensor([])
+        self.assertEqual(self.parse(data), [])
+        self.assertEqual(data.transfers, 0)
+
+    def test_numpy_data(self):
+        self.assertEqual(self.parse(np.array([[1, 2, 3, 4, 0.5, 2]], np.float32))[0]['class_name'], 'book')
+
+
+class FakeModel:
+    """
+    Batched model stand-in: each frame's result is its first pixel value. Calls
+    can be held until `release` is set, so several frames queue up behind one.
+    """
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+        self.release = threading.Event()
+        self.release.set()
+        self.called = threading.Event()
+
+    def __call__(self, frames, device, verbose, **kwargs):
+        self.batches.append(len(frames))
+        self.called.set()
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        return [int(frame.flat[0]) for frame in frames]
+
+
+def pixel(value):
+    return np.full((2, 2, 3), value, np.uint8)
+
+
+@unittest.skipUnless(torch and ultralytics, "torch and ultralytics are not installed")
+class BatchingDetectorTests(SimpleTestCase):
+    def detector(self, model, max_batch=4, max_wait_ms=10_000):
+        from .analyzers import BatchingDetector
+
+        return BatchingDetector(model, 'cpu', max_batch=max_batch, max_wait_ms=max_wait_ms,
+                                predict_args={'conf': 0.25})
+
+    def hold_worker(self, model, detector):
+        # The worker is busy with a first frame, so what is submitted next queues up.
+        model.release.clear()
+        first = detector.submit(pixel(0))
+        self.assertTrue(model.called.wait(5))
+        return first
+
+    def test_full_batch_is_flushed_without_waiting(self):
+        model = FakeModel()
+        detector = self.detector(model, max_batch=3)
+        futures = [detector.submit(pixel(i)) for i in (1, 2, 3)]
+        # max_wait is 10 s: only a full batch explains a prompt result.
+        self.assertEqual([f.result(timeout=2) for f in futures], [1, 2, 3])
+        self.assertEqual(model.batches, [3])
+
+    def test_partial_batch_is_flushed_after_max_wait(self):
+        model = FakeModel()
+        detector = self.detector(model, max_batch=8, max_wait_ms=20)
+        first = self.hold_worker(model, detector)
+        futures = [detector.submit(pixel(i)) for i in (1, 2)]
+        model.release.set()
+        self.assertEqual([f.result(timeout=2) for f in [first] + futures], [0, 1, 2])
+        self.assertEqual(model.batches, [1, 2])
+        self.assertEqual(detector.stats()['frames'], 3)
+
+    def test_each_caller_gets_its_own_result(self):
+        model = FakeModel()
+        detector = self.detector(model, max_batch=4, max_wait_ms=50)
+        first = self.hold_worker(model, detector)
+        results = {}
+        submitted = threading.Barrier(13)
+
+        def caller(value):
+            future = detector.submit(pixel(value))
+            submitted.wait(5)
+            results[value] = future.result(timeout=5)
+
+        threads = [threading.Thread(target=caller, args=(v,)) for v in range(1, 13)]
+        for thread in threads:
+            thread.start()
+        submitted.wait(5)
+        model.release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(first.result(timeout=2), 0)
+        self.assertEqual(results, {v: v for v in range(1, 13)})
+        self.assertEqual(model.batches, [1, 4, 4, 4])
+
+    def test_model_error_reaches_every_waiter(self):
+        model = FakeModel(error=RuntimeError('CUDA out of memory'))
+        detector = self.detector(model, max_batch=3, max_wait_ms=20)
+        first = self.hold_worker(model, detector)
+        futures = [detector.submit(pixel(i)) for i in (1, 2, 3)]
+        with self.assertLogs('integrity_app.analyzers', 'ERROR'):
+            model.release.set()
+            for future in [first] + futures:
+                with self.assertRaisesMessage(RuntimeError, 'CUDA out of memory'):
+                    future.result(timeout=2)
+        # The worker survives and serves the next batch.
+        model.error = None
+        self.assertEqual(detector.predict(pixel(9)), 9)
+
+    def test_short_result_list_fails_the_batch(self):
+        detector = self.detector(mock.Mock(return_value=[0]), max_batch=2)
+        futures = [detector.submit(pixel(i)) for i in (1, 2)]
+        with self.assertLogs('integrity_app.analyzers', 'ERROR'):
+            for future in futures:
+                with self.assertRaises(RuntimeError):
+                    future.result(timeout=2)
+
+
+def noise(seconds, dbfs=-45.0, seed=0):
+    """White noise at roughly `dbfs` RMS, as float samples in [-1, 1]."""
+    return np.random.default_rng(seed).normal(0, 10 ** (dbfs / 20), int(seconds * SAMPLE_RATE))
+
+
+def voiced(seconds, dbfs=-20.0, f0=140.0):
+    """A harmonic burst (fundamental plus decaying overtones), like a voiced vowel."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    wave = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+    return wave / np.sqrt(np.mean(wave ** 2)) * 10 ** (dbfs / 20)
+
+
+def to_pcm(samples):
+    return np.clip(samples * 32768, -32768, 32767).astype(np.int16)
+
+
+class VoiceActivityDetectorTests(SimpleTestCase):
+    FRAME_MS = 20
+
+    def setUp(self):
+        from .vad import VoiceActivityDetector
+
+        self.vad = VoiceActivityDetector(frame_ms=self.FRAME_MS, min_speech_ms=60, hangover_ms=200)
+
+    def with_burst(self, burst, start_ms=1000, seconds=2.0):
+        signal = noise(seconds)
+        start = start_ms * SAMPLE_RATE // 1000
+        signal[start:start + len(burst)] += burst
+        return to_pcm(signal)
+
+    def test_noise_alone_is_not_speech(self):
+        result = self.vad.detect(to_pcm(noise(2.0, dbfs=-25.0)))
+        self.assertEqual((result.segments, len(result.speech), result.speech_ratio), (0, 0, 0.0))
+
+    def test_harmonic_burst_over_noise_is_kept(self):
+        result = self.vad.detect(self.with_burst(voiced(0.5)))
+        self.assertEqual(result.segments, 1)
+        # The burst plus the hangover on both sides.
+        self.assertAlmostEqual(len(result.speech) / SAMPLE_RATE, 0.5 + 2 * 0.2, delta=0.05)
+
+    def test_tone_over_noise_is_kept(self):
+        t = np.arange(SAMPLE_RATE // 2) / SAMPLE_RATE
+        result = self.vad.detect(self.with_burst(0.1 * np.sin(2 * np.pi * 440 * t)))
+        self.assertEqual(result.segments, 1)
+
+    def test_blips_shorter_than_60_ms_are_dropped(self):
+        for ms in (20, 40):
+            with self.subTest(ms=ms):
+                self.assertEqual(self.vad.detect(self.with_burst(voiced(ms / 1000))).segments, 0)
+        self.assertEqual(self.vad.detect(self.with_burst(voiced(0.06))).segments, 1)
+
+    def test_hangover_pads_word_edges(self):
+        mask = self.vad.speech_mask(self.with_burst(voiced(0.3)))
+        frames = np.flatnonzero(mask)
+        # Burst frames 50-64, padded by 200 ms (10 frames) on each side.
+        self.assertEqual((frames[0], frames[-1]), (40, 74))
+        self.assertEqual(len(frames), 35)
+
+    def test_short_input(self):
+        self.assertEqual(self.vad.detect(np.zeros(100, np.int16)).segments, 0)
+        self.assertEqual(self.vad.stats()['chunks'], 1)
+
+
+CLEAN = {'face': {'face_detected': True, 'status': 'Normal Behavior'}, 'detections': []}
+
+
+class SamplingPolicyTests(SimpleTestCase):
+    def setUp(self):
+        from .sampling import SamplingPolicy
+        from .sessions import SessionRegistry
+
+        self.sessions = SessionRegistry()
+        self.policy = SamplingPolicy(min_ms=250, base_ms=500, max_ms=4000, calm_step=10.0,
+                                     boost_seconds=15.0, budget_fps=40.0)
+        self.session = self.sessions.get('calm')
+
+    def test_clean_frames_back_off_to_max(self):
+        intervals = [self.policy.next_interval(self.session, CLEAN, self.sessions, now=t)
+                     for t in (0, 9, 10, 20, 30, 40, 100)]
+        self.assertEqual(intervals, [500, 500, 1000, 2000, 4000, 4000, 4000])
+
+    def test_risky_result_boosts_and_resets_the_back_off(self):
+        self.policy.next_interval(self.session, CLEAN, self.sessions, now=0)
+        self.assertEqual(self.policy.next_interval(self.session, CLEAN, self.sessions, now=30), 4000)
+        phone = {**CLEAN, 'detections': [{'class_name': 'cell phone'}]}
+        self.assertEqual(self.policy.next_interval(self.session, phone, self.sessions, now=31), 250)
+        # Clean again, but still inside the boost window.
+        self.assertEqual(self.policy.next_interval(self.session, CLEAN, self.sessions, now=45), 250)
+        # After it, the back-off starts over from the base interval.
+        self.assertEqual(self.policy.next_interval(self.session, CLEAN, self.sessions, now=47), 500)
+        self.assertEqual(self.policy.next_interval(self.session, CLEAN, self.sessions, now=57), 1000)
+
+    def test_risky_results(self):
+        from .sampling import is_risky
+
+        self.assertFalse(is_risky(CLEAN))
+        self.assertTrue(is_risky({**CLEAN, 'face': {**CLEAN['face'], 'multiple_faces': True}}))
+        self.assertTrue(is_risky({'face': {'face_detected': False}}))
+        self.assertTrue(is_risky({'face': {'face_detected': True, 'status': 'Looking away'}}))
+        self.assertTrue(is_risky({**CLEAN, 'face': {**CLEAN['face'], 'alert': True}}))
+
+    def test_external_boost(self):
+        # Speech (process_audio, the audio socket) and failed spot checks boost directly.
+        self.policy.next_interval(self.session, CLEAN, self.sessions, now=0)
+        self.policy.boost(self.session, now=25)
+        self.assertEqual(self.policy.next_interval(self.session, CLEAN, self.sessions, now=26), 250)
+
+    def test_budget_stretches_calm_sessions_first(self):
+        for i in range(39):
+            self.sessions.get(f'calm-{i}')
+        boosted = [self.sessions.get(f'boosted-{i}') for i in range(5)]
+        for session in boosted:
+            self.policy.boost(session, now=0)
+        # 40 calm sessions at 2 fps plus 5 boosted at 4 fps: 100 fps against a budget of 40.
+        interval = self.policy.next_interval(self.session, CLEAN, self.sessions, now=1)
+        self.assertEqual(self.policy.next_interval(boosted[0], CLEAN, self.sessions, now=1), 250)
+        self.assertEqual(interval, int(500 * 80 / 20))
+        self.assertEqual(self.policy.stats()['boosted_sessions'], 5)
+
+
+class SpeechBoostTests(MonitoringFixture):
+    def test_speech_boosts_the_webcam_sampling(self):
+        key = pipeline.resolve_session_key(self.student.pk, str(self.attempt.attempt_id))
+        session = pipeline.sessions.get(key)
+        analyzer = mock.Mock()
+        analyzer.process.return_value = {'speech_detected': True}
+        self.client.force_login(self.student)
+        with mock.patch.object(pipeline, 'get_audio_analyzer', return_value=analyzer):
+            self.client.post(f'/process_audio/?attempt={self.attempt.attempt_id}', b'audio',
+                             content_type='audio/webm')
+        self.assertGreater(session.boost_until, time.time() + pipeline.sampling.boost_seconds - 5)
+
+
+def wav_bytes(samples, rate=SAMPLE_RATE):
+    import io
+    import wave
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(to_pcm(samples).tobytes())
+    return buffer.getvalue()
+
+
+@unittest.skipUnless(shutil.which('ffmpeg'), "ffmpeg is not installed")
+class DecodePcmTests(SimpleTestCase):
+    def test_decodes_and_resamples(self):
+        from .audio import decode_pcm
+
+        # One second at 48 kHz comes back as one second at 16 kHz.
+        pcm = decode_pcm(wav_bytes(voiced(3.0), rate=48000))
+        self.assertEqual(pcm.dtype, np.int16)
+        self.assertAlmostEqual(len(pcm), SAMPLE_RATE, delta=SAMPLE_RATE // 100)
+        self.assertGreater(np.abs(pcm).max(), 1000)
+
+    def test_undecodable_bytes(self):
+        from .audio import decode_pcm
+
+        for data in (b'', b'not audio at all' * 100, wav_bytes(voiced(1.0))[:40]):
+            with self.subTest(data=data[:8]), self.assertRaises(ValueError):
+                decode_pcm(data)
+
+
+class DecodePcmFailureTests(SimpleTestCase):
+    def test_missing_ffmpeg(self):
+        from .audio import decode_pcm
+
+        with self.assertRaisesMessage(ValueError, 'ffmpeg failed'):
+            decode_pcm(b'audio', ffmpeg='/nonexistent/ffmpeg')
+
+    @unittest.skipUnless(shutil.which('sleep'), "needs a POSIX shell")
+    def test_timeout(self):
+        from .audio import decode_pcm
+
+        with tempfile.TemporaryDirectory() as directory:
+            # An "ffmpeg" that never answers.
+            hanging = Path(directory) / 'ffmpeg'
+            hanging.write_text('#!/bin/sh\nexec sleep 10\n')
+            hanging.chmod(0o755)
+            start = time.monotonic()
+            with self.assertRaisesMessage(ValueError, 'timed out'):
+                decode_pcm(b'audio', ffmpeg=str(hanging), timeout=0.2)
+            self.assertLess(time.monotonic() - start, 5)
+
+
+class AudioArchiverTests(SimpleTestCase):
+    def setUp(self):
+        from .audio import AudioArchiver
+
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.archiver = AudioArchiver(self.directory, '/media/recordings/', max_pending=2)
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def fake_ffmpeg(self, args, **kwargs):
+        # Holds the archive thread until released, then "encodes" to the output path.
+        self.started.set()
+        self.release.wait(5)
+        Path(args[-1]).write_bytes(kwargs['input'])
+        return SimpleNamespace(returncode=0, stderr=b'')
+
+    def wait_idle(self):
+        deadline = time.monotonic() + 5
+        while self.archiver.stats()['pending'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_full_queue_drops_recordings(self):
+        with mock.patch('integrity_app.audio.subprocess.run', side_effect=self.fake_ffmpeg):
+            first = self.archiver.submit(b'one')
+            self.assertTrue(self.started.wait(5))
+            second = self.archiver.submit(b'two')
+            self.assertIsNone(self.archiver.submit(b'three'))
+            self.assertEqual(self.archiver.stats()['dropped'], 1)
+            self.release.set()
+            self.wait_idle()
+            # Room again once the backlog has been encoded.
+            self.assertIsNotNone(self.archiver.submit(b'four'))
+            self.wait_idle()
+        self.assertTrue(first.startswith('/media/recordings/recording_'))
+        self.assertEqual((self.directory / second.rsplit('/', 1)[1]).read_bytes(), b'two')
+        self.assertEqual(self.archiver.stats(), {'pending': 0, 'written': 3, 'bytes_written': 10,
+                                                 'dropped': 1, 'failed': 0})
+
+    def test_failed_encoding_is_counted(self):
+        failure = SimpleNamespace(returncode=1, stderr=b'Invalid data found')
+        with mock.patch('integrity_app.audio.subprocess.run', return_value=failure), \
+                self.assertLogs('integrity_app.audio', 'ERROR'):
+            self.archiver.submit(b'broken')
+            self.wait_idle()
+        self.assertEqual((self.archiver.stats()['failed'], self.archiver.stats()['pending']), (1, 0))
+
+
+def solid_jpeg(value):
+    import cv2
+
+    return cv2.imencode('.jpg', np.full((48, 64, 3), value, np.uint8))[1].tobytes()
+
+
+class HeldAnalyzer(FakeAnalyzer):
+    """Records each frame's pixel value; holds the first call until released."""
+    def __init__(self):
+        self.seen = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def analyze(self, frame, session, render=False):
+        self.seen.append(round(float(frame.mean()) / 10) * 10)
+        self.started.set()
+        self.release.wait(5)
+        return super().analyze(frame, session, render)
+
+
+class FrameConsumerTests(MonitoringFixture):
+    def communicate(self, session, user=None, analyzer=None, path=None):
+        from asgiref.sync import async_to_sync
+        from channels.routing import URLRouter
+        from channels.testing import WebsocketCommunicator
+        from .routing import websocket_urlpatterns
+
+        async def run():
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns),
+                                                 path or f'/ws/frames/{self.attempt.attempt_id}/')
+            communicator.scope['user'] = user or self.student
+            with mock.patch.object(pipeline, 'get_frame_analyzer', return_value=analyzer or FakeAnalyzer()):
+                connected = await communicator.connect()
+                result = await session(communicator) if connected[0] and session else None
+            await communicator.disconnect()
+            return connected, result
+        return async_to_sync(run)()
+
+    def test_frame_gets_its_analysis(self):
+        async def session(communicator):
+            await communicator.send_to(bytes_data=solid_jpeg(100))
+            return await communicator.receive_json_from(timeout=5)
+
+        connected, result = self.communicate(session)
+        self.assertTrue(connected[0])
+        self.assertEqual(result['face_status'], 'Normal Behavior')
+        self.assertIn('next_capture_ms', result)
+        key = pipeline.resolve_session_key(self.student.pk, str(self.attempt.attempt_id))
+        self.assertIsNotNone(pipeline.sessions.peek(key))
+
+    def test_bad_messages(self):
+        async def session(communicator):
+            await communicator.send_to(text_data='{"frame": "..."}')
+            text = await communicator.receive_json_from(timeout=5)
+            await communicator.send_to(bytes_data=b'not an image')
+            return text, await communicator.receive_json_from(timeout=5)
+
+        _, (text, garbage) = self.communicate(session)
+        self.assertEqual(text, {'error': 'Frames must be sent as binary messages'})
+        self.assertEqual(garbage, {'error': 'Bad image data'})
+
+    def test_only_students_connect(self):
+        from django.contrib.auth.models import AnonymousUser
+
+        for user in (self.proctor, AnonymousUser()):
+            with self.subTest(user=user):
+                self.assertEqual(self.communicate(None, user=user)[0], (False, 4401))
+
+    def test_newest_frame_replaces_the_waiting_one(self):
+        from asgiref.sync import sync_to_async
+
+        analyzer = HeldAnalyzer()
+
+        async def session(communicator):
+            await communicator.send_to(bytes_data=solid_jpeg(50))
+            await sync_to_async(analyzer.started.wait, thread_sensitive=False)(5)
+            for value in (100, 150, 200):
+                await communicator.send_to(bytes_data=solid_jpeg(value))
+            # Messages are received in order, so once this one is answered the three
+            # frames above have reached the consumer.
+            await communicator.send_to(text_data='sync')
+            self.assertIn('error', await communicator.receive_json_from(timeout=5))
+            analyzer.release.set()
+            return [await communicator.receive_json_from(timeout=5) for _ in range(2)]
+
+        _, results = self.communicate(session, analyzer=analyzer)
+        self.assertEqual(analyzer.seen, [50, 200])
+        self.assertEqual([r['face_status'] for r in results], ['Normal Behavior'] * 2)
+
+
+class ReadinessTests(TestCase):
+    def setUp(self):
+        # Fresh warm-up state, restored afterwards for the rest of the suite.
+        for name, value in (('_warm', threading.Event()), ('_warming', False),
+                            ('_state', {'loaded_in_s': None, 'warmed_in_s': None, 'error': None}),
+                            ('get_audio_analyzer', mock.Mock())):
+            patcher = mock.patch.object(pipeline, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_503_until_warm_then_200(self):
+        analyzer = HeldAnalyzer()
+        with mock.patch.object(pipeline, 'get_frame_analyzer', return_value=analyzer):
+            response = self.client.get('/ready/')
+            self.assertEqual(response.status_code, 503)
+            self.assertTrue(analyzer.started.wait(5))
+            self.assertEqual(self.client.get('/ready/').json()['warming'], True)
+            analyzer.release.set()
+            self.assertTrue(pipeline._warm.wait(5))
+        response = self.client.get('/ready/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['ready'])
+        self.assertIsNotNone(response.json()['warmed_in_s'])
+
+    def wait_for_warmup(self):
+        deadline = time.monotonic() + 5
+        while pipeline._warming and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_failed_warmup_is_reported_and_retried(self):
+        broken = mock.Mock()
+        broken.analyze.side_effect = RuntimeError('weights not found')
+        with mock.patch.object(pipeline, 'get_frame_analyzer', return_value=broken), \
+                self.assertLogs('integrity_app.pipeline', 'ERROR'):
+            self.assertEqual(self.client.get('/ready/').status_code, 503)
+            self.wait_for_warmup()
+            self.assertEqual(pipeline.status()['error'], 'weights not found')
+            # The next probe tries again.
+            self.assertEqual(self.client.get('/ready/').status_code, 503)
+            self.wait_for_warmup()
+        self.assertEqual(broken.analyze.call_count, 2)
+        self.assertFalse(pipeline.is_ready())
+
+
+@unittest.skipUnless(mediapipe, "mediapipe is not installed")
+class FaceMonitorTests(SimpleTestCase):
+    def test_result_reports_a_second_face(self):
+        from .monitoring import FaceMonitor
+        from .sessions import MonitorSession
+
+        monitor = FaceMonitor(pool_size=1, roi_size=128, roi_full_every=2)
+        session = MonitorSession('faces')
+        face = np.load(Path(__file__).parent / 'testdata' / 'landmarks.npy')[0]
+        faces = [face]
+        monitor.mesh_faces = lambda image: list(faces)
+        frame = np.zeros((480, 640, 3), np.uint8)
+        first = monitor.evaluate(frame, session)
+        self.assertEqual((first['face_count'], first['multiple_faces']), (1, False))
+        faces.append(face + [0.3, 0, 0])
+        results = [monitor.evaluate(frame, session) for _ in range(3)]
+        # Counted on the next full-frame search, and from then on.
+        self.assertEqual([r['multiple_faces'] for r in results], [True, True, True])
+        self.assertEqual(results[-1]['face_count'], 2)
+        faces.pop()
+        results = [monitor.evaluate(frame, session) for _ in range(3)]
+        self.assertEqual([r['multiple_faces'] for r in results][-1], False)
+
+    def test_client_landmarks_count_one_face(self):
+        from .monitoring import FaceMonitor
+        from .sessions import MonitorSession
+
+        monitor = FaceMonitor(pool_size=1)
+        face = np.load(Path(__file__).parent / 'testdata' / 'landmarks.npy')[0]
+        result = monitor.evaluate_landmarks(face, MonitorSession('client'))
+        self.assertEqual((result['face_count'], result['multiple_faces']), (1, False))
+        self.assertEqual(monitor.evaluate_landmarks(None, MonitorSession('none'))['face_count'], 0)
+
+
+class DetectorStatsTests(MonitoringFixture):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='ops', password='secret', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def test_stats_do_not_build_components(self):
+        getters = ('get_frame_analyzer', 'get_audio_analyzer', 'get_sound_monitor', 'get_speech_recognizer')
+        with mock.patch.multiple(pipeline, _frame_analyzer=None, _audio_analyzer=None, _sound_monitor=None,
+                                 _speech_recognizer=None, **{name: mock.DEFAULT for name in getters}) as mocks:
+            stats = self.client.get('/detector-stats/').json()
+        for name in getters:
+            mocks[name].assert_not_called()
+        self.assertEqual((stats['detector'], stats['audio'], stats['speech'], stats['audio_streams']['vad']),
+                         (None, None, None, None))
+        self.assertIn('sessions', stats)
+
+    def test_built_components_report_their_stats(self):
+        analyzer = mock.Mock()
+        analyzer.stats.return_value = {'detector': {'backend': 'torch'}, 'tracking': {}}
+        recognizer = mock.Mock()
+        recognizer.stats.return_value = {'workers': 2}
+        with mock.patch.multiple(pipeline, _frame_analyzer=analyzer, _speech_recognizer=recognizer):
+            stats = self.client.get('/detector-stats/').json()
+        self.assertEqual(stats['detector'], {'backend': 'torch'})
+        self.assertEqual(stats['speech'], {'workers': 2})
+
+    def test_staff_only(self):
+        self.client.force_login(self.student)
+        self.assertNotEqual(self.client.get('/detector-stats/').status_code, 200)
@@ -0,0 +1,156 @@
+"""
+Detect-then-track for the object detector.
+
+A full YOLO pass runs on a session's keyframes only: every `interval` frames, when
+the downscaled frame changed by more than `motion_threshold`, or when a tracked box
+is lost. In between, boxes are carried forward with sparse Lucas-Kanade optical
+flow on a small greyscale copy of the frame, which costs about a millisecond.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+TRACK_WIDTH = 160
+_LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                  criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+# Largest forward-backward flow error (small-frame pixels) for a point to count as tracked.
+# LK reports a status of 1 even when the texture is gone, so this is what notices a lost box.
+FB_MAX_ERROR = 1.0
+
+
+def small_grey(frame: np.ndarray, width: int = TRACK_WIDTH) -> np.ndarray:
+    """
+    Greyscale copy of the frame downscaled to `width` pixels across
+    (resized first, so the colour conversion runs on the small image).
+    """
+    height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+    small = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+
+def motion_score(previous: np.ndarray, current: np.ndarray) -> float:
+    """Mean absolute difference (0-255) between two small greyscale frames."""
+    if previous is None or previous.shape != current.shape:
+        return float('inf')
+    return float(cv2.absdiff(previous, current).mean())
+
+
+class TrackState:
+    """
+    Per-session tracker state, kept on MonitorSession.objects.
+    """
+    __slots__ = ('grey', 'detections', 'points', 'since_detection')
+
+    def __init__(self):
+        self.grey = None
+        self.detections = []
+        # One (k, 1, 2) float32 array of feature points per tracked detection.
+        self.points = []
+        self.since_detection = 0
+
+
+class ObjectTracker:
+    """
+    Decides per frame whether to run the detector or propagate the session's last
+    boxes, and counts both so the saving can be checked in detector_stats.
+    interval=1 disables tracking (every frame is a keyframe).
+    """
+    def __init__(self, interval: int = 4, motion_threshold: float = 6.0, min_points: int = 4,
+                 max_points: int = 20):
+        self.interval = interval
+        self.motion_threshold = motion_threshold
+        self.min_points = min_points
+        self.max_points = max_points
+        self._lock = threading.Lock()
+        self.fresh = 0
+        self.tracked = 0
+
+    def update(self, frame: np.ndarray, session, detect, grey: np.ndarray = None):
+        """
+        Returns (detections, source) where source is 'fresh' when `detect()` ran on
+        this frame and 'tracked' when the previous boxes were propagated.
+        `grey` may pass in an already computed small_grey(frame).
+        """
+        state = session.objects
+        if state is None:
+            state = session.objects = TrackState()
+        if grey is None:
+            grey = small_grey(frame)
+        scale = grey.shape[1] / frame.shape[1]
+
+        detections = None
+        if (self.interval > 1 and state.since_detection < self.interval - 1
+                and motion_score(state.grey, grey) <= self.motion_threshold):
+            detections = self._propagate(state, grey, scale, frame.shape)
+
+        if detections is None:
+            detections = detect()
+            state.detections = detections
+            state.points = [self._features(grey, d['box'], scale) for d in detections]
+            state.since_detection = 0
+            source = 'fresh'
+        else:
+            state.since_detection += 1
+            source = 'tracked'
+        state.grey = grey
+
+        with self._lock:
+            if source == 'fresh':
+                self.fresh += 1
+            else:
+                self.tracked += 1
+        return detections, source
+
+    def _features(self, grey, box, scale):
+        x1, y1, x2, y2 = (int(v * scale) for v in box)
+        mask = np.zeros_like(grey)
+        mask[max(0, y1):max(0, y2), max(0, x1):max(0, x2)] = 255
+        points = cv2.goodFeaturesToTrack(grey, self.max_points, 0.01, 3, mask=mask)
+        return points if points is not None else np.empty((0, 1, 2), np.float32)
+
+    def _propagate(self, state, grey, scale, shape):
+        """
+        Shifts every tracked box by the median flow of its feature points.
+        A point counts only when flowing it back lands within FB_MAX_ERROR of where it
+        started. Returns None when any box has lost too many points, forcing a detection.
+        """
+        if not state.detections:
+            return []
+        height, width = shape[:2]
+        counts = [len(p) for p in state.points]
+        if min(counts) < self.min_points:
+            return None
+        previous = np.concatenate(state.points)
+        current, status, _ = cv2.calcOpticalFlowPyrLK(state.grey, grey, previous, None, **_LK_PARAMS)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(grey, state.grey, current, None, **_LK_PARAMS)
+        error = np.abs(back - previous).reshape(-1, 2).max(axis=1)
+        status = status.ravel().astype(bool) & back_status.ravel().astype(bool) & (error < FB_MAX_ERROR)
+
+        detections, points, start = [], [], 0
+        for detection, count in zip(state.detections, counts):
+            ok = status[start:start + count]
+            moved = current[start:start + count][ok]
+            if len(moved) < self.min_points:
+                return None
+            dx, dy = np.median(moved - previous[start:start + count][ok], axis=0).ravel() / scale
+            x1, y1, x2, y2 = detection['box']
+            box = [int(np.clip(x1 + dx, 0, width)), int(np.clip(y1 + dy, 0, height)),
+                   int(np.clip(x2 + dx, 0, width)), int(np.clip(y2 + dy, 0, height))]
+            detections.append({**detection, 'box': box})
+            points.append(moved)
+            start += count
+        state.detections = detections
+        state.points = points
+        return detections
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.fresh + self.tracked
+            return {
+                'interval': self.interval,
+                'motion_threshold': self.motion_threshold,
+                'fresh': self.fresh,
+                'tracked': self.tracked,
+                'detector_fraction': self.fresh / total if total else 1.0,
+            }
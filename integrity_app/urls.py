@@ -4,7 +4,7 @@
 from django.urls import path
 
 from accounts import views
-from .views import index, process_frame, process_audio
+from .views import index, process_frame, process_audio, detector_stats, frame_preview, readiness, metrics_view
 from django.contrib import admin
 from django.urls import path
 from django.views.generic import TemplateView
@@ -13,4 +13,8 @@ urlpatterns = [
     path('', index, name='student_dashboard'),
     path('process-frame/', process_frame, name='process_frame'),
     path('process_audio/', process_audio, name='process_audio'),
+    path('detector-stats/', detector_stats, name='detector_stats'),
+    path('preview/<uuid:attempt_id>/', frame_preview, name='frame_preview'),
+    path('ready/', readiness, name='readiness'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -1,23 +1,53 @@
-import base64
-import cv2
-import numpy as np
-from pathlib import Path
+import hmac
+import math
+import time
+import uuid
 from django.conf import settings
-from django.http import JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import render
-from accounts.decorators import student_required
-from .monitoring import FaceMonitor
-from .analyzers import FrameAnalyzer, AudioAnalyzer
+from accounts.decorators import student_required, proctor_required
+from student.models import Attempt
+from . import audio_stream, pipeline
+from .admission import Overloaded, Superseded
+from .client_inference import CONTENT_TYPE as LANDMARKS_CONTENT_TYPE, decode_packet
+from .frames import read_frame
+from .metrics import metrics
 
-# Set up once
-MODEL_PATH      = Path(settings.BASE_DIR) / 'models' / 'best.pt'
-frame_analyzer  = FrameAnalyzer(MODEL_PATH, FaceMonitor())
-audio_analyzer  = AudioAnalyzer(Path(settings.MEDIA_ROOT))
+
+def _session_key(request) -> str:
+    return pipeline.resolve_session_key(request.user.pk, request.GET.get('attempt', ''))
+
+def _dashboard_attempt(request):
+    # ?attempt= when it is one of this student's attempts in progress, otherwise
+    # their most recent attempt in progress.
+    attempts = Attempt.objects.filter(student=request.user, status='in_progress')
+    try:
+        attempt = attempts.filter(attempt_id=uuid.UUID(request.GET.get('attempt', ''))).first()
+    except ValueError:
+        attempt = None
+    return attempt or attempts.order_by('-start_time').first()
+
+def render_dashboard(request):
+    """
+    The student monitoring page. Shared by this app's index and
+    accounts.views.StudentDashboard, which serve the same template. The attempt
+    being monitored is rendered into the page, so frames, audio and evidence are
+    filed under it.
+    """
+    attempt = _dashboard_attempt(request)
+    return render(request, 'integrity_app/student_dashboard.html', {
+        'attempt_id': str(attempt.attempt_id) if attempt is not None else '',
+        'client_inference': settings.INTEGRITY_CLIENT_INFERENCE,
+        'tasks_vision_url': settings.INTEGRITY_TASKS_VISION_URL,
+        'face_landmarker_model_url': settings.INTEGRITY_FACE_LANDMARKER_MODEL_URL,
+        'thumbnail_interval_ms': settings.INTEGRITY_THUMBNAIL_INTERVAL_MS,
+    })
 
 @student_required
 def index(request):
-    return render(request, 'integrity_app/student_dashboard.html')
+    return render_dashboard(request)
 
 @student_required
 @csrf_exempt
@@ -25,18 +55,34 @@ def process_frame(request):
     if request.method != 'POST':
         return JsonResponse({'error':'Invalid request'}, status=400)
 
-    data_url = request.POST.get('image','')
+    with metrics.in_flight_request(), metrics.stage('total'):
+        response = _process_frame(request)
+    metrics.frame_done()
+    return response
+
+def _process_frame(request):
+    session = pipeline.sessions.get(_session_key(request))
     try:
-        _, b64 = data_url.split(',',1)
-        frame = cv2.imdecode(
-            np.frombuffer(base64.b64decode(b64), np.uint8),
-            cv2.IMREAD_COLOR
-        )
-    except Exception:
+        if request.content_type == LANDMARKS_CONTENT_TYPE:
+            # Landmarks computed in the browser (client-inference mode)
+            result = pipeline.handle_frame(session, lambda: decode_packet(request.body), pipeline.analyze_client)
+        else:
+            # Raw JPEG/WebP bodies, multipart uploads and legacy base64 form posts
+            result = pipeline.handle_frame(
+                session, lambda: read_frame(request, settings.INTEGRITY_FRAME_MAX_SIDE))
+    except Superseded as e:
+        # A newer frame from this student is already waiting; this one is stale.
+        return JsonResponse({'superseded': True, 'next_capture_ms': e.next_capture_ms})
+    except Overloaded as e:
+        response = JsonResponse({'error': 'Server busy', 'retry_after_ms': e.retry_after_ms,
+                                 'next_capture_ms': e.next_capture_ms}, status=503)
+        response['Retry-After'] = str(math.ceil(e.retry_after_ms / 1000))
+        return response
+    except ValueError:
         return JsonResponse({'error':'Bad image data'}, status=400)
 
-    result = frame_analyzer.analyze(frame)
-    return JsonResponse(result)
+    with metrics.stage('serialize'):
+        return JsonResponse(result)
 
 @student_required
 @csrf_exempt
@@ -44,4 +90,72 @@ def process_audio(request):
     if request.method != 'POST':
         return JsonResponse({'error':'Invalid request method'}, status=405)
 
-    return JsonResponse(audio_analyzer.process(request.body))
+    result = pipeline.get_audio_analyzer().process(request.body)
+    # Speech during the exam is an audio violation: sample this student's webcam faster.
+    if result.get('speech_detected'):
+        session = pipeline.sessions.peek(_session_key(request))
+        if session is not None:
+            pipeline.sampling.boost(session)
+    return JsonResponse(result)
+
+@proctor_required
+def frame_preview(request, attempt_id):
+    """
+    Annotated face/object images for one attempt, for the proctor running the exam.
+    Each call keeps server-side rendering on for that student for a short window.
+    """
+    attempt = Attempt.objects.filter(attempt_id=attempt_id, exam__proctor=request.user).first()
+    if attempt is None:
+        return JsonResponse({'error': 'Attempt not found'}, status=404)
+    session = pipeline.sessions.peek(pipeline.session_key(attempt.student_id, attempt.attempt_id))
+    if session is None:
+        return JsonResponse({'error': 'No live monitoring session'}, status=404)
+    session.preview_until = time.time() + settings.INTEGRITY_PREVIEW_SECONDS
+    return JsonResponse({'preview': session.preview})
+
+def _stats(component):
+    return component.stats() if component is not None else None
+
+@staff_member_required
+def detector_stats(request):
+    # Batch size / queue wait figures for tuning the YOLO batching window.
+    # Components that are not built yet report None; looking must not load models.
+    frame_analyzer = pipeline.peek_frame_analyzer()
+    sound_monitor = pipeline.peek_sound_monitor()
+    return JsonResponse({**(frame_analyzer.stats() if frame_analyzer is not None else {'detector': None}),
+                         'sessions': pipeline.sessions.stats(),
+                         'admission': pipeline.admission.stats(),
+                         'sampling': pipeline.sampling.stats(),
+                         'client_inference': pipeline.spot_checks.stats(),
+                         'evidence': pipeline.evidence.stats(),
+                         'audio': _stats(pipeline.peek_audio_analyzer()),
+                         'audio_streams': {**audio_stream.stats(),
+                                           **(sound_monitor.stats() if sound_monitor is not None else {'vad': None})},
+                         'speech': _stats(pipeline.peek_speech_recognizer()),
+                         'models': pipeline.status(),
+                         'metrics': metrics.snapshot()})
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of this worker's frame pipeline metrics, for scrapers
+    presenting INTEGRITY_METRICS_TOKEN and for staff. Without a token configured,
+    only staff can read them.
+    """
+    if not metrics.enabled:
+        return JsonResponse({'error': 'Metrics are disabled'}, status=404)
+    token = settings.INTEGRITY_METRICS_TOKEN
+    if not request.user.is_staff:
+        if not token:
+            return JsonResponse({'error': 'Forbidden'}, status=403)
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def readiness(request):
+    """
+    Readiness probe: 200 once the models are loaded and warm, 503 until then.
+    The first probe starts warm-up in the background if it is not already running.
+    """
+    pipeline.ensure_warming()
+    state = pipeline.status()
+    return JsonResponse(state, status=200 if state['ready'] else 503)
@@ -12,6 +12,9 @@ urlpatterns = [
     # Student Invitation
     path('invite-students/<uuid:exam_id>/', views.invite_students, name='invite_students'),
 
+    # Live Monitoring
+    path('monitor/<uuid:exam_id>/', views.monitor_exam, name='monitor_exam'),
+
     # Question Management
     path('exam/<uuid:exam_id>/questions/', views.manage_questions, name='manage_questions'),
     path('question/delete/<uuid:question_id>/', views.delete_question, name='delete_question'),
@@ -88,6 +88,17 @@ def invite_students(request, exam_id):
         'invited': invited
     })
 
+@proctor_required
+@login_required
+def monitor_exam(request, exam_id):
+    # Live previews of the attempts in progress; the page polls integrity_app's frame_preview.
+    exam = get_object_or_404(Exam, exam_id=exam_id, proctor=request.user)
+    attempts = exam.attempts.filter(status='in_progress').select_related('student').order_by('start_time')
+    return render(request, 'proctor/monitor_exam.html', {
+        'exam': exam,
+        'attempts': attempts,
+    })
+
 @proctor_required
 @login_required
 def manage_questions(request, exam_id):